@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import dataclasses
 import json
 import logging
@@ -9,12 +10,14 @@ import uuid
 from pathlib import Path
 from typing import (
     Any,
+    AsyncContextManager,
     AsyncGenerator,
     AsyncIterator,
     Dict,
     List,
     Literal,
     Optional,
+    Tuple,
     TypedDict,
     Union,
 )
@@ -30,7 +33,11 @@ from pydantic import BaseModel
 from agentor.a2a import A2AController, AgentSkill
 from agentor.config import celesto_config
 from agentor.engine import AgentLoop, function_tool
+from agentor.engine.adaptive import AdaptiveLimit
+from agentor.engine.fallback import FallbackModel
 from agentor.engine.mcp import MCPServer
+from agentor.engine.models import resolve_model
+from agentor.engine.retry import CircuitOpenError
 from agentor.engine.settings import ModelSettings
 from agentor.engine.tools import resolve_tools
 from agentor.output_text_formatter import AgentOutput, ToolAction
@@ -51,7 +58,13 @@ def _retryable_errors() -> tuple[type[BaseException], ...]:
     request, so a tuple built before that call would omit its errors and the
     very first rate limit would skip the fallbacks entirely.
     """
-    errors: list[type[BaseException]] = [openai.RateLimitError, openai.APIError]
+    # CircuitOpenError: the adapter has already given up on the provider,
+    # which is exactly when a fallback model should take over
+    errors: list[type[BaseException]] = [
+        openai.RateLimitError,
+        openai.APIError,
+        CircuitOpenError,
+    ]
     litellm = sys.modules.get("litellm")
     if litellm is not None:
         errors.extend([litellm.RateLimitError, litellm.APIError])
@@ -197,6 +210,9 @@ class Agentor:
             else:
                 plain_tools.append(tool)
 
+        #: FallbackModel chains by fallback list; see `_fallback_chain`
+        self._fallback_chains: Dict[Tuple[str, ...], FallbackModel] = {}
+
         # Fail loudly rather than silently dropping a tool the caller passed.
         self._tools = resolve_tools(plain_tools)
         self.tools = self._tools
@@ -407,7 +423,7 @@ class Agentor:
     async def arun(
         self,
         input: list[str] | str | list[AgentInputType],
-        limit_concurrency: int = 10,
+        limit_concurrency: int | AdaptiveLimit = 10,
         max_turns: Optional[int] = None,
         fallback_models: Optional[List[str]] = None,
         tracing: Any = None,
@@ -419,6 +435,9 @@ class Agentor:
         Args:
             input: A string prompt or a list of string prompts.
             limit_concurrency: The maximum number of concurrent tasks to run in case of a batch of prompts.
+                Pass an `AdaptiveLimit` instead to have the limit find itself:
+                it grows while runs succeed and backs off on rate limits.
+                Reuse the instance across batches to keep what it learned.
             max_turns: Maximum turns for this call. Defaults to the value the
                 agent was constructed with.
             fallback_models: Optional list of fallback model names to try if the primary model
@@ -434,28 +453,34 @@ class Agentor:
                     input, max_turns=max_turns, tracing=tracing
                 )
 
-            futures = []
-            if limit_concurrency > 0:
-                semaphore = asyncio.Semaphore(limit_concurrency)
+            adaptive = isinstance(limit_concurrency, AdaptiveLimit)
+            semaphore = (
+                asyncio.Semaphore(limit_concurrency)
+                if not adaptive and limit_concurrency > 0
+                else None
+            )
 
-                async def _run_task(task: str) -> str:
-                    async with semaphore:
-                        return await self._run_with_fallback(
-                            task, max_turns, fallback_models, tracing
-                        )
+            def _slot() -> AsyncContextManager[Any]:
+                if adaptive:
+                    return limit_concurrency.slot()
+                if semaphore is not None:
+                    return semaphore
+                return contextlib.nullcontext()
+
+            async def _run_task(task: str) -> str:
+                async with _slot():
+                    return await self._run_with_fallback(
+                        task, max_turns, fallback_models, tracing
+                    )
 
-                futures = [_run_task(task) for task in input]
-                return await asyncio.gather(*futures, return_exceptions=True)
-            else:
-                return await asyncio.gather(
-                    *[
-                        self._run_with_fallback(
-                            task, max_turns, fallback_models, tracing
-                        )
-                        for task in input
-                    ],
-                    return_exceptions=True,
+            results = await asyncio.gather(
+                *[_run_task(task) for task in input], return_exceptions=True
+            )
+            if adaptive:
+                logger.info(
+                    "Adaptive limit after batch: %s", limit_concurrency.metrics()
                 )
+            return results
         else:
             return await self._run_with_fallback(
                 input, max_turns, fallback_models, tracing
@@ -470,35 +495,40 @@ class Agentor:
     ):
         """Run a task, falling back to other models on rate limits.
 
-        Swapping the model copies the loop rather than rebuilding the agent,
-        because the model is not baked into the agent here.
+        The fallback is per turn: a failed model call is sent to the next
+        model with the same messages, and the run continues from there rather
+        than starting over, so completed turns and tool calls are kept.
         """
-        try:
+        if not fallback_models:
             return await self._loop.arun(task, max_turns=max_turns, tracing=tracing)
-        except Exception as e:
-            if not _is_retryable(e) or not fallback_models:
-                raise
-            logger.warning(
-                f"Primary model failed with {type(e).__name__}: {e}. "
-                f"Trying fallback models: {fallback_models}"
+        return await self._loop.with_model(self._fallback_chain(fallback_models)).arun(
+            task, max_turns=max_turns, tracing=tracing
+        )
+
+    def _fallback_chain(self, fallback_models: List[str]) -> FallbackModel:
+        """The agent's model followed by `fallback_models`, built once per list.
+
+        Resolving a model creates a provider client with its own connection
+        pool, so every task of every `arun` reuses the chain rather than
+        building clients for fallbacks it will most likely never call.
+        """
+        key = tuple(fallback_models)
+        chain = self._fallback_chains.get(key)
+        # rebuilt if the agent's model was swapped since: the chain leads
+        # with it and takes its parameters
+        if chain is None or chain.models[0] is not self._loop.model:
+            # carry the configured parameters across: a fallback that
+            # silently drops temperature/max_tokens answers differently
+            params = getattr(self._loop.model, "params", {})
+            chain = self._fallback_chains[key] = FallbackModel(
+                self._loop.model,
+                [
+                    resolve_model(fallback, api_key=self.api_key, **params)
+                    for fallback in fallback_models
+                ],
+                fallback_on=_is_retryable,
             )
-            for fallback_model in fallback_models:
-                try:
-                    # carry the configured parameters across: a fallback that
-                    # silently drops temperature/max_tokens answers differently
-                    return await self._loop.with_model(
-                        fallback_model,
-                        api_key=self.api_key,
-                        **getattr(self._loop.model, "params", {}),
-                    ).arun(task, max_turns=max_turns, tracing=tracing)
-                except Exception as fallback_error:
-                    if not _is_retryable(fallback_error):
-                        raise
-                    logger.warning(
-                        f"Fallback model '{fallback_model}' also failed: {fallback_error}"
-                    )
-                    continue
-            raise
+        return chain
 
     def resume(self, run_id: str):
         """Continue a persisted run. Requires a store."""
@@ -553,9 +583,12 @@ class Agentor:
                 from agentor.engine.store import new_run_id
 
                 run_id = new_run_id()
-            async for event in self._loop.astream(
+            # run in its own task: a slow or vanished client then delays only
+            # its own reads, never the model stream, the tools or the trace
+            run = self._loop.start(
                 input, run_id=run_id, tracing=self._resolve_tracing(tracing)
-            ):
+            )
+            async for event in run.attach():
                 if event.type == "message":
                     yield AgentOutput(type="run_item_stream_event", message=event.text)
                 elif event.type == "tool_call":
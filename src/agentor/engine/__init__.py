@@ -4,7 +4,14 @@ Self-contained by design: nothing here imports openai-agents, so removing that
 dependency in a later phase is a deletion rather than a rewrite.
 """
 
+from agentor.engine.adaptive import AdaptiveLimit
+from agentor.engine.cache import Cache, MemoryCache, SqliteCache
+from agentor.engine.context import ContextWindow, HistoryPolicy, estimate_tokens
 from agentor.engine.events import Event, RunResult, Usage
+from agentor.engine.fallback import FallbackModel
+from agentor.engine.hedging import HedgedModel
+from agentor.engine.history import MessageHistory
+from agentor.engine.leases import LeaseHeldError
 from agentor.engine.loop import AgentLoop
 from agentor.engine.models import (
     ChatCompletionsModel,
@@ -14,8 +21,13 @@ from agentor.engine.models import (
     ToolCall,
     resolve_model,
 )
+from agentor.engine.response_cache import CachedModel
+from agentor.engine.retry import CircuitOpenError, RetryPolicy
+from agentor.engine.semantic_cache import SemanticCache
 from agentor.engine.settings import ModelSettings
+from agentor.engine.streaming import RunHandle
 from agentor.engine.tools import (
+    ConcurrencyLimit,
     RunContext,
     Tool,
     build_schema,
@@ -25,19 +37,36 @@ from agentor.engine.tools import (
 )
 
 __all__ = [
+    "AdaptiveLimit",
     "AgentLoop",
+    "Cache",
+    "CachedModel",
     "ChatCompletionsModel",
+    "CircuitOpenError",
+    "ConcurrencyLimit",
+    "ContextWindow",
     "Event",
+    "FallbackModel",
+    "HedgedModel",
+    "HistoryPolicy",
+    "LeaseHeldError",
     "LiteLLMModel",
+    "MemoryCache",
+    "MessageHistory",
     "Model",
     "ModelSettings",
     "ModelResponse",
+    "RetryPolicy",
     "RunContext",
+    "RunHandle",
     "RunResult",
+    "SemanticCache",
+    "SqliteCache",
     "Tool",
     "ToolCall",
     "Usage",
     "build_schema",
+    "estimate_tokens",
     "function_tool",
     "parse_docstring",
     "resolve_model",
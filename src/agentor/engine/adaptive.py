@@ -0,0 +1,199 @@
+"""Adaptive concurrency for batches of runs.
+
+A fixed limit has to be guessed per provider, per account tier and per time of
+day: too high and a batch turns into a storm of 429s, too low and throughput
+is left unused. `AdaptiveLimit` finds it instead, with AIMD: it adds about one
+slot per limit's worth of successful runs while their latency holds steady,
+and halves on a rate limit.
+
+Most rate limits never reach the batch: the adapter retries them and
+`FallbackModel` moves on to another model. Both report each one with
+`report_overload`, which tells the limit whose slot the run holds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# the limit whose slot the current run holds, and when it took it
+_holding: ContextVar[Optional[Tuple["AdaptiveLimit", float]]] = ContextVar(
+    "agentor_adaptive_slot", default=None
+)
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    """True for a provider's "slow down", from openai, litellm or an HTTP 429.
+
+    Matched on the status code and name rather than the classes, so checking
+    an error never imports a provider SDK.
+    """
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    return "RateLimit" in type(exc).__name__
+
+
+class AdaptiveLimit:
+    """A concurrency limit that tunes itself with AIMD.
+
+    - Each successful run whose latency is within `tolerance` times the
+      running average adds `1/limit`, so a whole window of them adds one.
+      Slower runs hold the limit where it is: rising latency means the
+      provider is queueing, and more concurrency would only lengthen it.
+    - An overload (`is_overload`, rate limits by default) multiplies the limit
+      by `backoff`. Only once per window: the runs already in flight when the
+      first 429 arrives are likely to fail too, and must not cut it again.
+    - Other failures leave it alone; they say nothing about capacity.
+
+    Keep one instance per provider and reuse it across batches, so each batch
+    starts from what the last one learned. `metrics()` reports where it is.
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        is_overload: Callable[[BaseException], bool] = is_rate_limit,
+    ):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError(
+                "Expected 1 <= min_limit <= initial <= max_limit, got "
+                f"{min_limit}, {initial}, {max_limit}."
+            )
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff must be between 0 and 1, got {backoff}.")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.is_overload = is_overload
+        #: fractional, so increases can accumulate below one slot
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latency: Optional[float] = None
+        self._last_backoff = float("-inf")
+        self._peak = 0
+        self._successes = 0
+        self._overloads = 0
+        self._backoffs = 0
+
+    @property
+    def limit(self) -> int:
+        """The number of runs currently allowed at once."""
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def metrics(self) -> Dict[str, Any]:
+        """Where the limit is and how it got there, for logs and dashboards."""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "waiting": sum(1 for waiter in self._waiters if not waiter.done()),
+            "peak_in_flight": self._peak,
+            "successes": self._successes,
+            "overloads": self._overloads,
+            "backoffs": self._backoffs,
+            "avg_latency": self._latency,
+        }
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for the duration of a run, and learn from its outcome."""
+        await self._acquire()
+        started = time.monotonic()
+        token = _holding.set((self, started))
+        try:
+            yield
+        except Exception as exc:
+            if self.is_overload(exc):
+                self._on_overload(started)
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+        finally:
+            _holding.reset(token)
+            self._in_flight -= 1
+            self._wake()
+
+    async def _acquire(self) -> None:
+        if self._in_flight < self.limit and not self._waiters:
+            self._take()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # granted a slot in the same step as being cancelled; hand it on
+                self._in_flight -= 1
+                self._wake()
+            raise
+
+    def _take(self) -> None:
+        self._in_flight += 1
+        self._peak = max(self._peak, self._in_flight)
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._take()
+            waiter.set_result(None)
+
+    def _on_success(self, latency: float) -> None:
+        self._successes += 1
+        average = latency if self._latency is None else self._latency
+        self._latency = average + 0.1 * (latency - average)
+        if latency > self.tolerance * average:
+            return
+        before = self.limit
+        self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+        if self.limit != before:
+            logger.debug("Adaptive limit raised to %d", self.limit)
+            self._wake()
+
+    def _on_overload(self, started: float) -> None:
+        self._overloads += 1
+        if started < self._last_backoff:
+            # began before the last backoff; that one already accounted for it
+            return
+        self._last_backoff = time.monotonic()
+        self._backoffs += 1
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        logger.info("Rate limited; adaptive limit lowered to %d", self.limit)
+
+    def __repr__(self) -> str:
+        return f"AdaptiveLimit(limit={self.limit}, in_flight={self._in_flight})"
+
+
+def report_overload(exc: BaseException) -> None:
+    """Tell the `AdaptiveLimit` the current run holds a slot of about `exc`.
+
+    For failures handled below the batch, a retried 429 or one a fallback
+    model absorbed, which the limit would otherwise never see. A no-op
+    outside a slot or for an error that is not an overload.
+    """
+    holding = _holding.get()
+    if holding is not None:
+        limit, started = holding
+        if limit.is_overload(exc):
+            limit._on_overload(started)
+
+
+__all__ = ["AdaptiveLimit", "is_rate_limit", "report_overload"]
@@ -0,0 +1,222 @@
+"""Key/value caches with TTL and LRU eviction.
+
+Shared by anything in the engine that memoizes: tool results today. Values are
+strings, which is what a tool returns and what anything else can be encoded to,
+so a backend never needs to know what it is holding.
+
+Two backends: `MemoryCache`, per process, and `SqliteCache`, on disk and shared
+by every process pointing at the same file.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Protocol, Tuple, runtime_checkable
+
+logger = logging.getLogger(__name__)
+
+
+@runtime_checkable
+class Cache(Protocol):
+    #: True when get/set do I/O, so async callers should move them off the
+    #: event loop
+    blocking: bool
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None: ...
+
+
+def cache_key(*parts: Any) -> str:
+    """A stable key for JSON-shaped parts.
+
+    Canonical JSON, so `{"a": 1, "b": 2}` and `{"b": 2, "a": 1}` share an entry,
+    hashed so a key stays short however large the arguments are.
+    """
+    canonical = json.dumps(
+        parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def cache_get(cache: Cache, key: str, what: str = "Cache") -> Optional[str]:
+    """`cache.get` from async code, off the event loop if it blocks.
+
+    A cache that fails is treated as a miss: it is an optimisation, and must
+    not be what fails the call it speeds up. `what` names it in the warning.
+    """
+    try:
+        if cache.blocking:
+            return await asyncio.to_thread(cache.get, key)
+        return cache.get(key)
+    except Exception:
+        logger.warning("%s lookup failed", what, exc_info=True)
+        return None
+
+
+async def cache_set(
+    cache: Cache,
+    key: str,
+    value: str,
+    ttl: Optional[float] = None,
+    what: str = "Cache",
+) -> None:
+    """`cache.set` from async code; a failed write is logged and dropped."""
+    try:
+        if cache.blocking:
+            await asyncio.to_thread(cache.set, key, value, ttl)
+        else:
+            cache.set(key, value, ttl)
+    except Exception:
+        logger.warning("%s write failed", what, exc_info=True)
+
+
+def _expiry(ttl: Optional[float]) -> Optional[float]:
+    return None if ttl is None else time.time() + ttl
+
+
+class MemoryCache:
+    """In-process LRU with an optional time-to-live per entry."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Tuple[Optional[float], str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        expires_at = _expiry(self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCache:
+    """On-disk LRU with an optional time-to-live per entry.
+
+    Survives restarts and is safe to share between processes: SQLite's own
+    locking serialises writers, and WAL mode keeps readers from blocking on
+    them. Recency is only tracked to the second, which is plenty for choosing
+    what to evict.
+    """
+
+    blocking = True
+    _EVICT_EVERY = 64
+
+    def __init__(
+        self,
+        path: str | Path = "agentor-cache.sqlite",
+        maxsize: int = 100_000,
+        ttl: Optional[float] = None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        # one connection, used from whichever worker thread the loop picks
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ? AND accessed_at < ?",
+                (now, key, int(now)),
+            )
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = _expiry(self.ttl if ttl is None else ttl)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._writes += 1
+            # Evicting walks the recency index, so it is batched rather than
+            # paid on every write; the table overshoots by at most a batch.
+            if self._writes % self._EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+            "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+__all__ = [
+    "Cache",
+    "MemoryCache",
+    "SqliteCache",
+    "cache_get",
+    "cache_key",
+    "cache_set",
+]
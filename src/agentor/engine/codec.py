@@ -0,0 +1,75 @@
+"""Event encodings, for stores and for sending events to clients.
+
+"json" is the readable default every store and client understands. "msgpack"
+is `Event.to_bytes`: field ids for keys, no `asdict` copy, and a fraction of
+the size and encode time, at the cost of the `msgpack` package and of logs
+nobody can read with `cat`.
+
+    async for event in run.attach():
+        await websocket.send(websocket_message(event, "msgpack"))
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Literal, Optional, Union
+
+from agentor.engine.events import Event
+
+Encoding = Literal["json", "msgpack"]
+
+ENCODINGS = ("json", "msgpack")
+
+
+def _check(encoding: str) -> None:
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown event encoding: {encoding!r}")
+
+
+def encode(event: Event, encoding: Encoding = "json") -> bytes:
+    _check(encoding)
+    if encoding == "msgpack":
+        return event.to_bytes()
+    return event.to_json().encode("utf-8")
+
+
+def decode(data: Union[bytes, str], encoding: Optional[Encoding] = None) -> Event:
+    """The event `encode` produced. Without an `encoding`, text is taken for
+    JSON and bytes for MessagePack, which is how `SqliteStore` stores each."""
+    if encoding is None:
+        encoding = "json" if isinstance(data, str) else "msgpack"
+    _check(encoding)
+    if encoding == "msgpack":
+        return Event.from_bytes(data)  # type: ignore[arg-type]
+    return Event.from_dict(json.loads(data))
+
+
+def sse_message(event: Event, encoding: Encoding = "json") -> str:
+    """One server-sent event carrying `event`.
+
+    SSE is a text protocol, so MessagePack travels base64-encoded under the
+    `msgpack` event name; a client decodes `atob(data)`. That costs a third
+    of the saving in size, though none of the saving in encode time.
+    """
+    if encoding == "msgpack":
+        data = base64.b64encode(encode(event, encoding)).decode("ascii")
+        return f"event: msgpack\ndata: {data}\n\n"
+    return f"data: {encode(event, encoding).decode('utf-8')}\n\n"
+
+
+def websocket_message(event: Event, encoding: Encoding = "json") -> Union[str, bytes]:
+    """`event` as a WebSocket frame payload: text for JSON, binary otherwise."""
+    if encoding == "msgpack":
+        return encode(event, encoding)
+    return event.to_json()
+
+
+__all__ = [
+    "ENCODINGS",
+    "Encoding",
+    "decode",
+    "encode",
+    "sse_message",
+    "websocket_message",
+]
@@ -0,0 +1,159 @@
+"""Context-window management for long runs.
+
+A tool-heavy run grows its message list every turn until the provider rejects
+it, and every turn before that pays for the whole history again. A history
+policy decides what of the conversation is *sent*; the conversation itself, and
+so the event log and `replay_messages`, stays complete. Resuming a run replays
+the full history and applies the same policy again.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, Any]
+
+#: per-message framing (role, separators) that providers bill on top of content
+_MESSAGE_OVERHEAD = 4
+#: English text and JSON average close to four characters per token; this only
+#: has to be close enough to keep a request under a budget, not to bill it
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: Sequence[Message]) -> int:
+    """A fast, local approximation of a request's prompt tokens.
+
+    Deliberately not a tokenizer: it runs on every turn, and needs to be cheap
+    and provider-agnostic rather than exact.
+    """
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            # multi-part content; only the text parts are worth counting
+            for part in content:
+                if isinstance(part, dict) and isinstance(part.get("text"), str):
+                    chars += len(part["text"])
+        for call in message.get("tool_calls") or ():
+            function = call.get("function") or {}
+            chars += len(function.get("name") or "")
+            chars += len(function.get("arguments") or "")
+    return chars // _CHARS_PER_TOKEN + _MESSAGE_OVERHEAD * len(messages)
+
+
+class HistoryPolicy(Protocol):
+    def apply(self, messages: Sequence[Message]) -> List[Message]:
+        """Return the messages to send for this turn. Must not edit `messages`."""
+        ...
+
+
+def _groups(messages: Sequence[Message]) -> List[List[Message]]:
+    """Split messages into units that can be dropped without breaking a request.
+
+    An assistant message that called tools and the tool messages answering it
+    travel together: sending one without the other is rejected outright.
+    """
+    groups: List[List[Message]] = []
+    for message in messages:
+        if message.get("role") == "tool" and groups:
+            if groups[-1][0].get("tool_calls"):
+                groups[-1].append(message)
+                continue
+        groups.append([message])
+    return groups
+
+
+class ContextWindow:
+    """Keep the instructions, the task and the recent turns; trim the rest.
+
+    Applied in order, each step only when configured:
+
+    1. `keep_turns`: keep only the last N model turns (an assistant message and
+       the tool results answering it), plus anything after them.
+    2. `max_tool_result_chars`: cut tool results older than the latest turn
+       down to this many characters. The latest results are kept whole: they
+       are what the model is about to read.
+    3. `max_tokens`: drop the oldest remaining turns until `estimator` puts the
+       request under budget. The estimator is applied per turn and summed, so
+       a custom one should be additive, as `estimate_tokens` is.
+
+    System messages and the first user message are never dropped. A request
+    still over budget with nothing left to drop is sent as-is, with a warning,
+    and the provider decides.
+    """
+
+    def __init__(
+        self,
+        keep_turns: Optional[int] = None,
+        max_tool_result_chars: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        estimator: Callable[[Sequence[Message]], int] = estimate_tokens,
+    ):
+        if keep_turns is not None and keep_turns < 1:
+            raise ValueError(f"keep_turns must be at least 1, got {keep_turns}.")
+        self.keep_turns = keep_turns
+        self.max_tool_result_chars = max_tool_result_chars
+        self.max_tokens = max_tokens
+        self.estimator = estimator
+
+    def apply(self, messages: Sequence[Message]) -> List[Message]:
+        pinned: List[Message] = []
+        rest: List[Message] = list(messages)
+        while rest and rest[0].get("role") == "system":
+            pinned.append(rest.pop(0))
+        if rest and rest[0].get("role") == "user":
+            pinned.append(rest.pop(0))
+
+        groups = _groups(rest)
+        turns = [
+            i for i, group in enumerate(groups) if group[0].get("role") == "assistant"
+        ]
+
+        if self.keep_turns is not None and len(turns) > self.keep_turns:
+            groups = groups[turns[-self.keep_turns] :]
+            turns = [i - turns[-self.keep_turns] for i in turns[-self.keep_turns :]]
+
+        if self.max_tool_result_chars is not None and turns:
+            latest = turns[-1]
+            groups = [
+                [self._truncate(m) for m in group] if i < latest else group
+                for i, group in enumerate(groups)
+            ]
+
+        if self.max_tokens is not None:
+            # estimated once per group and summed, so fitting a long history
+            # stays linear rather than re-estimating it per dropped turn
+            sizes = [self.estimator(group) for group in groups]
+            total = self.estimator(pinned) + sum(sizes)
+            dropped = 0
+            # the newest group is what the model must answer; never drop it
+            while dropped < len(groups) - 1 and total > self.max_tokens:
+                total -= sizes[dropped]
+                dropped += 1
+            groups = groups[dropped:]
+            if total > self.max_tokens:
+                logger.warning(
+                    "Request is still over the %d-token budget with nothing left "
+                    "to drop; sending it anyway.",
+                    self.max_tokens,
+                )
+
+        return pinned + [m for group in groups for m in group]
+
+    def _truncate(self, message: Message) -> Message:
+        content = message.get("content")
+        limit = self.max_tool_result_chars
+        if message.get("role") != "tool" or not isinstance(content, str):
+            return message
+        if len(content) <= limit:
+            return message
+        elided = len(content) - limit
+        return {**message, "content": f"{content[:limit]}... [{elided} chars elided]"}
+
+
+__all__ = ["ContextWindow", "HistoryPolicy", "estimate_tokens"]
@@ -8,8 +8,10 @@ of this stream, so there is no second format to keep in sync.
 from __future__ import annotations
 
 import json
-from dataclasses import asdict, dataclass, field, fields
-from typing import Any, Dict, List, Literal, Optional
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Literal, Optional, Sequence
+
+from agentor.engine.history import MessageHistory
 
 EventType = Literal[
     "run_start",
@@ -20,27 +22,35 @@ EventType = Literal[
     "tool_result",
     "run_end",
     "error",
+    "checkpoint",
 ]
 
 RunStatus = Literal["completed", "max_turns", "failed"]
 
 
-@dataclass
+@dataclass(slots=True)
 class Usage:
     input_tokens: int = 0
     output_tokens: int = 0
     total_tokens: int = 0
+    #: tokens a response cache answered instead of the provider; not billed,
+    #: and not part of `total_tokens`
+    cached_tokens: int = 0
 
     def __add__(self, other: "Usage") -> "Usage":
         return Usage(
             input_tokens=self.input_tokens + other.input_tokens,
             output_tokens=self.output_tokens + other.output_tokens,
             total_tokens=self.total_tokens + other.total_tokens,
+            cached_tokens=self.cached_tokens + other.cached_tokens,
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
+    # Slotted: a run creates one per streamed chunk, and attribute reads are
+    # the whole of serializing one (see `to_dict`)
+
     type: EventType
     #: assistant text: the full message for `message`, one chunk for `text_delta`
     text: Optional[str] = None
@@ -56,25 +66,91 @@ class Event:
     call_id: Optional[str] = None
     #: 1-based, so events can be grouped into turns without replaying the loop
     turn: Optional[int] = None
+    #: on `checkpoint`, everything the run has spent up to it, across any
+    #: earlier segments of a resumed run
     usage: Optional[Usage] = None
     status: Optional[RunStatus] = None
     agent: Optional[str] = None
     model: Optional[str] = None
     #: messages sent to the model; set on `generation` so a trace can show the
-    #: exact request, which is the part that is hardest to reconstruct later
+    #: exact request, which is the part that is hardest to reconstruct later.
+    #: On `run_start` this is the run's input, and on `checkpoint` the whole
+    #: conversation at the end of its turn. On a `generation` with `base`
+    #: set it holds only what was appended since the previous request; see
+    #: `expand_messages`
     messages: Optional[List[Dict[str, Any]]] = None
+    #: on a delta `generation`: how many messages of the previous request (or
+    #: of the run_start input) precede `messages`. None means `messages` is the
+    #: whole request, which is how logs written before deltas read
+    base: Optional[int] = None
     #: tool calls the model asked for, on `generation`
     calls: Optional[List[Dict[str, Any]]] = None
     #: epoch seconds bounding the work this event describes; spans need both
     started_at: Optional[float] = None
     ended_at: Optional[float] = None
+    #: on `tool_result`, when the call began waiting for a concurrency slot;
+    #: `started_at - queued_at` is the time it spent queued
+    queued_at: Optional[float] = None
+    #: on `tool_result` of a cached tool, or `generation` from a cached model:
+    #: True when the cache answered and nothing ran, False when it missed.
+    #: None when no cache is involved
+    cached: Optional[bool] = None
+    #: on `generation` from a `HedgedModel`: which request won, 0 for the
+    #: first and 1 for the hedge
+    hedge: Optional[int] = None
+    #: on `generation` when the loop's `history_policy` trimmed or elided the
+    #: history: the request as the model received it. `messages` and `base`
+    #: still describe the full history, which is what resume replays
+    sent: Optional[List[Dict[str, Any]]] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        return {k: v for k, v in asdict(self).items() if v is not None}
+        """The event's set fields, as JSON-ready values.
+
+        Nested data is shared with the event rather than copied, so encoding
+        a checkpoint does not copy the whole conversation it carries.
+        """
+        data: Dict[str, Any] = {}
+        for name in _FIELD_IDS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name == "usage":
+                value = {
+                    "input_tokens": value.input_tokens,
+                    "output_tokens": value.output_tokens,
+                    "total_tokens": value.total_tokens,
+                    "cached_tokens": value.cached_tokens,
+                }
+            elif isinstance(value, MessageHistory):
+                value = list(value)
+            data[name] = value
+        return data
 
     def to_json(self) -> str:
         return json.dumps(self.to_dict(), default=str)
 
+    def to_bytes(self) -> bytes:
+        """The event as MessagePack, keyed by field id rather than name.
+
+        Several times smaller than `to_json` for the small events that make up
+        most of a run, and faster to produce: fields are read directly, with
+        no `asdict` copy of `messages`. Requires the `msgpack` package.
+        """
+        data: Dict[int, Any] = {}
+        for name, key in _FIELD_IDS.items():
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name == "usage":
+                value = [
+                    value.input_tokens,
+                    value.output_tokens,
+                    value.total_tokens,
+                    value.cached_tokens,
+                ]
+            data[key] = value
+        return _msgpack().packb(data, default=_pack_default)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Event":
         data = dict(data)
@@ -82,8 +158,106 @@ class Event:
         if isinstance(usage, dict):
             data["usage"] = Usage(**usage)
         # tolerate fields added by a newer version writing the same log
-        known = {f.name for f in fields(cls)}
-        return cls(**{k: v for k, v in data.items() if k in known})
+        return cls(**{k: v for k, v in data.items() if k in _FIELD_IDS})
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Event":
+        """The event `to_bytes` encoded."""
+        raw = _msgpack().unpackb(data, strict_map_key=False)
+        # as in from_dict, skip fields from a newer version: ids it added
+        kwargs = {_FIELD_NAMES[k]: v for k, v in raw.items() if k in _FIELD_NAMES}
+        usage = kwargs.get("usage")
+        if isinstance(usage, list):
+            kwargs["usage"] = Usage(*usage[: len(fields(Usage))])
+        return cls(**kwargs)
+
+
+#: the key of each Event field in `Event.to_bytes`, and the fields `to_dict`
+#: and `from_dict` know: a new field needs an entry. Ids are never reused or
+#: renumbered, only added, so every version reads every other's events.
+#: `usage` is encoded as a list in the order of Usage's fields, likewise only
+#: ever extended at the end
+_FIELD_IDS: Dict[str, int] = {
+    "type": 0,
+    "text": 1,
+    "name": 2,
+    "args": 3,
+    "result": 4,
+    "error": 5,
+    "call_id": 6,
+    "turn": 7,
+    "usage": 8,
+    "status": 9,
+    "agent": 10,
+    "model": 11,
+    "messages": 12,
+    "base": 13,
+    "calls": 14,
+    "started_at": 15,
+    "ended_at": 16,
+    "queued_at": 17,
+    "cached": 18,
+    "hedge": 19,
+    "sent": 20,
+}
+_FIELD_NAMES = {key: name for name, key in _FIELD_IDS.items()}
+
+
+def _msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError(
+            "Binary event encoding requires msgpack: pip install agentor[msgpack]"
+        ) from e
+    return msgpack
+
+
+def _pack_default(value: Any) -> Any:
+    # a MessageHistory is a Sequence, not a list; anything else is rendered
+    # as to_json renders it
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return list(value)
+    return str(value)
+
+
+def expand_messages(
+    previous: Optional[List[Dict[str, Any]]], event: Event
+) -> MessageHistory:
+    """Rebuild the full request a `generation` event describes.
+
+    `previous` is the request rebuilt for the generation before it, the
+    run_start input for the first generation of a segment, or the messages of
+    a checkpoint in between. Recording only the
+    delta keeps a run's log and its in-memory events linear in its length,
+    where a full snapshot per turn made both quadratic.
+    """
+    delta = event.messages or []
+    if event.base is None:
+        return MessageHistory(delta)
+    if previous is None or len(previous) < event.base:
+        # The log lost the record this delta builds on. Sending a request with
+        # its head missing would be worse than surfacing what is left.
+        raise ValueError(
+            f"generation at turn {event.turn} extends {event.base} earlier "
+            "messages, but the log does not contain them."
+        )
+    # shares storage with `previous`, so rebuilding every request of a run
+    # costs what the run logged rather than a copy per turn
+    return MessageHistory(previous)[: event.base].extended(delta)
+
+
+def request_messages(events: List[Event]) -> List[MessageHistory]:
+    """The full request sent for every `generation`, in order."""
+    requests: List[MessageHistory] = []
+    current: Optional[MessageHistory] = None
+    for event in events:
+        if event.type in ("run_start", "checkpoint"):
+            current = MessageHistory(event.messages or [])
+        elif event.type == "generation":
+            current = expand_messages(current, event)
+            requests.append(current)
+    return requests
 
 
 @dataclass
@@ -96,7 +270,9 @@ class RunResult:
     run_id: Optional[str] = None
     events: List[Event] = field(default_factory=list)
     usage: Usage = field(default_factory=Usage)
-    #: full message list, suitable for feeding back in to continue the conversation
+    #: full message list, suitable for feeding back in to continue the
+    #: conversation. A `MessageHistory` sharing storage with the events; copy
+    #: it with `list()` to edit
     messages: List[Dict[str, Any]] = field(default_factory=list)
     error: Optional[str] = None
 
@@ -0,0 +1,131 @@
+"""Turn-level model fallback.
+
+Falling back by rerunning the whole task repeats every generation and every
+tool call before the failure, side-effecting tools included. Falling back per
+model call instead sends the failed turn's own request to the next model, and
+the run carries on from where it was.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from agentor.engine.adaptive import is_rate_limit, report_overload
+from agentor.engine.models import (
+    Model,
+    ModelResponse,
+    StreamChunk,
+    format_args,
+    resolve_model,
+)
+from agentor.engine.retry import CircuitOpenError, is_transient
+
+logger = logging.getLogger(__name__)
+
+
+def should_fall_back(exc: BaseException) -> bool:
+    """Errors another model may not have: rate limits, outages, open breakers."""
+    return isinstance(exc, CircuitOpenError) or is_transient(exc) or is_rate_limit(exc)
+
+
+class FallbackModel:
+    """Try each model in turn, per call, until one answers.
+
+    Every call starts from the first model again: a provider that failed one
+    turn is usually back for the next, and one that is down stays cheap to
+    skip because its circuit breaker fails fast. Errors `fallback_on` rejects
+    (a bad request, say) are raised at once, since the next model would
+    reject them too. If every model fails, the first model's error is raised.
+
+    A stream falls back only until its first chunk; after that the caller
+    has seen part of the answer. The serving model is recorded on the
+    response, and so on the turn's `generation` event.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        fallbacks: List[Any],
+        fallback_on: Callable[[BaseException], bool] = should_fall_back,
+    ):
+        self.models: List[Model] = [resolve_model(model)]
+        self.models += [resolve_model(fallback) for fallback in fallbacks]
+        self.fallback_on = fallback_on
+        # what the loop reports as the agent's model
+        self.model = getattr(self.models[0], "model", None)
+
+    @staticmethod
+    def _tag(response: ModelResponse, model: Model) -> ModelResponse:
+        if response.model is not None:
+            return response
+        return dataclasses.replace(response, model=getattr(model, "model", None))
+
+    def _skip(self, model: Model, exc: Exception) -> None:
+        if not self.fallback_on(exc):
+            raise exc
+        # a fallback absorbs the 429 the batch's limit needs to see
+        report_overload(exc)
+        logger.warning(
+            "Model %s failed with %s: %s; falling back",
+            getattr(model, "model", model),
+            type(exc).__name__,
+            exc,
+        )
+
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> ModelResponse:
+        extra = format_args(response_format)
+        first_error: Optional[Exception] = None
+        for model in self.models:
+            try:
+                response = await model.complete(messages, tools, *extra)
+            except Exception as exc:
+                self._skip(model, exc)
+                first_error = first_error or exc
+                continue
+            return self._tag(response, model)
+        raise first_error  # type: ignore[misc]
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        extra = format_args(response_format)
+        first_error: Optional[Exception] = None
+        for model in self.models:
+            stream = model.stream(messages, tools, *extra)
+            try:
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    return
+                except Exception as exc:
+                    self._skip(model, exc)
+                    first_error = first_error or exc
+                    continue
+                while True:
+                    if chunk.final is not None:
+                        chunk = dataclasses.replace(
+                            chunk, final=self._tag(chunk.final, model)
+                        )
+                    yield chunk
+                    try:
+                        chunk = await stream.__anext__()
+                    except StopAsyncIteration:
+                        return
+            finally:
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        raise first_error  # type: ignore[misc]
+
+
+__all__ = ["FallbackModel", "should_fall_back"]
@@ -0,0 +1,163 @@
+"""Hedged model requests, for tail latency.
+
+Most responses from a provider arrive in a predictable time; a few take many
+times longer, and those few set a run's p99. Hedging sends a second request
+when the first has not answered within `delay` and keeps whichever answers
+first. Set `delay` near the model's p95 latency and only about one request in
+twenty is duplicated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from agentor.engine.models import (
+    Model,
+    ModelResponse,
+    StreamChunk,
+    format_args,
+    resolve_model,
+)
+from agentor.engine.retry import STREAM_END, close_stream
+
+
+async def _pull(stream: AsyncIterator[StreamChunk]) -> Any:
+    """The next chunk, or `STREAM_END` once the stream has ended."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return STREAM_END
+
+
+async def _discard(tasks: List[asyncio.Task]) -> None:
+    """Cancel the losing requests and wait until they have stopped."""
+    for task in tasks:
+        task.cancel()
+    # waited on so the connection is released now, and so a stream is not
+    # closed while a pull on it is still running
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class HedgedModel:
+    """Race a second request against a slow first one.
+
+    Wraps any `Model`. `hedge` is what the second request goes to: another
+    replica or provider, or, by default, the same model again. Accepts
+    anything `resolve_model` does.
+
+    The first request to succeed wins and the other is cancelled. A request
+    that fails does not end the race while the other is still running; if
+    both fail, the first request's error is raised. An error before `delay`
+    is raised as-is: hedging is for latency, not for retrying.
+
+    Streaming races to the first chunk, then stays on the winning stream.
+    The winner is recorded on the response (`model` and `hedge`) and so on
+    the run's `generation` event. Only the winner's usage is reported; a
+    cancelled request may still have been billed by the provider.
+    """
+
+    def __init__(self, model: Any, delay: float, hedge: Any = None):
+        if delay < 0:
+            raise ValueError(f"delay must not be negative, got {delay}.")
+        self.primary: Model = resolve_model(model)
+        self.hedge: Model = self.primary if hedge is None else resolve_model(hedge)
+        self.delay = delay
+        # what the loop reports as the agent's model
+        self.model = getattr(self.primary, "model", None)
+
+    def _targets(self) -> Tuple[Model, Model]:
+        return self.primary, self.hedge
+
+    def _tag(self, response: ModelResponse, index: int) -> ModelResponse:
+        served_by = getattr(self._targets()[index], "model", None)
+        return dataclasses.replace(
+            response, model=response.model or served_by, hedge=index
+        )
+
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> ModelResponse:
+        extra = format_args(response_format)
+        requests: Dict[asyncio.Task, int] = {}
+        try:
+            for index, model in enumerate(self._targets()):
+                task = asyncio.create_task(model.complete(messages, tools, *extra))
+                requests[task] = index
+                if index == 0:
+                    done, _ = await asyncio.wait({task}, timeout=self.delay)
+                    if done:
+                        return self._tag(task.result(), 0)
+
+            pending = set(requests)
+            errors: Dict[int, BaseException] = {}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=requests.__getitem__):
+                    if task.exception() is None:
+                        return self._tag(task.result(), requests[task])
+                    errors[requests[task]] = task.exception()
+            raise errors[min(errors)]
+        finally:
+            # also reached when the caller is cancelled mid-race
+            await _discard([task for task in requests if not task.done()])
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        extra = format_args(response_format)
+        streams: List[AsyncIterator[StreamChunk]] = []
+        pulls: Dict[asyncio.Task, int] = {}
+        winner: Optional[int] = None
+        first: Any = STREAM_END
+        try:
+            for index, model in enumerate(self._targets()):
+                streams.append(model.stream(messages, tools, *extra))
+                pulls[asyncio.create_task(_pull(streams[index]))] = index
+                if index == 0:
+                    done, _ = await asyncio.wait(pulls, timeout=self.delay)
+                    if done:
+                        break
+
+            pending = set(pulls)
+            errors: Dict[int, BaseException] = {}
+            while winner is None and pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in sorted(done, key=pulls.__getitem__):
+                    if task.exception() is None:
+                        winner, first = pulls[task], task.result()
+                        break
+                    errors[pulls[task]] = task.exception()
+            await _discard(list(pending))
+            if winner is None:
+                raise errors[min(errors)]
+            for index, stream in enumerate(streams):
+                if index != winner:
+                    await close_stream(stream)
+
+            chunk = first
+            while chunk is not STREAM_END:
+                if chunk.final is not None:
+                    chunk = dataclasses.replace(
+                        chunk, final=self._tag(chunk.final, winner)
+                    )
+                yield chunk
+                chunk = await _pull(streams[winner])
+        finally:
+            await _discard([task for task in pulls if not task.done()])
+            for stream in streams:
+                await close_stream(stream)
+
+
+__all__ = ["HedgedModel"]
@@ -0,0 +1,180 @@
+"""Immutable, append-only message history.
+
+The loop, the events it emits and the `RunResult` all hold the same
+conversation. With plain lists each of them needed a defensive deep copy,
+because the nested `tool_calls` lists are mutable and a later in-place edit
+would rewrite an already-emitted event. Freezing messages once, on the way in,
+makes sharing safe, and an append-only vector makes a snapshot O(1).
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, overload
+
+
+def _immutable(self: Any, *args: Any, **kwargs: Any) -> None:
+    raise TypeError(
+        f"{type(self).__name__} is shared between the loop and its events and "
+        "cannot be modified; copy it first (dict(m), list(m))."
+    )
+
+
+class FrozenDict(dict):
+    """A dict that refuses mutation.
+
+    Still a real `dict`, so providers, `json.dumps` and equality against plain
+    dicts all work unchanged.
+    """
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[str, Any]:
+        # a deep copy is a request for something the caller may edit
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self) -> Any:
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """A list that refuses mutation. See `FrozenDict`."""
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = clear = extend = insert = pop = remove = reverse = sort = _immutable
+
+    def __copy__(self) -> List[Any]:
+        return list(self)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> List[Any]:
+        return [copy.deepcopy(item, memo) for item in self]
+
+    def __reduce__(self) -> Any:
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists to their frozen counterparts.
+
+    Already-frozen values are returned as-is, so refreezing a replayed history
+    costs nothing.
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """A plain, mutable deep copy, for code that edits messages in place."""
+    return copy.deepcopy(value)
+
+
+class MessageHistory(Sequence[Dict[str, Any]]):
+    """A persistent vector of frozen messages.
+
+    Views share one backing list. Extending a view that ends at the tip of the
+    backing list appends in place, which is the loop's only pattern, so each
+    turn costs only what it adds. Extending an older view forks a copy, so no
+    view ever sees a message appended through another.
+    """
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        if isinstance(messages, MessageHistory):
+            self._items = messages._items
+            self._start, self._stop = messages._start, messages._stop
+            return
+        self._items: List[Dict[str, Any]] = [freeze(m) for m in messages]
+        self._start = 0
+        self._stop = len(self._items)
+
+    @classmethod
+    def _view(cls, items: List[Any], start: int, stop: int) -> "MessageHistory":
+        view = object.__new__(cls)
+        view._items, view._start, view._stop = items, start, stop
+        return view
+
+    def extended(self, messages: Iterable[Dict[str, Any]]) -> "MessageHistory":
+        """Return a history with `messages` added; this one is unchanged."""
+        added = [freeze(m) for m in messages]
+        if self._stop == len(self._items):
+            self._items.extend(added)
+            return self._view(self._items, self._start, len(self._items))
+        items = self._items[self._start : self._stop] + added
+        return self._view(items, 0, len(items))
+
+    def appended(self, message: Dict[str, Any]) -> "MessageHistory":
+        """Return a history with one message added; this one is unchanged."""
+        return self.extended((message,))
+
+    def tolist(self) -> List[Dict[str, Any]]:
+        """The messages as a plain list. Shallow: the messages stay shared."""
+        return self._items[self._start : self._stop]
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.tolist())
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "MessageHistory": ...
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return MessageHistory(self.tolist()[index])
+            stop = max(start, stop)
+            return self._view(self._items, self._start + start, self._start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MessageHistory index out of range")
+        return self._items[self._start + index]
+
+    def __add__(self, other: Iterable[Dict[str, Any]]) -> "MessageHistory":
+        return self.extended(other)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MessageHistory):
+            return self.tolist() == other.tolist()
+        if isinstance(other, (list, tuple)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"MessageHistory({self.tolist()!r})"
+
+    def __copy__(self) -> "MessageHistory":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> List[Dict[str, Any]]:
+        # what `dataclasses.asdict` reaches for; a plain list keeps the event
+        # JSON-serialisable
+        return [copy.deepcopy(m, memo) for m in self.tolist()]
+
+    def __reduce__(self) -> Any:
+        return (MessageHistory, (self.tolist(),))
+
+
+__all__ = ["FrozenDict", "FrozenList", "MessageHistory", "freeze", "thaw"]
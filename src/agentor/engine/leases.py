@@ -0,0 +1,178 @@
+"""Leases: which worker may write a run.
+
+Without them, two workers can both resume the same interrupted run and both
+re-run its side-effecting tools. A store that supports leases lets one owner
+at a time hold a run for `ttl` seconds; the holder renews it (its heartbeat)
+while the run goes on, and if the holder dies the lease expires and another
+worker may take the run over. `AgentLoop` holds a lease for every run it
+writes to such a store, and `RecoveryWorker` takes over the ones that expire.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+#: seconds a lease lasts without a heartbeat
+DEFAULT_LEASE_TTL = 30.0
+
+#: share of the ttl before expiry at which a holder stops counting on the
+#: lease: its renewals take time to land, and another worker's clock may run
+#: ahead of its own
+_EXPIRY_MARGIN = 0.1
+
+
+class LeaseHeldError(RuntimeError):
+    """The run is leased by another worker: live elsewhere, or being recovered."""
+
+
+def supports_leases(store: Any) -> bool:
+    """Whether `store` has `acquire_lease`, `renew_lease` and `release_lease`.
+
+    `acquire_lease(run_id, owner, ttl)` takes the lease if nobody else holds
+    an unexpired one, or extends it for `owner`; `renew_lease` only extends
+    one `owner` still holds; both return whether `owner` now holds it.
+    `release_lease(run_id, owner)` gives up a lease `owner` holds. A store
+    sets `leasing = False` where they cannot work.
+
+    A store with `fences_writes = True` also takes `lease_owner=` on `append`
+    and `aappend`, and raises `LeaseHeldError` rather than record an event
+    while another owner holds the run's lease.
+    """
+    return getattr(store, "leasing", True) and all(
+        hasattr(store, name)
+        for name in ("acquire_lease", "renew_lease", "release_lease")
+    )
+
+
+class Lease:
+    """One owner's lease on one run, renewed in the background while held.
+
+    Args:
+        store: A store for which `supports_leases` is True.
+        run_id: The run to lease.
+        ttl: Seconds the lease lasts without a heartbeat. Heartbeats go out
+            every third of it, so two can fail before it lapses.
+        owner: Who holds it. Unique per lease by default, so two runs of the
+            same run id in one process exclude each other too.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        run_id: str,
+        ttl: float = DEFAULT_LEASE_TTL,
+        owner: Optional[str] = None,
+    ):
+        self.store = store
+        self.run_id = run_id
+        self.ttl = ttl
+        self.owner = owner or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self._lost = False
+        #: `time.monotonic()` when the last successful acquire or renew was
+        #: sent; the lease is good for `ttl` from then
+        self._renewed = float("-inf")
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def lost(self) -> bool:
+        """Whether the run is no longer this holder's to continue.
+
+        True once a heartbeat finds another owner holding the lease, or the
+        store refuses a write, and also once heartbeats have failed for
+        nearly `ttl`: another worker may take the run over from then on, so
+        a stalled holder must stop before it does.
+        """
+        if self._lost:
+            return True
+        return time.monotonic() >= self._renewed + self.ttl * (1 - _EXPIRY_MARGIN)
+
+    def mark_lost(self) -> None:
+        """Record that another owner has the run, as the store reported."""
+        self._lost = True
+
+    def check(self) -> None:
+        """Raise `LeaseHeldError` if the lease is `lost`.
+
+        Called before each model call and tool call, so work with side
+        effects never starts once another worker may be running the same run.
+        """
+        if self.lost:
+            raise LeaseHeldError(
+                f"Lost the lease on run {self.run_id!r}; another worker may have it."
+            )
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        # always on a worker, whatever the store's `blocking` says: that is
+        # about appends, and a store whose appends are queued (FileStore's
+        # "async" durability) still takes a file lock to change a lease
+        return await asyncio.to_thread(method, *args)
+
+    async def acquire(self) -> None:
+        """Take the lease, or raise `LeaseHeldError`."""
+        sent = time.monotonic()
+        held = await self._call(
+            self.store.acquire_lease, self.run_id, self.owner, self.ttl
+        )
+        if not held:
+            raise LeaseHeldError(f"Run {self.run_id!r} is leased by another worker.")
+        self._renewed = sent
+        self._heartbeat = asyncio.create_task(self._renew())
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            sent = time.monotonic()
+            try:
+                held = await self._call(
+                    self.store.renew_lease, self.run_id, self.owner, self.ttl
+                )
+            except Exception as e:
+                # the next heartbeat may still land before the lease lapses;
+                # if none does, `lost` turns True on its own
+                logger.warning(
+                    "Renewing the lease on run %s failed: %s", self.run_id, e
+                )
+                continue
+            if held:
+                self._renewed = sent
+            else:
+                self._lost = True
+                logger.error(
+                    "Lost the lease on run %s to another worker; it stops here",
+                    self.run_id,
+                )
+                return
+
+    async def release(self) -> None:
+        """Stop the heartbeat and give the lease up."""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._lost:
+            # someone else's now
+            return
+        try:
+            await self._call(self.store.release_lease, self.run_id, self.owner)
+        except Exception as e:
+            # it expires on its own
+            logger.warning("Releasing the lease on run %s failed: %s", self.run_id, e)
+
+    async def __aenter__(self) -> "Lease":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.release()
+
+
+__all__ = ["DEFAULT_LEASE_TTL", "Lease", "LeaseHeldError", "supports_leases"]
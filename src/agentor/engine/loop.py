@@ -8,16 +8,31 @@ is emitted as an `Event`, and `arun`/`run` are projections of `astream`.
 from __future__ import annotations
 
 import asyncio
-import copy
 import json
 import logging
 import time
-from contextlib import asynccontextmanager
-from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
 
+from agentor.engine.cache import cache_get, cache_key, cache_set
 from agentor.engine.events import Event, RunResult, Usage
-from agentor.engine.models import Model, ModelResponse, ToolCall, resolve_model
-from agentor.engine.tools import Tool, resolve_tools
+from agentor.engine.fallback import FallbackModel
+from agentor.engine.history import MessageHistory
+from agentor.engine.leases import (
+    DEFAULT_LEASE_TTL,
+    Lease,
+    LeaseHeldError,
+    supports_leases,
+)
+from agentor.engine.models import (
+    Model,
+    ModelResponse,
+    ToolCall,
+    format_args,
+    resolve_model,
+)
+from agentor.engine.streaming import DEFAULT_BUFFER, Overflow, RunHandle
+from agentor.engine.tools import ConcurrencyLimit, SchemaCache, Tool, resolve_tools
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +72,30 @@ def _strictify(node: Any) -> Any:
     return node
 
 
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds until a `time.monotonic()` deadline, for `asyncio.timeout`."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+# slot releases waiting on an abandoned tool thread; referenced until they run
+_releasing: Set[asyncio.Task] = set()
+
+
+def _release_when_done(worker: asyncio.Future, slots: AsyncExitStack) -> None:
+    def release(_: asyncio.Future) -> None:
+        if not worker.cancelled() and worker.exception() is not None:
+            # nobody awaits an abandoned call; retrieving its error here keeps
+            # asyncio from reporting it as never retrieved
+            logger.debug("Abandoned tool call failed: %r", worker.exception())
+        task = asyncio.ensure_future(slots.aclose())
+        _releasing.add(task)
+        task.add_done_callback(_releasing.discard)
+
+    worker.add_done_callback(release)
+
+
 def _clone_server(server: Any) -> Any:
     """Build a fresh, unconnected copy of an MCP server template."""
     clone = object.__new__(type(server))
@@ -107,6 +146,15 @@ class AgentLoop:
         store: Any = None,
         mcp_servers: Optional[List[Any]] = None,
         output_type: Any = None,
+        eager_tools: bool = False,
+        max_concurrent_tools: Optional[int] = None,
+        tool_timeout: Optional[float] = None,
+        run_timeout: Optional[float] = None,
+        history_policy: Any = None,
+        fallback_models: Optional[List[Any]] = None,
+        semantic_cache: Any = None,
+        checkpoint_every: Optional[int] = None,
+        lease_ttl: float = DEFAULT_LEASE_TTL,
         **model_params: Any,
     ):
         self.name = name
@@ -120,11 +168,61 @@ class AgentLoop:
         self.store = store
         self.mcp_servers = list(mcp_servers or [])
         self.output_type = output_type
+        #: stream every model call and start each tool as soon as its
+        #: arguments are complete, rather than after the whole response. Off by
+        #: default: if the stream then fails, a side-effecting tool has run
+        #: with no generation in the log to show why
+        self.eager_tools = eager_tools
+        #: a bulkhead over every tool call this loop makes, across concurrent
+        #: runs and `with_model` clones. Sync tools run on the default thread
+        #: pool, so without one a wide fan-out can take all of it
+        self.tool_limit = (
+            ConcurrencyLimit(max_concurrent_tools)
+            if max_concurrent_tools is not None
+            else None
+        )
+        #: seconds any one tool call may take, unless the tool sets its own
+        self.tool_timeout = tool_timeout
+        #: seconds from the start of a run after which no tool call may still
+        #: be running, and the run ends "failed" once its tools return. A hung
+        #: tool otherwise holds its run, and the worker slot serving it,
+        #: forever
+        self.run_timeout = run_timeout
+        #: decides what of the conversation is sent each turn, e.g. a
+        #: `ContextWindow`. Events still record the whole conversation, so
+        #: replay and resume are unaffected, and re-apply it
+        self.history_policy = history_policy
+        #: a `SemanticCache` answering single-prompt runs from similar
+        #: earlier ones. Runs that called a tool are never stored
+        self.semantic_cache = semantic_cache
+        #: emit a `checkpoint` every this many turns: the whole conversation
+        #: and the run's usage so far, so resuming (with a store that supports
+        #: `load_tail`) reads the log from the latest one rather than from
+        #: the start
+        self.checkpoint_every = checkpoint_every
+        #: seconds a run's lease lasts without a heartbeat, with a store that
+        #: supports leases: how long a crashed worker's runs wait before
+        #: another may take them over
+        self.lease_ttl = lease_ttl
         self._response_format = _response_format(output_type)
         self.model: Model = resolve_model(
             model, api_key=api_key, base_url=base_url, **model_params
         )
+        if fallback_models:
+            # per turn, so a provider hiccup costs one request, not the run;
+            # fallbacks share the key and parameters but not the base_url,
+            # which belongs to the primary's provider
+            self.model = FallbackModel(
+                self.model,
+                [
+                    resolve_model(fallback, api_key=api_key, **model_params)
+                    for fallback in fallback_models
+                ],
+            )
         self.tools: Dict[str, Tool] = {t.name: t for t in resolve_tools(tools)}
+        # shared by every run and with_model clone of this loop, so the payload
+        # for a given tool set is built once rather than per turn
+        self._schema_cache = SchemaCache()
 
     def _tracer_for_run(self, tracing: Any) -> Any:
         """Resolve which tracer, if any, a single run should use.
@@ -162,13 +260,13 @@ class AgentLoop:
 
     # ------------------------------------------------------------ messages
 
-    def _initial_messages(self, input: MessageInput) -> List[Dict[str, Any]]:
+    def _initial_messages(self, input: MessageInput) -> MessageHistory:
         if isinstance(input, str):
             messages: List[Dict[str, Any]] = []
             if self.instructions:
                 messages.append({"role": "system", "content": self.instructions})
             messages.append({"role": "user", "content": input})
-            return messages
+            return MessageHistory(messages)
 
         messages = list(input)
         # A replayed run, or a caller supplying their own history, already
@@ -177,7 +275,7 @@ class AgentLoop:
         has_system = any(m.get("role") == "system" for m in messages)
         if self.instructions and not has_system:
             messages.insert(0, {"role": "system", "content": self.instructions})
-        return messages
+        return MessageHistory(messages)
 
     @staticmethod
     def _assistant_message(response: ModelResponse) -> Dict[str, Any]:
@@ -193,12 +291,12 @@ class AgentLoop:
             ]
         return message
 
-    @staticmethod
     def _schemas(
-        tools: Dict[str, Tool], disabled: set[str]
+        self, tools: Dict[str, Tool], disabled: set[str]
     ) -> Optional[List[Dict[str, Any]]]:
-        schemas = [t.to_openai() for name, t in tools.items() if name not in disabled]
-        return schemas or None
+        return self._schema_cache.get(
+            t for name, t in tools.items() if name not in disabled
+        )
 
     # ------------------------------------------------------------ execution
 
@@ -207,8 +305,14 @@ class AgentLoop:
         call: ToolCall,
         tools: Optional[Dict[str, Tool]] = None,
         disabled: set[str] = frozenset(),
+        deadline: Optional[float] = None,
+        lease: Optional[Lease] = None,
     ) -> Event:
         tools = self.tools if tools is None else tools
+        if lease is not None:
+            # a tool may have side effects; never start one another worker
+            # may be running too
+            lease.check()
         try:
             args = json.loads(call.arguments or "{}")
         except json.JSONDecodeError as exc:
@@ -245,33 +349,112 @@ class AgentLoop:
                 result=f"Error: unknown tool {call.name!r}. Available tools: {known}.",
             )
 
-        started = time.time()
+        key = tool.cache_key(args) if tool.cache is not None else None
+        if key is not None:
+            hit = await cache_get(tool.cache, key, "Tool cache")
+            if hit is not None:
+                now = time.time()
+                return Event(
+                    type="tool_result",
+                    name=call.name,
+                    args=args,
+                    call_id=call.id,
+                    result=hit,
+                    cached=True,
+                    started_at=now,
+                    ended_at=now,
+                )
+
+        # The tool's own limit first: waiting on it while holding a slot of
+        # the loop-wide one would leave that slot idle for every other tool.
+        limits = [limit for limit in (tool.limit, self.tool_limit) if limit]
+        queued = time.time() if limits else None
+        timeout = tool.timeout if tool.timeout is not None else self.tool_timeout
+        started: Optional[float] = None
+        run_scope = tool_scope = None
+        abandoned: List[asyncio.Future] = []
         try:
-            result = await tool.call(args, context=self.context)
+            # The run deadline covers queueing too; the tool's own timeout only
+            # starts once it holds its slots.
+            async with asyncio.timeout(_remaining(deadline)) as run_scope:
+                async with AsyncExitStack() as slots:
+                    for limit in limits:
+                        await slots.enter_async_context(limit.slot())
+                    started = time.time()
+                    try:
+                        async with asyncio.timeout(timeout) as tool_scope:
+                            result = await tool.call(
+                                args,
+                                context=self.context,
+                                deadline=deadline,
+                                abandoned=abandoned,
+                            )
+                    finally:
+                        if abandoned:
+                            # a timed-out sync tool is still running on its
+                            # thread: it keeps its slots until it returns, or
+                            # the bulkhead would admit more than its limit
+                            _release_when_done(abandoned[0], slots.pop_all())
+            if key is not None:
+                # only successes are stored: a failure may be transient, and
+                # caching it would replay it for the whole ttl
+                await cache_set(tool.cache, key, result, tool.cache_ttl, "Tool cache")
             return Event(
                 type="tool_result",
                 name=call.name,
                 args=args,
                 call_id=call.id,
                 result=result,
+                cached=False if key is not None else None,
+                queued_at=queued,
                 started_at=started,
                 ended_at=time.time(),
             )
         except Exception as exc:
+            if tool_scope is not None and tool_scope.expired():
+                error = f"TimeoutError: tool {call.name!r} timed out after {timeout}s"
+            elif run_scope is not None and run_scope.expired():
+                error = (
+                    f"TimeoutError: run deadline reached before {call.name!r} finished"
+                )
+            else:
+                error = f"{type(exc).__name__}: {exc}"
             # Surfaced to the model rather than raised: a failing tool is
-            # usually recoverable, and the failure budget stops it looping.
-            logger.warning("Tool %s failed: %s", call.name, exc, exc_info=True)
+            # usually recoverable, and the failure budget stops it looping -
+            # a tool that keeps hanging included.
+            logger.warning("Tool %s failed: %s", call.name, error, exc_info=True)
             return Event(
                 type="tool_result",
                 name=call.name,
                 args=args,
                 call_id=call.id,
-                error=f"{type(exc).__name__}: {exc}",
-                result=f"Error: {type(exc).__name__}: {exc}",
+                error=error,
+                result=f"Error: {error}",
+                cached=False if key is not None else None,
+                queued_at=queued,
                 started_at=started,
                 ended_at=time.time(),
             )
 
+    async def _collect_tool(
+        self,
+        call: ToolCall,
+        started: Dict[str, Tuple[ToolCall, asyncio.Task]],
+        tools: Dict[str, Tool],
+        disabled: set[str],
+        deadline: Optional[float] = None,
+        lease: Optional[Lease] = None,
+    ) -> Event:
+        """Result for one call, reusing the run started while streaming."""
+        early = started.pop(call.id, None)
+        if early is not None:
+            early_call, task = early
+            if (early_call.name, early_call.arguments) == (call.name, call.arguments):
+                return await task
+            # the final response disagrees with what was announced; trust it
+            task.cancel()
+        return await self._run_tool(call, tools, disabled, deadline, lease)
+
     # ------------------------------------------------------------ the loop
 
     @asynccontextmanager
@@ -319,6 +502,8 @@ class AgentLoop:
         run_id: Optional[str] = None,
         max_turns: Optional[int] = None,
         tracing: Any = None,
+        prior_usage: Optional[Usage] = None,
+        lease: Optional[Lease] = None,
     ) -> AsyncIterator[Event]:
         """Run the agent, emitting every event, tracing and persisting it.
 
@@ -326,9 +511,19 @@ class AgentLoop:
         it, False turns it off, True requires one. Useful when a particular
         input must not leave the process.
 
+        `prior_usage` is what earlier segments of the run cost, when this one
+        continues it; checkpoints count it, `run_end` does not.
+
+        With a store that supports leases, the run holds a lease on `run_id`
+        throughout, and raises `LeaseHeldError` if another worker has it;
+        `lease` is one the caller already holds.
+
         Note that a consumer which abandons this generator early stops the
-        trace from being exported; `arun` always drains it.
+        trace from being exported, and a slow one slows the run; `arun` always
+        drains it, and `start` runs it independently of any consumer.
         """
+        from agentor.engine.store import aappend
+
         tracer = self._tracer_for_run(tracing)
         collector = (
             tracer.collector(
@@ -339,6 +534,13 @@ class AgentLoop:
             if tracer
             else None
         )
+
+        owned: Optional[Lease] = None
+        if lease is None and run_id is not None and supports_leases(self.store):
+            # before anything is written: the run may be another worker's. Last
+            # of the setup, as nothing releases it until the run's `finally`
+            lease = owned = Lease(self.store, run_id, self.lease_ttl)
+            await owned.acquire()
         run_started = time.time()
 
         async def record(event: Event) -> None:
@@ -347,12 +549,26 @@ class AgentLoop:
                     collector.handle(event)
                 except Exception as e:  # tracing must never break a run
                     logger.warning("Trace collection failed: %s", e)
+            if lease is not None and lease.lost:
+                # the run is another worker's now; its log is not ours to add to
+                return
             if self.store is not None and run_id is not None:
                 try:
-                    # FileStore fsyncs every event. Awaiting it on a worker
-                    # keeps ordering while leaving the event loop free for
-                    # other runs and streams.
-                    await asyncio.to_thread(self.store.append, run_id, event)
+                    # FileStore fsyncs every event (unless told otherwise).
+                    # Awaiting it keeps ordering while leaving the event loop
+                    # free for other runs and streams: through the store's
+                    # own `aappend` where it has one, else on a worker.
+                    await aappend(
+                        self.store,
+                        run_id,
+                        event,
+                        lease_owner=lease.owner if lease is not None else None,
+                    )
+                except LeaseHeldError as e:
+                    # the store fenced the write off: another worker has the
+                    # run, and the next check stops this one
+                    lease.mark_lost()
+                    logger.error("Dropped an event for run %s: %s", run_id, e)
                 except Exception as e:
                     # Losing durability is bad, but killing a live run over it
                     # is worse; the run is still returned to the caller.
@@ -366,16 +582,25 @@ class AgentLoop:
             agent=self.name,
             model=getattr(self.model, "model", None),
             started_at=run_started,
-            messages=[dict(m) for m in messages],
+            # frozen, so the event can share it with the loop rather than copy
+            messages=messages,
         )
-        await record(start)
-        yield start
 
         try:
+            await record(start)
+            yield start
             async with self._connected_mcp_tools() as tools:
                 async for event in self._astream(
-                    messages, stream_text, tools, max_turns, run_started
+                    messages,
+                    stream_text,
+                    tools,
+                    max_turns,
+                    run_started,
+                    prior_usage,
+                    lease,
                 ):
+                    if lease is not None:
+                        lease.check()
                     await record(event)
                     yield event
         except Exception as exc:
@@ -393,19 +618,96 @@ class AgentLoop:
             yield failure
             raise
         finally:
+            if owned is not None:
+                await owned.release()
             if collector is not None:
                 try:
                     await asyncio.to_thread(tracer.export, collector)
                 except Exception as e:
                     logger.warning("Trace export failed: %s", e)
 
+    def start(
+        self,
+        input: MessageInput,
+        stream_text: bool = False,
+        run_id: Optional[str] = None,
+        max_turns: Optional[int] = None,
+        tracing: Any = None,
+        buffer: int = DEFAULT_BUFFER,
+        overflow: Overflow = "coalesce",
+    ) -> RunHandle:
+        """Start a run in its own task and return a handle to watch it.
+
+        The run goes at its own pace whatever its consumers do: each one
+        reads through a buffer of `buffer` events, and `overflow` decides what
+        happens when it falls that far behind (see `Overflow`). Must be called
+        from a running event loop.
+        """
+        return RunHandle(
+            self.astream(
+                input,
+                stream_text=stream_text,
+                run_id=run_id,
+                max_turns=max_turns,
+                tracing=tracing,
+            ),
+            buffer=buffer,
+            overflow=overflow,
+        )
+
+    def _semantic_prompt(self, messages: MessageHistory) -> Optional[str]:
+        """The prompt of a run the semantic cache may answer, if it is one.
+
+        Only a lone user message qualifies: further into a conversation, the
+        last message alone does not determine the answer.
+        """
+        rest = [m for m in messages if m.get("role") != "system"]
+        if len(rest) != 1 or rest[0].get("role") != "user":
+            return None
+        content = rest[0].get("content")
+        return content if isinstance(content, str) and content else None
+
+    def _semantic_scope(self, messages: MessageHistory, tools: Dict[str, Tool]) -> str:
+        # agents differing in anything that shapes the answer must not share
+        # entries, however similar their prompts
+        return cache_key(
+            getattr(self.model, "model", None),
+            getattr(self.model, "params", {}),
+            [m.get("content") for m in messages if m.get("role") == "system"],
+            sorted(tools),
+            self._response_format,
+        )
+
+    async def _semantic_lookup(
+        self, prompt: str, scope: str
+    ) -> Tuple[Any, Optional[str]]:
+        try:
+            return await asyncio.to_thread(self.semantic_cache.lookup, prompt, scope)
+        except Exception:
+            # a broken cache (or embedding provider) is a miss, never a
+            # failed run
+            logger.warning("Semantic cache lookup failed", exc_info=True)
+            return None, None
+
+    async def _semantic_store(
+        self, vector: Any, prompt: str, text: str, scope: str
+    ) -> None:
+        try:
+            await asyncio.to_thread(
+                self.semantic_cache.add, vector, prompt, text, scope
+            )
+        except Exception:
+            logger.warning("Semantic cache write failed", exc_info=True)
+
     async def _astream(
         self,
-        messages: List[Dict[str, Any]],
+        messages: MessageHistory,
         stream_text: bool = False,
         tools: Optional[Dict[str, Tool]] = None,
         max_turns: Optional[int] = None,
         run_started: Optional[float] = None,
+        prior_usage: Optional[Usage] = None,
+        lease: Optional[Lease] = None,
     ) -> AsyncIterator[Event]:
         tools = self.tools if tools is None else tools
         turn_budget = self.max_turns if max_turns is None else max_turns
@@ -417,87 +719,184 @@ class AgentLoop:
         # taken from the caller so run_start and run_end bound the same instant
         run_started = time.time() if run_started is None else run_started
 
-        for turn in range(1, turn_budget + 1):
-            schemas = self._schemas(tools, disabled)
-            # snapshot before the call: `messages` is appended to below, and a
-            # trace needs the request as it was actually sent. Deep, because a
-            # shallow copy shares the nested tool_calls list, so a later
-            # in-place edit would rewrite an already-emitted trace.
-            request_messages = copy.deepcopy(messages)
-            call_started = time.time()
+        # run_start already holds the input, so each generation only records
+        # what was appended after the request before it. A full snapshot per
+        # turn made the log and RunResult.events quadratic in run length.
+        recorded = len(messages)
 
-            if stream_text:
-                response = None
-                # only passed when set, so a Model adapter that predates
-                # structured output keeps working
-                extra = (self._response_format,) if self._response_format else ()
-                async for chunk in self.model.stream(messages, schemas, *extra):
-                    if chunk.delta:
-                        yield Event(type="text_delta", text=chunk.delta, turn=turn)
-                    if chunk.final is not None:
-                        response = chunk.final
-                if response is None:
-                    response = ModelResponse()
-            else:
-                extra = (self._response_format,) if self._response_format else ()
-                response = await self.model.complete(messages, schemas, *extra)
-
-            total = total + response.usage
-            assistant = self._assistant_message(response)
-            messages.append(assistant)
-
-            yield Event(
-                type="generation",
-                turn=turn,
-                model=model_name,
-                messages=request_messages,
-                text=response.content,
-                calls=assistant.get("tool_calls"),
-                usage=response.usage,
-                started_at=call_started,
-                ended_at=time.time(),
-            )
+        deadline = (
+            time.monotonic() + self.run_timeout
+            if self.run_timeout is not None
+            else None
+        )
 
-            if not response.tool_calls:
-                text = response.content or ""
-                if self.output_type is not None:
-                    # validate before declaring success, or the log and the
-                    # trace record a completed run the caller saw raise
-                    self._parse_output(text)
-                yield Event(type="message", text=text, turn=turn, usage=response.usage)
+        prompt = None
+        if self.semantic_cache is not None:
+            prompt = self._semantic_prompt(messages)
+        if prompt is not None:
+            scope = self._semantic_scope(messages, tools)
+            vector, hit = await self._semantic_lookup(prompt, scope)
+            if hit is not None:
+                # the same events as a one-turn run, so replay, resume and
+                # traces see an ordinary answer, marked as cached
+                now = time.time()
+                yield Event(
+                    type="generation",
+                    turn=1,
+                    model=model_name,
+                    cached=True,
+                    messages=messages[recorded:],
+                    base=recorded,
+                    text=hit,
+                    usage=Usage(),
+                    started_at=now,
+                    ended_at=now,
+                )
+                yield Event(type="message", text=hit, turn=1, usage=Usage())
                 yield Event(
                     type="run_end",
-                    text=text,
+                    text=hit,
                     status="completed",
-                    usage=total,
-                    turn=turn,
+                    usage=Usage(),
+                    turn=1,
                     started_at=run_started,
                     ended_at=time.time(),
                 )
                 return
+            if vector is None:
+                prompt = None
+
+        for turn in range(1, turn_budget + 1):
+            schemas = self._schemas(tools, disabled)
+            # The history is immutable, so this view is the request exactly as
+            # sent however far the run goes on, without copying it.
+            request_delta = messages[recorded:]
+            request_base, recorded = recorded, len(messages)
+            # providers and third-party adapters expect a list; this copies
+            # references, never the messages
+            sent = None
+            if self.history_policy is not None:
+                request = list(self.history_policy.apply(messages))
+                if len(request) != len(messages) or any(
+                    a is not b for a, b in zip(request, messages)
+                ):
+                    # the delta below is against the full history, so record
+                    # what the model actually received alongside it
+                    sent = request
+            else:
+                request = messages.tolist()
+            if lease is not None:
+                lease.check()
+            call_started = time.time()
+
+            # tool calls started while the response was still streaming
+            started: Dict[str, Tuple[ToolCall, asyncio.Task]] = {}
+            try:
+                if stream_text or self.eager_tools:
+                    response = None
+                    extra = format_args(self._response_format)
+                    async for chunk in self.model.stream(request, schemas, *extra):
+                        if chunk.delta and stream_text:
+                            yield Event(type="text_delta", text=chunk.delta, turn=turn)
+                        call = chunk.tool_call
+                        if (
+                            self.eager_tools
+                            and call is not None
+                            and call.id not in started
+                        ):
+                            # overlaps this tool's I/O with decoding the calls after it
+                            started[call.id] = (
+                                call,
+                                asyncio.create_task(
+                                    self._run_tool(
+                                        call, tools, disabled, deadline, lease
+                                    )
+                                ),
+                            )
+                        if chunk.final is not None:
+                            response = chunk.final
+                    if response is None:
+                        response = ModelResponse()
+                else:
+                    extra = format_args(self._response_format)
+                    response = await self.model.complete(request, schemas, *extra)
+
+                total = total + response.usage
+                assistant = self._assistant_message(response)
+                messages = messages.appended(assistant)
 
-            for call in response.tool_calls:
-                try:
-                    preview = json.loads(call.arguments or "{}")
-                except json.JSONDecodeError:
-                    preview = None
                 yield Event(
-                    type="tool_call",
-                    name=call.name,
-                    args=preview,
-                    call_id=call.id,
+                    type="generation",
                     turn=turn,
+                    model=response.model or model_name,
+                    hedge=response.hedge,
+                    cached=response.cached,
+                    messages=request_delta,
+                    base=request_base,
+                    sent=sent,
+                    text=response.content,
+                    calls=messages[-1].get("tool_calls"),
+                    usage=response.usage,
+                    started_at=call_started,
+                    ended_at=time.time(),
                 )
 
-            results = await asyncio.gather(
-                *(self._run_tool(call, tools, disabled) for call in response.tool_calls)
-            )
+                if not response.tool_calls:
+                    text = response.content or ""
+                    if self.output_type is not None:
+                        # validate before declaring success, or the log and the
+                        # trace record a completed run the caller saw raise
+                        self._parse_output(text)
+                    if prompt is not None and turn == 1 and text:
+                        # a first-turn answer called no tools, so nothing in
+                        # it depends on when or for whom the run happened
+                        await self._semantic_store(vector, prompt, text, scope)
+                    yield Event(
+                        type="message", text=text, turn=turn, usage=response.usage
+                    )
+                    yield Event(
+                        type="run_end",
+                        text=text,
+                        status="completed",
+                        usage=total,
+                        turn=turn,
+                        started_at=run_started,
+                        ended_at=time.time(),
+                    )
+                    return
+
+                for call in response.tool_calls:
+                    try:
+                        preview = json.loads(call.arguments or "{}")
+                    except json.JSONDecodeError:
+                        preview = None
+                    yield Event(
+                        type="tool_call",
+                        name=call.name,
+                        args=preview,
+                        call_id=call.id,
+                        turn=turn,
+                    )
+
+                results = await asyncio.gather(
+                    *(
+                        self._collect_tool(
+                            call, started, tools, disabled, deadline, lease
+                        )
+                        for call in response.tool_calls
+                    )
+                )
+            finally:
+                # Only calls the response did not end up making are left here,
+                # or any still in flight when the run is failing or abandoned.
+                for _, task in started.values():
+                    task.cancel()
 
             newly_disabled: List[str] = []
             for event in results:
                 event.turn = turn
                 yield event
-                messages.append(
+                messages = messages.appended(
                     {
                         "role": "tool",
                         "tool_call_id": event.call_id,
@@ -518,6 +917,20 @@ class AgentLoop:
                     disabled.add(event.name)
                     newly_disabled.append(event.name)
 
+            if deadline is not None and time.monotonic() >= deadline:
+                # the deadline bounds the run, not just the tools that hit it:
+                # another model turn would run past it
+                yield Event(
+                    type="run_end",
+                    status="failed",
+                    error=f"TimeoutError: run_timeout ({self.run_timeout}s) reached",
+                    usage=total,
+                    turn=turn,
+                    started_at=run_started,
+                    ended_at=time.time(),
+                )
+                return
+
             # Deferred until every tool result for this turn is in. Appending a
             # notice mid-loop splits the run of `tool` messages answering one
             # assistant turn, and providers reject that outright - so the budget
@@ -529,7 +942,7 @@ class AgentLoop:
             if turn < turn_budget:
                 for name in newly_disabled:
                     count = failures[name]
-                    messages.append(
+                    messages = messages.appended(
                         {
                             "role": "user",
                             "content": (
@@ -541,6 +954,16 @@ class AgentLoop:
                         }
                     )
 
+            if self.checkpoint_every and turn % self.checkpoint_every == 0:
+                # every tool result of the turn is in, so this is a state a
+                # resume can continue from as it stands
+                yield Event(
+                    type="checkpoint",
+                    turn=turn,
+                    messages=messages,
+                    usage=(prior_usage or Usage()) + total,
+                )
+
         yield Event(
             type="run_end",
             status="max_turns",
@@ -556,6 +979,8 @@ class AgentLoop:
         run_id: Optional[str] = None,
         max_turns: Optional[int] = None,
         tracing: Any = None,
+        prior_usage: Optional[Usage] = None,
+        lease: Optional[Lease] = None,
     ) -> RunResult:
         if self.store is not None and run_id is None:
             from agentor.engine.store import new_run_id
@@ -564,7 +989,12 @@ class AgentLoop:
 
         result = RunResult(run_id=run_id)
         async for event in self.astream(
-            input, run_id=run_id, max_turns=max_turns, tracing=tracing
+            input,
+            run_id=run_id,
+            max_turns=max_turns,
+            tracing=tracing,
+            prior_usage=prior_usage,
+            lease=lease,
         ):
             result.events.append(event)
             if event.type == "run_end":
@@ -613,23 +1043,36 @@ class AgentLoop:
         A completed run is returned as-is rather than re-executed, so calling
         this after a crash is safe whether or not the run had finished.
 
-        Not safe against concurrent resumes of the *same unfinished* run: two
-        callers can both see it as incomplete and continue it, re-running
-        side-effecting tools. The bundled stores are single-process and carry
-        no lease or lock; coordinate externally if several workers can recover
-        the same run.
+        With a store that supports it, only the log from the run's latest
+        checkpoint on is read, and the result's events start there.
+
+        With a store that supports leases (all the bundled ones but
+        `SegmentedStore`), the run is leased before its log is read and for as
+        long as it continues, so concurrent resumes of the same run, from any
+        number of processes, continue it once: the others raise
+        `LeaseHeldError`, as does resuming a run still live elsewhere. Without
+        leases two callers can both see it as incomplete and continue it,
+        re-running side-effecting tools; coordinate externally then.
         """
         if self.store is None:
             raise ValueError("resume() requires a store; pass store= to AgentLoop.")
-
+        if not supports_leases(self.store):
+            return await self._resume(run_id)
+        async with Lease(self.store, run_id, self.lease_ttl) as lease:
+            # read under the lease, so a run another worker just finished is
+            # seen as finished
+            return await self._resume(run_id, lease)
+
+    async def _resume(self, run_id: str, lease: Optional[Lease] = None) -> RunResult:
         from agentor.engine.store import (
+            aload_tail,
             final_event,
             is_complete,
             replay_messages,
             total_usage,
         )
 
-        events = self.store.load(run_id)
+        events = await aload_tail(self.store, run_id)
         if not events:
             raise KeyError(f"No persisted run with id {run_id!r}.")
 
@@ -654,7 +1097,9 @@ class AgentLoop:
                 f"Run {run_id!r} has no recoverable messages; start a new run."
             )
 
-        result = await self.arun(messages, run_id=run_id)
+        result = await self.arun(
+            messages, run_id=run_id, prior_usage=total_usage(events), lease=lease
+        )
         # the caller cares about the whole run, not just this continuation
         result.events = events + result.events
         # ...including what it cost. The continuation's run_end only counts its
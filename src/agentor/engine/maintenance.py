@@ -0,0 +1,160 @@
+"""Housekeeping for stored runs.
+
+    python -m agentor.engine.maintenance compact runs/
+    python -m agentor.engine.maintenance compact runs.sqlite --run <run_id>
+    python -m agentor.engine.maintenance gc runs/ --archive-after 7d --delete-after 90d
+
+`compact` rewrites each ended run's log down to its latest checkpoint and
+what follows it (see `AgentLoop(checkpoint_every=...)`). Runs still in flight
+are left alone unless named, since a rewrite can lose an event appended
+during it; with a store that supports leases, so is any run a worker holds
+(an ended run can still be resumed).
+
+`gc` applies a `Retention` policy once, or every `--interval` until killed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from agentor.engine.leases import DEFAULT_LEASE_TTL, supports_leases
+from agentor.engine.retention import Retention
+from agentor.engine.segments import SegmentedStore
+from agentor.engine.store import (
+    ARCHIVE_CODECS,
+    FileStore,
+    SqliteStore,
+    Store,
+    load_tail,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def open_store(path: str | Path) -> Store:
+    """The store at `path`: a `SqliteStore` for a `.sqlite`/`.db` file, a
+    `SegmentedStore` for a directory of segments, else a `FileStore`."""
+    path = Path(path)
+    if path.suffix in (".sqlite", ".sqlite3", ".db"):
+        return SqliteStore(path)
+    if (path / "index.sqlite").exists():
+        return SegmentedStore(path)
+    return FileStore(path)
+
+
+def compact(store: Store, run_ids: Optional[Iterable[str]] = None) -> int:
+    """Compact the given runs, or every ended one; the events dropped.
+
+    Each run is leased while it is rewritten, and one another worker holds
+    is skipped: `aresume` appends even to an ended run.
+    """
+    if getattr(store, "compact", None) is None:
+        raise TypeError(f"{type(store).__name__} does not support compaction")
+    if run_ids is None:
+        run_ids = [
+            run_id
+            for run_id in store.list_runs()
+            if (tail := load_tail(store, run_id)) and tail[-1].type == "run_end"
+        ]
+    leasing = supports_leases(store)
+    owner = f"compact:{socket.gethostname()}:{os.getpid()}"
+    dropped = 0
+    for run_id in run_ids:
+        # held while the run is rewritten, so nobody resumes it half way
+        if leasing and not store.acquire_lease(  # type: ignore[attr-defined]
+            run_id, owner, DEFAULT_LEASE_TTL
+        ):
+            logger.info("Skipped run %s: a worker holds it", run_id)
+            continue
+        try:
+            count = store.compact(run_id)  # type: ignore[attr-defined]
+        finally:
+            if leasing:
+                store.release_lease(run_id, owner)  # type: ignore[attr-defined]
+        if count:
+            logger.info("Compacted run %s: %d events dropped", run_id, count)
+        dropped += count
+    return dropped
+
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in "45s", "90m", "12h", "30d" or a plain number of seconds."""
+    unit = _UNITS.get(text[-1:].lower())
+    try:
+        return float(text[:-1]) * unit if unit else float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a duration: {text!r}") from None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m agentor.engine.maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact_parser = commands.add_parser(
+        "compact", help="Drop what precedes each ended run's latest checkpoint."
+    )
+    compact_parser.add_argument("store", help="FileStore directory or SQLite file")
+    compact_parser.add_argument(
+        "--run",
+        action="append",
+        dest="runs",
+        help="compact this run even if it has not ended (repeatable)",
+    )
+    gc_parser = commands.add_parser(
+        "gc", help="Archive ended runs and delete expired ones by age."
+    )
+    gc_parser.add_argument("store", help="FileStore directory or SQLite file")
+    gc_parser.add_argument(
+        "--archive-after",
+        type=parse_duration,
+        help="compress ended runs idle this long, e.g. 7d",
+    )
+    gc_parser.add_argument(
+        "--delete-after",
+        type=parse_duration,
+        help="delete runs idle this long, e.g. 90d",
+    )
+    gc_parser.add_argument("--codec", choices=sorted(ARCHIVE_CODECS), default="gzip")
+    gc_parser.add_argument(
+        "--interval",
+        type=parse_duration,
+        help="keep running, sweeping this often, instead of sweeping once",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    store = open_store(args.store)
+    if args.command == "compact":
+        dropped = compact(store, args.runs)
+        print(f"Dropped {dropped} events.")
+        return 0
+
+    if args.archive_after is None and args.delete_after is None:
+        parser.error("gc needs --archive-after and/or --delete-after")
+    try:
+        retention = Retention(
+            store, args.archive_after, args.delete_after, codec=args.codec
+        )
+    except TypeError as e:
+        parser.error(str(e))
+    if args.interval is not None:
+        asyncio.run(retention.run(args.interval))
+        return 0
+    report = retention.sweep()
+    print(f"Archived {len(report.archived)} runs, deleted {len(report.deleted)}.")
+    return 0
+
+
+__all__ = ["compact", "main", "open_store", "parse_duration"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
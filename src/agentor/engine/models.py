@@ -8,11 +8,29 @@ Fireworks, DeepSeek, xAI, Mistral, vLLM and Ollama all expose one, so pointing
 
 from __future__ import annotations
 
+import json
 import os
 from dataclasses import dataclass, field
-from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, runtime_checkable
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    runtime_checkable,
+)
 
 from agentor.engine.events import Usage
+from agentor.engine.history import thaw
+from agentor.engine.retry import (
+    DEFAULT_RETRY,
+    RetryPolicy,
+    call_with_retry,
+    circuit_breaker,
+    stream_with_retry,
+)
 
 
 @dataclass
@@ -30,6 +48,13 @@ class ModelResponse:
     usage: Usage = field(default_factory=Usage)
     #: provider payload, for tracing
     raw: Any = None
+    #: the model that served this response, when a wrapper chose between
+    #: several; None means the agent's own model
+    model: Optional[str] = None
+    #: set by `HedgedModel`: 0 when the first request won, 1 when the hedge did
+    hedge: Optional[int] = None
+    #: set by `CachedModel`: True when served from its cache
+    cached: Optional[bool] = None
 
 
 @dataclass
@@ -38,6 +63,10 @@ class StreamChunk:
 
     delta: Optional[str] = None
     final: Optional[ModelResponse] = None
+    #: a tool call whose arguments are complete, sent as soon as that is known
+    #: rather than with `final`, so the loop can start it while later calls
+    #: are still streaming. `final` still lists every call.
+    tool_call: Optional[ToolCall] = None
 
 
 @runtime_checkable
@@ -57,6 +86,15 @@ class Model(Protocol):
     ) -> AsyncIterator[StreamChunk]: ...
 
 
+def format_args(response_format: Optional[Dict[str, Any]]) -> Tuple[Any, ...]:
+    """The trailing arguments for `Model.complete` / `Model.stream`.
+
+    `response_format` is only passed when set, so a Model adapter that
+    predates structured output keeps working.
+    """
+    return (response_format,) if response_format else ()
+
+
 def _usage(raw: Any) -> Usage:
     usage = getattr(raw, "usage", None)
     if usage is None:
@@ -68,8 +106,24 @@ def _usage(raw: Any) -> Usage:
     )
 
 
+def _mutable(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Thaw the loop's frozen messages for a client that may edit them.
+
+    Several litellm provider transforms rewrite messages (and tool schemas)
+    in place. The OpenAI client only reads them, so ChatCompletionsModel skips
+    this copy.
+    """
+    return thaw(list(messages))
+
+
 class ChatCompletionsModel:
-    """Any OpenAI-compatible chat-completions endpoint."""
+    """Any OpenAI-compatible chat-completions endpoint.
+
+    Transient failures (429, 5xx, timeouts) are retried per `retry`, and a
+    circuit breaker shared by everything calling the same model and
+    `base_url` fails fast while the endpoint is down. `retry=None` turns both
+    off.
+    """
 
     def __init__(
         self,
@@ -77,10 +131,13 @@ class ChatCompletionsModel:
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         client: Any = None,
+        retry: Optional[RetryPolicy] = DEFAULT_RETRY,
         **params: Any,
     ):
         self.model = model
         self.params = params
+        self.retry = retry
+        self._breaker = circuit_breaker(model, base_url, retry)
 
         if client is not None:
             self.client = client
@@ -90,6 +147,9 @@ class ChatCompletionsModel:
             self.client = AsyncOpenAI(
                 api_key=api_key or os.environ.get("OPENAI_API_KEY"),
                 base_url=base_url,
+                # retried here instead, where Retry-After and the breaker are
+                # applied; two layers would multiply the attempts
+                **({"max_retries": 0} if retry is not None else {}),
             )
 
     def _request(
@@ -115,8 +175,11 @@ class ChatCompletionsModel:
         tools: Optional[List[Dict]] = None,
         response_format: Optional[Dict[str, Any]] = None,
     ) -> ModelResponse:
-        raw = await self.client.chat.completions.create(
-            **self._request(messages, tools, response_format)
+        request = self._request(messages, tools, response_format)
+        raw = await call_with_retry(
+            lambda: self.client.chat.completions.create(**request),
+            self.retry,
+            self._breaker,
         )
         message = raw.choices[0].message
         return ModelResponse(
@@ -133,7 +196,20 @@ class ChatCompletionsModel:
             raw=raw,
         )
 
-    async def stream(
+    def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        # retried only until the first chunk; see stream_with_retry
+        return stream_with_retry(
+            lambda: self._stream(messages, tools, response_format),
+            self.retry,
+            self._breaker,
+        )
+
+    async def _stream(
         self,
         messages: List[Dict[str, Any]],
         tools: Optional[List[Dict]] = None,
@@ -148,8 +224,19 @@ class ChatCompletionsModel:
         # reliable key, and id/name may appear in a later chunk than the first
         # for that index.
         partial: Dict[int, Dict[str, str]] = {}
+        announced: set[int] = set()
         usage = Usage()
 
+        def finished(index: int) -> Optional[ToolCall]:
+            """The call at `index`, once, if it has what it needs to run."""
+            slot = partial[index]
+            if index in announced or not slot["id"] or not slot["name"]:
+                return None
+            announced.add(index)
+            return ToolCall(
+                id=slot["id"], name=slot["name"], arguments=slot["arguments"]
+            )
+
         try:
             stream = await self.client.chat.completions.create(**request)
         except TypeError:
@@ -172,6 +259,13 @@ class ChatCompletionsModel:
                 yield StreamChunk(delta=delta.content)
 
             for tc in delta.tool_calls or []:
+                if tc.index not in partial:
+                    # Calls stream one after another, so a new index means
+                    # every earlier one has all of its arguments.
+                    for index in sorted(i for i in partial if i < tc.index):
+                        call = finished(index)
+                        if call is not None:
+                            yield StreamChunk(tool_call=call)
                 slot = partial.setdefault(
                     tc.index, {"id": "", "name": "", "arguments": ""}
                 )
@@ -181,6 +275,18 @@ class ChatCompletionsModel:
                     slot["name"] = tc.function.name
                 if tc.function and tc.function.arguments:
                     slot["arguments"] += tc.function.arguments
+                    # Arguments are a JSON object; once it parses, nothing
+                    # valid can follow. Only tried on a closing brace, so a
+                    # long argument string is not reparsed per fragment.
+                    if slot["arguments"].rstrip().endswith("}"):
+                        try:
+                            json.loads(slot["arguments"])
+                        except json.JSONDecodeError:
+                            pass
+                        else:
+                            call = finished(tc.index)
+                            if call is not None:
+                                yield StreamChunk(tool_call=call)
 
         yield StreamChunk(
             final=ModelResponse(
@@ -200,10 +306,20 @@ class LiteLLMModel:
     Kept behind a lazy import so it costs nothing unless used.
     """
 
-    def __init__(self, model: str, api_key: Optional[str] = None, **params: Any):
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        retry: Optional[RetryPolicy] = DEFAULT_RETRY,
+        **params: Any,
+    ):
         self.model = model
         self.api_key = api_key
         self.params = params
+        self.retry = retry
+        self._breaker = circuit_breaker(
+            model, params.get("api_base") or params.get("base_url"), retry
+        )
 
     async def complete(
         self,
@@ -213,13 +329,17 @@ class LiteLLMModel:
     ) -> ModelResponse:
         import litellm
 
-        raw = await litellm.acompletion(
-            model=self.model,
-            messages=messages,
-            tools=tools or None,
-            api_key=self.api_key,
-            response_format=response_format,
-            **self.params,
+        raw = await call_with_retry(
+            lambda: litellm.acompletion(
+                model=self.model,
+                messages=_mutable(messages),
+                tools=thaw(tools) or None,
+                api_key=self.api_key,
+                response_format=response_format,
+                **self.params,
+            ),
+            self.retry,
+            self._breaker,
         )
         message = raw.choices[0].message
         return ModelResponse(
@@ -249,6 +369,8 @@ class LiteLLMModel:
         model = ChatCompletionsModel.__new__(ChatCompletionsModel)
         model.model = self.model
         model.params = self.params
+        model.retry = self.retry
+        model._breaker = self._breaker
 
         class _Shim:
             class chat:
@@ -256,6 +378,9 @@ class LiteLLMModel:
                     @staticmethod
                     async def create(**kwargs):
                         kwargs.pop("stream_options", None)
+                        kwargs["messages"] = _mutable(kwargs["messages"])
+                        if kwargs.get("tools"):
+                            kwargs["tools"] = thaw(kwargs["tools"])
                         return await litellm.acompletion(api_key=self.api_key, **kwargs)
 
         model.client = _Shim()
@@ -0,0 +1,107 @@
+"""Resuming runs whose worker died.
+
+After a crash or a rolling deploy, runs that were in flight are left without
+a `run_end`, and their leases stop being renewed. Every worker can run a
+`RecoveryWorker`: each scan finds the interrupted runs and resumes the ones
+whose lease has expired, a few at a time. The lease decides which worker gets
+each run, so running one per process recovers every run exactly once. Runs
+a live worker holds are left out of the scan where the store can say so
+(`leased`), so its cost follows the interrupted runs rather than the live
+ones:
+
+    worker = RecoveryWorker(AgentLoop(model=..., tools=..., store=store))
+    asyncio.create_task(worker.run())
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Iterator, List
+
+from agentor.engine.events import RunResult
+from agentor.engine.leases import LeaseHeldError, supports_leases
+from agentor.engine.store import alist_runs, last_event
+
+logger = logging.getLogger(__name__)
+
+
+class RecoveryWorker:
+    """Resumes interrupted runs once their lease has expired.
+
+    Args:
+        loop: An `AgentLoop` set up as the runs were (model, tools and a store
+            that supports leases); each run is continued with `aresume`.
+        concurrency: Most runs resumed at once by this worker.
+        interval: Seconds between scans, for `run`.
+    """
+
+    def __init__(self, loop: Any, concurrency: int = 4, interval: float = 30.0):
+        if loop.store is None or not supports_leases(loop.store):
+            # without leases every worker would resume every run
+            raise TypeError("RecoveryWorker needs a store that supports leases")
+        self.loop = loop
+        self.concurrency = concurrency
+        self.interval = interval
+
+    async def interrupted_runs(self) -> List[str]:
+        """Runs with no `run_end` and no unexpired lease: abandoned, as far
+        as the store can tell.
+
+        A store without `leased` cannot tell a live run from an abandoned one,
+        so all its incomplete runs are returned and the lease sorts them out
+        when each is resumed.
+        """
+        store = self.loop.store
+        if hasattr(store, "incomplete_runs"):
+            return await asyncio.to_thread(store.incomplete_runs, unleased=True)
+        leased = getattr(store, "leased", None)
+
+        def interrupted(run_ids: List[str]) -> List[str]:
+            return [
+                run_id
+                for run_id in run_ids
+                if not (leased is not None and leased(run_id))
+                and (end := last_event(store, run_id)) is not None
+                and end.type != "run_end"
+            ]
+
+        return await asyncio.to_thread(interrupted, await alist_runs(store))
+
+    async def recover(self) -> List[RunResult]:
+        """Scan once and resume every interrupted run whose lease is free.
+
+        Runs leased elsewhere, live or being recovered by another worker, are
+        left to their holder; a run that fails to resume is logged and
+        retried on the next scan. `concurrency` tasks take the runs in turn,
+        however many the scan finds.
+        """
+        recovered: List[RunResult] = []
+
+        async def drain(run_ids: Iterator[str]) -> None:
+            # the tasks share one iterator, so each run goes to exactly one
+            for run_id in run_ids:
+                try:
+                    recovered.append(await self.loop.aresume(run_id))
+                except LeaseHeldError:
+                    pass
+                except Exception as e:
+                    logger.error("Recovering run %s failed: %s", run_id, e)
+
+        run_ids = iter(await self.interrupted_runs())
+        await asyncio.gather(*(drain(run_ids) for _ in range(self.concurrency)))
+        if recovered:
+            logger.info("Recovered %d interrupted runs", len(recovered))
+        return recovered
+
+    async def run(self) -> None:
+        """Recover every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await self.recover()
+            except Exception as e:
+                logger.error("Recovery scan failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+__all__ = ["RecoveryWorker"]
@@ -0,0 +1,168 @@
+"""Exact-match caching of model responses.
+
+Evals, CI and repeated production prompts send byte-identical requests again
+and again. `CachedModel` answers those from a cache instead of the provider.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, replace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from agentor.engine.cache import Cache, MemoryCache, cache_get, cache_key, cache_set
+from agentor.engine.events import Usage
+from agentor.engine.models import (
+    Model,
+    ModelResponse,
+    StreamChunk,
+    ToolCall,
+    format_args,
+    resolve_model,
+)
+from agentor.engine.tools import ToolSchemas
+
+logger = logging.getLogger(__name__)
+
+#: bumped when the stored shape changes, so old entries miss rather than break
+_FORMAT = 1
+
+
+def _encode(response: ModelResponse, deltas: Optional[List[str]]) -> str:
+    return json.dumps(
+        {
+            "content": response.content,
+            "tool_calls": [asdict(call) for call in response.tool_calls],
+            "usage": asdict(response.usage),
+            "model": response.model,
+            "deltas": deltas,
+        }
+    )
+
+
+def _decode(value: str) -> tuple[ModelResponse, Optional[List[str]]]:
+    data = json.loads(value)
+    usage = Usage(**data["usage"])
+    response = ModelResponse(
+        content=data["content"],
+        tool_calls=[ToolCall(**call) for call in data["tool_calls"]],
+        # nothing was billed for this response; what it originally cost is
+        # reported as cached, so a hit is visible in the usage it reports
+        usage=Usage(cached_tokens=usage.total_tokens),
+        model=data["model"],
+        cached=True,
+    )
+    return response, data["deltas"]
+
+
+class CachedModel:
+    """Serve repeated requests from a cache; forward the rest to `model`.
+
+    The key covers everything that shapes the answer: the model and its
+    parameters, the messages, the tool schemas and `response_format`. Only a
+    byte-identical request hits, so this is safe for anything that would give
+    the same answer twice, and wrong for anything that should not (a
+    sampled, high-temperature reply meant to vary).
+
+    `cache` is a `MemoryCache` by default; a `SqliteCache` persists across
+    processes and restarts. Streams are cached as the chunks they produced
+    and replayed chunk by chunk. A hit is marked on the response (`cached`)
+    and costs nothing in its usage: the tokens it saved are reported as
+    `usage.cached_tokens`.
+
+    Usable anywhere a model is, e.g. `AgentLoop(model=CachedModel("gpt-4o"))`.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        cache: Optional[Cache] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.inner: Model = resolve_model(model)
+        self.cache: Cache = MemoryCache() if cache is None else cache
+        self.ttl = ttl
+        # what the loop reports as the agent's model
+        self.model = getattr(self.inner, "model", None)
+        self.params = getattr(self.inner, "params", {})
+        self.hits = 0
+        self.misses = 0
+
+    def _key(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]],
+        response_format: Optional[Dict[str, Any]],
+    ) -> str:
+        # the loop's schemas carry a digest already; hashing it is cheaper
+        # than re-serialising every schema on every turn
+        tool_key = tools.digest if isinstance(tools, ToolSchemas) else tools
+        return cache_key(
+            _FORMAT,
+            self.model,
+            self.params,
+            list(messages),
+            tool_key,
+            response_format,
+        )
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await cache_get(self.cache, key, "Response cache")
+
+    async def _set(self, key: str, value: str) -> None:
+        await cache_set(self.cache, key, value, self.ttl, "Response cache")
+
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> ModelResponse:
+        key = self._key(messages, tools, response_format)
+        hit = await self._get(key)
+        if hit is not None:
+            self.hits += 1
+            return _decode(hit)[0]
+        self.misses += 1
+        extra = format_args(response_format)
+        response = await self.inner.complete(messages, tools, *extra)
+        await self._set(key, _encode(response, None))
+        return replace(response, cached=False)
+
+    async def stream(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        key = self._key(messages, tools, response_format)
+        hit = await self._get(key)
+        if hit is not None:
+            self.hits += 1
+            response, deltas = _decode(hit)
+            if deltas is None:
+                # cached by complete(); one chunk carries the whole text
+                deltas = [response.content] if response.content else []
+            for delta in deltas:
+                yield StreamChunk(delta=delta)
+            for call in response.tool_calls:
+                yield StreamChunk(tool_call=call)
+            yield StreamChunk(final=response)
+            return
+
+        self.misses += 1
+        extra = format_args(response_format)
+        deltas: List[str] = []
+        async for chunk in self.inner.stream(messages, tools, *extra):
+            if chunk.delta:
+                deltas.append(chunk.delta)
+            if chunk.final is not None:
+                # stored only once the stream has completed: a partial
+                # response must never be replayed as a whole one
+                await self._set(key, _encode(chunk.final, deltas))
+                chunk = replace(chunk, final=replace(chunk.final, cached=False))
+            yield chunk
+
+
+__all__ = ["CachedModel"]
@@ -0,0 +1,142 @@
+"""Retention for stored runs: archive the old, delete the expired.
+
+Nothing else ever removes a run, so without this a store grows for as long as
+it is used. `Retention.sweep` compresses runs that ended a while ago, which
+`load` still reads, and deletes runs past their time-to-live. Run it as a
+background task (`Retention.run`) or from cron:
+
+    python -m agentor.engine.maintenance gc runs/ --archive-after 7d --delete-after 90d
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from agentor.engine.leases import DEFAULT_LEASE_TTL, supports_leases
+from agentor.engine.store import ARCHIVE_CODECS, Store, last_event
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionReport:
+    """What one sweep did."""
+
+    archived: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+
+class Retention:
+    """Age-based archiving and deletion for a store.
+
+    Args:
+        store: A store with `last_modified` and, for the operations used,
+            `archive` and `delete` (`FileStore` has all three; `SqliteStore`
+            and `MemoryStore` can delete). Where the store supports leases,
+            a run another worker holds the lease on is left alone, and the
+            sweep holds the lease itself while it works on a run.
+        archive_after: Seconds since a run's last event after which it is
+            compressed, if it has ended. None never archives.
+        delete_after: Seconds since a run's last event after which it is
+            deleted, ended or not: a run that quiet is abandoned. None never
+            deletes.
+        codec: "gzip", or "zstd" with the `zstandard` package installed.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        archive_after: Optional[float] = None,
+        delete_after: Optional[float] = None,
+        codec: str = "gzip",
+    ):
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Unknown archive codec: {codec!r}")
+        required = ["last_modified"]
+        if archive_after is not None:
+            required.append("archive")
+        if delete_after is not None:
+            required.append("delete")
+        missing = [name for name in required if not hasattr(store, name)]
+        if missing:
+            raise TypeError(
+                f"{type(store).__name__} does not support {', '.join(missing)}"
+            )
+        self.store: Any = store
+        self.archive_after = archive_after
+        self.delete_after = delete_after
+        self.codec = codec
+        self._leasing = supports_leases(store)
+        self._owner = f"retention:{socket.gethostname()}:{os.getpid()}"
+
+    def sweep(self, now: Optional[float] = None) -> RetentionReport:
+        """Apply the policy to every run once. Blocking; see `run`."""
+        now = time.time() if now is None else now
+        report = RetentionReport()
+        for run_id in self.store.list_runs():
+            modified = self.store.last_modified(run_id)
+            if modified is None:
+                continue
+            age = now - modified
+            expired = self.delete_after is not None and age >= self.delete_after
+            if not expired and (self.archive_after is None or age < self.archive_after):
+                continue
+            try:
+                if not self._claim(run_id):
+                    # quiet, but a live worker still holds it
+                    continue
+                if expired:
+                    # the lease goes with the run
+                    self.store.delete(run_id)
+                    report.deleted.append(run_id)
+                    continue
+                try:
+                    if (
+                        not self.store.is_archived(run_id)
+                        and self._ended(run_id)
+                        and self.store.archive(run_id, self.codec)
+                    ):
+                        report.archived.append(run_id)
+                finally:
+                    if self._leasing:
+                        self.store.release_lease(run_id, self._owner)
+            except Exception as e:
+                # one unreadable run must not stop the sweep of the rest
+                logger.warning("Retention failed for run %s: %s", run_id, e)
+        if report.archived or report.deleted:
+            logger.info(
+                "Retention: archived %d runs, deleted %d",
+                len(report.archived),
+                len(report.deleted),
+            )
+        return report
+
+    def _claim(self, run_id: str) -> bool:
+        # Held while the run is rewritten or removed, so a recovery worker
+        # cannot take it over half way; False when someone else holds it.
+        if not self._leasing:
+            return True
+        return self.store.acquire_lease(run_id, self._owner, DEFAULT_LEASE_TTL)
+
+    def _ended(self, run_id: str) -> bool:
+        # a run still being written would lose events to the rewrite
+        end = last_event(self.store, run_id)
+        return end is not None and end.type == "run_end"
+
+    async def run(self, interval: float = 3600.0) -> None:
+        """Sweep every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error("Retention sweep failed: %s", e)
+            await asyncio.sleep(interval)
+
+
+__all__ = ["Retention", "RetentionReport"]
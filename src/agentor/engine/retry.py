@@ -0,0 +1,349 @@
+"""Retries and circuit breakers for model calls.
+
+Without them one transient 429 or 503 fails the turn, which fails the run, and
+a fallback then starts it over from turn one. Retrying inside the adapter keeps
+every turn already taken. The breaker covers the opposite case: a provider that
+is down should fail fast, so a fallback model takes over at once instead of
+every run spending its retries finding out.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import backoff
+
+from agentor.engine.adaptive import report_overload
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+#: statuses that mean "try again": timeout, conflict, rate limit, server side
+_TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+#: statuses, and error names, that mean the provider itself is unhealthy
+_UNHEALTHY_STATUS = {500, 502, 503, 504}
+_UNHEALTHY_NAMES = ("APIConnectionError", "APITimeoutError", "Timeout")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How a model adapter retries transient failures.
+
+    Delays grow exponentially from `base_delay` up to `max_delay`, with full
+    jitter so a batch of runs does not retry in lockstep. A `Retry-After` from
+    the provider replaces the computed delay. `max_time` bounds the whole
+    call, waits included.
+
+    The breaker opens after `breaker_threshold` consecutive failures that
+    mean the provider is unhealthy (5xx, timeouts, refused connections) and
+    fails calls fast for `breaker_reset` seconds before letting one through to
+    probe. Rate limits do not count: a provider saying "slow down" is up.
+    `breaker_threshold=None` turns the breaker off.
+    """
+
+    max_tries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_time: Optional[float] = 120.0
+    breaker_threshold: Optional[int] = 5
+    breaker_reset: float = 30.0
+
+
+#: what adapters use unless told otherwise
+DEFAULT_RETRY = RetryPolicy()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider its breaker has marked as down."""
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for an error a retry may get past.
+
+    Matched on status code and class name, like `is_rate_limit`, so openai,
+    litellm and raw HTTP errors are recognised without importing any of them.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = _status(exc)
+    if status is not None:
+        return status in _TRANSIENT_STATUS
+    return any(name in type(exc).__name__ for name in _UNHEALTHY_NAMES)
+
+
+def _is_unhealthy(exc: BaseException) -> bool:
+    status = _status(exc)
+    if status is not None:
+        return status in _UNHEALTHY_STATUS
+    return any(name in type(exc).__name__ for name in _UNHEALTHY_NAMES)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait, from `Retry-After(-Ms)`, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    millis = headers.get("retry-after-ms")
+    if millis:
+        try:
+            return max(0.0, float(millis) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # the HTTP-date form
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _waits(
+    base_delay: float, max_delay: float
+) -> Generator[float, Optional[BaseException], None]:
+    """`backoff` wait generator; it sends in the exception being retried."""
+    attempt = 0
+    exc = yield  # type: ignore[misc]
+    while True:
+        delay = retry_after(exc) if exc is not None else None
+        if delay is None:
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+        attempt += 1
+        exc = yield delay
+
+
+class CircuitBreaker:
+    """Closed, open, half-open breaker for one provider endpoint."""
+
+    def __init__(self, name: str, threshold: int, reset_timeout: float):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before(self) -> None:
+        """Raise `CircuitOpenError` unless a call may go through now."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                # exactly one call probes; everyone else still fails fast
+                self._probing = True
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            raise CircuitOpenError(
+                f"{self.name} is failing; not calling it for another "
+                f"{max(0.0, remaining):.0f}s."
+            )
+
+    def abandon(self) -> None:
+        """A call let through by `before` ended without an outcome (cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, exc: Optional[BaseException]) -> None:
+        with self._lock:
+            self._probing = False
+            if exc is None or not _is_unhealthy(exc):
+                # an answer of any kind, even a 400, means the endpoint is up
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        "Opening circuit for %s after %d failures",
+                        self.name,
+                        self._failures,
+                    )
+                self._opened_at = time.monotonic()
+
+
+_breakers: Dict[Tuple[Any, ...], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(
+    model: str, endpoint: Optional[str], policy: Optional[RetryPolicy]
+) -> Optional[CircuitBreaker]:
+    """The process-wide breaker for a model at an endpoint.
+
+    Shared, so every run and every adapter instance talking to the same
+    endpoint learns it is down from the first ones to find out.
+    """
+    if policy is None or policy.breaker_threshold is None:
+        return None
+    key = (model, endpoint, policy.breaker_threshold, policy.breaker_reset)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            name = f"{model} at {endpoint}" if endpoint else model
+            breaker = _breakers[key] = CircuitBreaker(
+                name, policy.breaker_threshold, policy.breaker_reset
+            )
+        return breaker
+
+
+def _on_backoff(details: Dict[str, Any]) -> None:
+    # a retried 429 still means the batch is going too fast
+    report_overload(details["exception"])
+    logger.warning(
+        "Model call failed (%s: %s); retry %d in %.1fs",
+        type(details["exception"]).__name__,
+        details["exception"],
+        details["tries"],
+        details["wait"],
+    )
+
+
+def _retrying(policy: RetryPolicy, attempt: Callable[[], Awaitable[T]]):
+    return backoff.on_exception(
+        _waits,
+        Exception,
+        max_tries=policy.max_tries,
+        max_time=policy.max_time,
+        giveup=lambda exc: not is_transient(exc),
+        # the waits are jittered already, and Retry-After must not be
+        jitter=None,
+        on_backoff=_on_backoff,
+        logger=None,
+        base_delay=policy.base_delay,
+        max_delay=policy.max_delay,
+    )(attempt)
+
+
+async def call_with_retry(
+    call: Callable[[], Awaitable[T]],
+    policy: Optional[RetryPolicy],
+    breaker: Optional[CircuitBreaker] = None,
+) -> T:
+    """Await `call()`, retrying transient failures and honouring `breaker`."""
+
+    async def attempt() -> T:
+        if breaker is not None:
+            breaker.before()
+        try:
+            result = await call()
+        except Exception as exc:
+            if breaker is not None:
+                breaker.record(exc)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        if breaker is not None:
+            breaker.record(None)
+        return result
+
+    if policy is None or policy.max_tries <= 1:
+        return await attempt()
+    return await _retrying(policy, attempt)()
+
+
+async def stream_with_retry(
+    open_stream: Callable[[], AsyncIterator[T]],
+    policy: Optional[RetryPolicy],
+    breaker: Optional[CircuitBreaker] = None,
+) -> AsyncIterator[T]:
+    """Iterate `open_stream()`, retrying until its first item arrives.
+
+    After that a failure is raised: the caller has already seen part of the
+    response, and a retry would repeat it.
+    """
+    stream: Optional[AsyncIterator[T]] = None
+
+    async def first() -> Any:
+        nonlocal stream
+        stream = open_stream()
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return STREAM_END
+        except BaseException:
+            await close_stream(stream)
+            raise
+
+    item = await call_with_retry(first, policy, breaker)
+    try:
+        while item is not STREAM_END:
+            yield item
+            try:
+                item = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            except Exception as exc:
+                if breaker is not None:
+                    breaker.record(exc)
+                raise
+    finally:
+        await close_stream(stream)
+
+
+#: stands in for "the stream ended" where None could be an item
+STREAM_END = object()
+
+
+async def close_stream(stream: Any) -> None:
+    """Close an async iterator that has an `aclose`; a no-op for one without."""
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+__all__ = [
+    "DEFAULT_RETRY",
+    "STREAM_END",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "RetryPolicy",
+    "call_with_retry",
+    "circuit_breaker",
+    "close_stream",
+    "is_transient",
+    "retry_after",
+    "stream_with_retry",
+]
@@ -0,0 +1,321 @@
+"""Run persistence in shared, rolling segment files.
+
+`FileStore` keeps a file per run, which at high volume exhausts inodes and
+makes every directory operation slow. `SegmentedStore` appends every run's
+events to one active segment file instead, rotates it at a size limit, and
+compresses sealed segments in the background. An index maps each run to the
+byte ranges holding its events, so a load reads only those.
+"""
+
+from __future__ import annotations
+
+import gzip
+import itertools
+import json
+import logging
+import mmap
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from agentor.engine.events import Event
+
+logger = logging.getLogger(__name__)
+
+_Range = Tuple[int, int, int]  # segment, offset, length
+
+
+class SegmentedStore:
+    """Every run's events in a few large, append-only segment files.
+
+    Each line is `<run_id>\\t<event JSON>`, so a segment is readable on its
+    own and the index can be rebuilt from it: events written after the
+    index's last commit (a crash between the two) are re-indexed on open, and
+    a torn final line is cut off. Events are fsynced as `FileStore` does;
+    the index is an SQLite database next to the segments.
+
+    A segment is sealed once it reaches `max_segment_bytes` and, with
+    `compress`, gzipped by a background thread. Reads map uncompressed
+    segments with `mmap` and slice out just the run's ranges; a compressed
+    one is decompressed in one forward pass up to the run's last range in
+    it, so reading old runs costs more than recent ones.
+
+    One process writes a directory at a time.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        directory: str | Path = "runs",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        compress: bool = True,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._compressing: List[threading.Thread] = []
+        self._db = sqlite3.connect(
+            self.directory / "index.sqlite", check_same_thread=False
+        )
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # the segments recover what the index loses, so the index need not
+            # be synced on every commit
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                "id INTEGER PRIMARY KEY, indexed INTEGER NOT NULL DEFAULT 0, "
+                "sealed INTEGER NOT NULL DEFAULT 0, "
+                "compressed INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ranges ("
+                "run_id TEXT NOT NULL, segment INTEGER NOT NULL, "
+                "offset INTEGER NOT NULL, length INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS ranges_run "
+                "ON ranges (run_id, segment, offset)"
+            )
+            row = self._db.execute(
+                "SELECT id FROM segments WHERE sealed = 0 ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._active = self._db.execute(
+                    "INSERT INTO segments DEFAULT VALUES"
+                ).lastrowid
+            else:
+                self._active = row[0]
+            self._recover()
+        self._file = self._path(self._active).open("ab")
+
+        # finish what a previous process left: compressions it never ran or
+        # never got to clean up after
+        sealed = self._db.execute(
+            "SELECT id, compressed FROM segments WHERE sealed = 1"
+        ).fetchall()
+        for segment, compressed in sealed:
+            if compressed:
+                self._path(segment).unlink(missing_ok=True)
+            elif self.compress:
+                self._compress_later(segment)
+
+    # ------------------------------------------------------------ files
+
+    def _path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:08d}.log"
+
+    def _compressed_path(self, segment: int) -> Path:
+        return self.directory / f"segment-{segment:08d}.log.gz"
+
+    def _index(self, run_id: str, segment: int, offset: int, length: int) -> None:
+        # contiguous writes of one run share a range, so a run written without
+        # interleaving costs one index row per segment, not one per event
+        extended = self._db.execute(
+            "UPDATE ranges SET length = length + ? WHERE rowid = ("
+            "SELECT rowid FROM ranges WHERE run_id = ? "
+            "ORDER BY segment DESC, offset DESC LIMIT 1) "
+            "AND segment = ? AND offset + length = ?",
+            (length, run_id, segment, offset),
+        ).rowcount
+        if not extended:
+            self._db.execute(
+                "INSERT INTO ranges VALUES (?, ?, ?, ?)",
+                (run_id, segment, offset, length),
+            )
+
+    def _recover(self) -> None:
+        """Index lines the active segment holds past the index's last commit."""
+        path = self._path(self._active)
+        if not path.exists():
+            return
+        (indexed,) = self._db.execute(
+            "SELECT indexed FROM segments WHERE id = ?", (self._active,)
+        ).fetchone()
+        with path.open("r+b") as f:
+            f.seek(indexed)
+            offset = indexed
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # torn by a crash mid-write; the next append must not be
+                    # glued onto it
+                    logger.warning("Truncating a torn event at %s:%d", path, offset)
+                    f.truncate(offset)
+                    break
+                run_id = line.split(b"\t", 1)[0].decode("utf-8")
+                self._index(run_id, self._active, offset, len(line))
+                offset += len(line)
+        self._db.execute(
+            "UPDATE segments SET indexed = ? WHERE id = ?", (offset, self._active)
+        )
+
+    # ------------------------------------------------------------ writing
+
+    def append(self, run_id: str, event: Event) -> None:
+        if "\t" in run_id or "\n" in run_id:
+            raise ValueError(f"Run id {run_id!r} may not contain tabs or newlines")
+        line = f"{run_id}\t{event.to_json()}\n".encode("utf-8")
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            end = offset + len(line)
+            with self._db:
+                self._index(run_id, self._active, offset, len(line))
+                self._db.execute(
+                    "UPDATE segments SET indexed = ? WHERE id = ?",
+                    (end, self._active),
+                )
+            if end >= self.max_segment_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        sealed = self._active
+        self._file.close()
+        with self._db:
+            self._db.execute("UPDATE segments SET sealed = 1 WHERE id = ?", (sealed,))
+            self._active = self._db.execute(
+                "INSERT INTO segments DEFAULT VALUES"
+            ).lastrowid
+        self._file = self._path(self._active).open("ab")
+        if self.compress:
+            self._compress_later(sealed)
+
+    def _compress_later(self, segment: int) -> None:
+        thread = threading.Thread(
+            target=self._compress,
+            args=(segment,),
+            name=f"agentor-compress-{segment}",
+            daemon=True,
+        )
+        self._compressing = [t for t in self._compressing if t.is_alive()]
+        self._compressing.append(thread)
+        thread.start()
+
+    def _compress(self, segment: int) -> None:
+        source = self._path(segment)
+        target = self._compressed_path(segment)
+        partial = target.with_name(target.name + ".partial")
+        try:
+            with source.open("rb") as src, partial.open("wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(partial, target)
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE segments SET compressed = 1 WHERE id = ?", (segment,)
+                )
+            # readers fall back to the compressed copy once this is gone
+            source.unlink()
+        except Exception as e:
+            # left uncompressed and retried on the next open; still readable
+            logger.warning("Compressing segment %d failed: %s", segment, e)
+
+    # ------------------------------------------------------------ reading
+
+    def _ranges(self, run_id: str) -> List[_Range]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT segment, offset, length FROM ranges WHERE run_id = ? "
+                "ORDER BY segment, offset",
+                (run_id,),
+            ).fetchall()
+
+    def _read(
+        self, segment: int, offset: int, length: int, last_line: bool = False
+    ) -> bytes:
+        try:
+            f = self._path(segment).open("rb")
+        except FileNotFoundError:
+            with gzip.open(self._compressed_path(segment), "rb") as z:
+                z.seek(offset)
+                data = z.read(length)
+            if last_line:
+                data = data[data.rfind(b"\n", 0, len(data) - 1) + 1 :]
+            return data
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = offset + length
+            if last_line:
+                # found in the mapping, so a long range is never copied
+                offset = mapped.rfind(b"\n", offset, end - 1) + 1 or offset
+            # the one copy a read makes: the run's own bytes, not the segment
+            return mapped[offset:end]
+
+    def _read_ranges(
+        self, segment: int, ranges: List[Tuple[int, int]]
+    ) -> Iterator[bytes]:
+        """Each `(offset, length)` of one segment, in offset order.
+
+        The segment is opened once for all of them. Interleaved runs leave a
+        range per event, and a gzip stream only seeks by decompressing up to
+        the target, so reading each range from a fresh open would decompress
+        the segment's start again for every event.
+        """
+        try:
+            f = self._path(segment).open("rb")
+        except FileNotFoundError:
+            with gzip.open(self._compressed_path(segment), "rb") as z:
+                for offset, length in ranges:
+                    z.seek(offset)  # forward from the previous range
+                    yield z.read(length)
+            return
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset, length in ranges:
+                yield mapped[offset : offset + length]
+
+    def _events(self, run_id: str, data: bytes) -> Iterator[Event]:
+        for line in data.splitlines():
+            owner, _, payload = line.partition(b"\t")
+            if owner.decode("utf-8") != run_id:
+                # the index disagrees with the segment; never return another
+                # run's events as this one's
+                logger.warning("Index for run %s points at another run", run_id)
+                continue
+            yield Event.from_dict(json.loads(payload))
+
+    def iter_events(self, run_id: str) -> Iterator[Event]:
+        """The run's events, read a range at a time as they are consumed."""
+        for segment, ranges in itertools.groupby(
+            self._ranges(run_id), key=lambda r: r[0]
+        ):
+            for data in self._read_ranges(segment, [r[1:] for r in ranges]):
+                yield from self._events(run_id, data)
+
+    def load(self, run_id: str) -> List[Event]:
+        return list(self.iter_events(run_id))
+
+    def last_event(self, run_id: str) -> Optional[Event]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT segment, offset, length FROM ranges WHERE run_id = ? "
+                "ORDER BY segment DESC, offset DESC LIMIT 1",
+                (run_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return next(self._events(run_id, self._read(*row, last_line=True)), None)
+
+    def list_runs(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT run_id FROM ranges ORDER BY 1")
+            return [run_id for (run_id,) in rows.fetchall()]
+
+    def close(self) -> None:
+        """Finish background compression and release the files."""
+        for thread in self._compressing:
+            thread.join()
+        with self._lock:
+            self._file.close()
+            self._db.close()
+
+
+__all__ = ["SegmentedStore"]
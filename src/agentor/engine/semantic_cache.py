@@ -0,0 +1,202 @@
+"""Semantic caching of whole runs, for near-duplicate prompts.
+
+FAQ-style traffic asks the same question in many wordings, which an exact
+cache never matches. `SemanticCache` embeds the prompt, finds the most similar
+one answered before, and returns that answer when the two are close enough.
+
+Only runs that called no tools are stored: a tool's result depends on when it
+ran and with what, so an answer built on one is not reusable. Only
+single-prompt inputs are looked up, since in a longer conversation the last
+message alone does not determine the answer.
+
+The vectors live in a memory-mapped `.npy` file and the entries in SQLite, so
+the cache survives restarts without being loaded into memory up front.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+
+class SemanticCache:
+    """Reuse the answer to a sufficiently similar earlier prompt.
+
+    Args:
+        path: Directory holding the index (`vectors.npy`, `entries.sqlite`).
+        embeddings: Anything with `embed(list_of_texts) -> list_of_vectors`;
+            defaults to `agentor.embeddings.Embeddings()`.
+        threshold: Cosine similarity at or above which a prompt counts as the
+            same question. High by default: a wrong answer costs more than a
+            model call.
+        max_entries: Capacity. When full, the least recently used entry is
+            replaced.
+        max_age: Seconds an entry stays usable; None keeps entries until
+            evicted.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = "agentor-semantic-cache",
+        embeddings: Any = None,
+        threshold: float = 0.95,
+        max_entries: int = 10_000,
+        max_age: Optional[float] = None,
+    ):
+        try:
+            import numpy as np
+        except ImportError as e:  # pragma: no cover - numpy ships with bm25s
+            raise ImportError("SemanticCache requires numpy: pip install numpy") from e
+        self._np = np
+        if embeddings is None:
+            from agentor.embeddings import Embeddings
+
+            embeddings = Embeddings()
+        self.embeddings = embeddings
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._vectors: Any = None
+
+        self._db = sqlite3.connect(
+            self.path / "entries.sqlite", check_same_thread=False
+        )
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "slot INTEGER PRIMARY KEY, scope TEXT NOT NULL, prompt TEXT, "
+                "output TEXT NOT NULL, created_at REAL NOT NULL, "
+                "used_at REAL NOT NULL)"
+            )
+
+        # Per-slot metadata, mirrored in memory so a search is a handful of
+        # vectorised operations rather than a query per candidate.
+        self._scope = np.full(max_entries, None, dtype=object)
+        self._created = np.full(max_entries, np.nan)
+        self._used = np.full(max_entries, np.nan)
+        rows = self._db.execute(
+            "SELECT slot, scope, created_at, used_at FROM entries WHERE slot < ?",
+            (max_entries,),
+        ).fetchall()
+        for slot, scope, created_at, used_at in rows:
+            self._scope[slot] = scope
+            self._created[slot] = created_at
+            self._used[slot] = used_at
+
+        vectors = self.path / "vectors.npy"
+        if vectors.exists():
+            self._vectors = np.load(vectors, mmap_mode="r+")
+            if self._vectors.shape[0] != max_entries:
+                raise ValueError(
+                    f"{vectors} holds {self._vectors.shape[0]} entries, but "
+                    f"max_entries is {max_entries}; use another path to resize."
+                )
+
+    def _index(self, dim: int) -> Any:
+        if self._vectors is None:
+            self._vectors = self._np.lib.format.open_memmap(
+                self.path / "vectors.npy",
+                mode="w+",
+                dtype=self._np.float32,
+                shape=(self.max_entries, dim),
+            )
+        return self._vectors
+
+    def embed(self, prompt: str) -> Any:
+        """The prompt's unit vector, so a dot product is cosine similarity."""
+        vector = self._np.asarray(self.embeddings.embed([prompt])[0], dtype="float32")
+        norm = self._np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _live(self, scope: str) -> Any:
+        live = self._scope == scope
+        if self.max_age is not None:
+            live &= self._created >= time.time() - self.max_age
+        return self._np.flatnonzero(live)
+
+    def search(self, vector: Any, scope: str = "") -> Optional[str]:
+        """The stored output for the closest prompt above the threshold."""
+        with self._lock:
+            if self._vectors is None:
+                return None
+            slots = self._live(scope)
+            if not len(slots):
+                return None
+            similarity = self._vectors[slots] @ vector
+            best = int(similarity.argmax())
+            if similarity[best] < self.threshold:
+                return None
+            slot = int(slots[best])
+            now = time.time()
+            self._used[slot] = now
+            with self._db:
+                self._db.execute(
+                    "UPDATE entries SET used_at = ? WHERE slot = ?", (now, slot)
+                )
+                row = self._db.execute(
+                    "SELECT output FROM entries WHERE slot = ?", (slot,)
+                ).fetchone()
+            return None if row is None else row[0]
+
+    def lookup(self, prompt: str, scope: str = "") -> Tuple[Any, Optional[str]]:
+        """Embed and search in one call: `(vector, output or None)`.
+
+        The vector is returned so a miss can be stored without embedding the
+        prompt a second time.
+        """
+        vector = self.embed(prompt)
+        return vector, self.search(vector, scope)
+
+    def add(self, vector: Any, prompt: str, output: str, scope: str = "") -> None:
+        """Store an answer, replacing an expired or least recently used entry."""
+        np = self._np
+        with self._lock:
+            vectors = self._index(len(vector))
+            free = np.flatnonzero(np.equal(self._scope, None))
+            if len(free):
+                slot = int(free[0])
+            else:
+                # expired entries are the first to go: their age already
+                # makes them unusable
+                used = self._used.copy()
+                if self.max_age is not None:
+                    used[self._created < time.time() - self.max_age] = -np.inf
+                slot = int(np.nanargmin(used))
+            # The vector and its row cannot be written atomically together,
+            # so the slot's old row goes first: a crash part way then leaves
+            # an empty slot, never the new vector paired with the old answer.
+            self._scope[slot] = None
+            with self._db:
+                self._db.execute("DELETE FROM entries WHERE slot = ?", (slot,))
+            vectors[slot] = vector
+            vectors.flush()
+            now = time.time()
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (slot, scope, prompt, output, now, now),
+                )
+            self._scope[slot] = scope
+            self._created[slot] = now
+            self._used[slot] = now
+
+    def __len__(self) -> int:
+        return int(self._np.not_equal(self._scope, None).sum())
+
+    def close(self) -> None:
+        """Flush the index and release the database."""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._db.close()
+
+
+__all__ = ["SemanticCache"]
@@ -8,14 +8,46 @@ sync with the loop.
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import gzip
+import io
 import json
 import logging
 import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
 import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Protocol,
+    Tuple,
+    runtime_checkable,
+)
 
-from agentor.engine.events import Event, Usage
+from agentor.engine.codec import ENCODINGS, Encoding, decode
+from agentor.engine.events import Event, Usage, expand_messages
+from agentor.engine.history import MessageHistory
+from agentor.engine.leases import LeaseHeldError
+
+try:
+    import fcntl
+except ImportError:  # Windows: FileStore runs there, but without leases
+    fcntl = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +58,29 @@ def new_run_id() -> str:
 
 @runtime_checkable
 class Store(Protocol):
+    # A store may also set `blocking = False` when its methods do no I/O on
+    # the caller's thread; the async helpers (`aappend`, `aload`, ...) then
+    # call them directly rather than on a worker.
+    # It may also offer `load_tail(run_id)`, the events from the latest
+    # `checkpoint` on; `compact(run_id)`, which drops the events before it;
+    # `iter_events(run_id)`, which streams a log rather than materialising it;
+    # and `last_event(run_id)`, read without the rest of the log. None are
+    # part of the protocol, so stores without them conform: the module-level
+    # helpers of the same names fall back to `load`. `Retention` uses
+    # `last_modified(run_id)`, `delete(run_id)`, `archive(run_id, codec)` and
+    # `is_archived(run_id)` where a store has them.
+    #
+    # Coroutines `aappend`, `aload`, `aload_tail` and `alist_runs` are likewise
+    # optional. The loop awaits them, through the `aappend`/`aload_tail`
+    # helpers, in preference to running the sync methods on a worker thread.
+    #
+    # With `acquire_lease`, `renew_lease` and `release_lease` (see
+    # `agentor.engine.leases`) the loop holds a lease on every run it writes,
+    # so only one worker at a time continues a run. A store whose lease
+    # methods cannot work where it runs sets `leasing = False`. `leased(run_id)`
+    # says whether a worker holds an unexpired lease on the run, so recovery
+    # can pass over live runs without trying to take each one.
+
     def append(self, run_id: str, event: Event) -> None: ...
 
     def load(self, run_id: str) -> List[Event]: ...
@@ -33,91 +88,1059 @@ class Store(Protocol):
     def list_runs(self) -> List[str]: ...
 
 
+#: when an appended event is on disk. See `FileStore`.
+Durability = Literal["event", "group", "async"]
+
+# queued by `FileStore.flush` to wait for everything queued before it
+_BARRIER = ""
+
+# an item queued on a `_BatchWriter`, and the future its commit resolves
+_Queued = Tuple[Any, Future]
+
+# bytes read per step when scanning a log backwards from its end
+_TAIL_BLOCK = 8192
+
+#: the compressed formats `FileStore.archive` writes, and their file suffixes
+ARCHIVE_CODECS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_archive(path: Path, mode: str, suffix: Optional[str] = None) -> BinaryIO:
+    if (suffix or path.suffix) != ".zst":
+        return gzip.open(path, mode)  # type: ignore[return-value]
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd archives require zstandard: pip install agentor[zstd]"
+        ) from e
+    f = zstandard.open(path, mode)
+    # the decompressing reader cannot iterate lines on its own
+    return io.BufferedReader(f) if "r" in mode else f
+
+
+class _BatchWriter:
+    """A background thread that commits queued items in batches.
+
+    `submit` queues an item and returns a future; the thread hands whatever
+    has queued up, at most `max_batch` items, to `commit`, which must resolve
+    every future in the batch. With `linger`, the thread waits that long after
+    the first item so a batch can gather; otherwise a batch is whatever queued
+    during the previous commit. Started on the first `submit`; `close` (also
+    run at exit) commits what is queued and stops it.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[List[_Queued]], None],
+        name: str,
+        max_batch: int = 1024,
+        linger: float = 0.0,
+    ):
+        self.commit = commit
+        self.name = name
+        self.max_batch = max_batch
+        self.linger = linger
+        self._queue: "queue.Queue[Optional[_Queued]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, item: Any) -> Future:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=self.name, daemon=True
+                    )
+                    self._thread.start()
+                    atexit.register(self.close)
+        done: Future = Future()
+        self._queue.put((item, done))
+        return done
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            queued = self._queue.get()
+            if queued is None:
+                break
+            if self.linger:
+                time.sleep(self.linger)
+            batch = [queued]
+            while len(batch) < self.max_batch:
+                try:
+                    queued = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if queued is None:
+                    stopping = True
+                    break
+                batch.append(queued)
+            self.commit(batch)
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+            atexit.unregister(self.close)
+
+
 class FileStore:
-    """One append-only JSONL file per run."""
+    """One append-only JSONL file per run.
 
-    def __init__(self, directory: str | Path = "runs"):
+    `durability` trades latency against what a crash can lose:
+
+    - "event" (default): each `append` writes and fsyncs its event before
+      returning. Nothing acknowledged is ever lost; every event pays an open
+      and an fsync.
+    - "group": appends from every run go to one background writer, which
+      writes whatever has queued up and fsyncs each file once per batch.
+      `append` still returns only once its event is on disk, so the crash
+      window is the same as "event", but concurrent runs share fsyncs: an
+      event waits at most for the commit in progress plus its own.
+    - "async": `append` queues the event and returns at once; the writer
+      commits every `commit_interval` seconds. A crash, of the process or the
+      machine, loses up to that much of each run's tail (plus any batch being
+      written). A resume then sees a run that stopped earlier than it did,
+      which it handles like any interrupted run, though tools whose results
+      were lost will run again.
+
+    Batches hold at most `max_batch` events. Call `close` (also run at exit)
+    to commit what is queued; `load` and `list_runs` wait for queued events
+    first, so a store always reads its own writes.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = "runs",
+        durability: Durability = "event",
+        commit_interval: float = 0.05,
+        max_batch: int = 1024,
+    ):
+        if durability not in ("event", "group", "async"):
+            raise ValueError(f"Unknown durability mode: {durability!r}")
         self.directory = Path(directory)
         self.directory.mkdir(parents=True, exist_ok=True)
+        self.durability: Durability = durability
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        #: only "async" appends return without waiting on the disk
+        self.blocking = durability != "async"
+        # "async" lets a commit's worth of events gather; group commits
+        # instead take whatever queued up during the previous fsync
+        self._writer = _BatchWriter(
+            self._commit,
+            name="agentor-store",
+            max_batch=max_batch,
+            linger=commit_interval if durability == "async" else 0.0,
+        )
+
+    #: leases need `fcntl`, which is POSIX only
+    leasing = fcntl is not None
 
     def path(self, run_id: str) -> Path:
         return self.directory / f"{run_id}.jsonl"
 
+    def _archives(self, run_id: str) -> List[Path]:
+        return [
+            self.directory / f"{run_id}.jsonl{suffix}"
+            for suffix in ARCHIVE_CODECS.values()
+        ]
+
+    def _archive(self, run_id: str) -> Optional[Path]:
+        return next((p for p in self._archives(run_id) if p.exists()), None)
+
+    def _marker(self, run_id: str) -> Path:
+        # byte offset of the run's latest checkpoint in its log
+        return self.directory / f"{run_id}.checkpoint"
+
+    def _lease_path(self, run_id: str) -> Path:
+        # the holder and expiry of the run's lease, as JSON; empty when free
+        return self.directory / f"{run_id}.lease"
+
     def append(self, run_id: str, event: Event) -> None:
-        with self.path(run_id).open("a", encoding="utf-8") as f:
-            f.write(event.to_json() + "\n")
+        line = event.to_json() + "\n"
+        checkpoint = event.type == "checkpoint"
+        if self.durability == "event":
+            self._write(run_id, [(line, checkpoint)])
+            return
+        done = self._enqueue(run_id, line, checkpoint)
+        if self.durability == "group":
+            done.result()
+
+    async def aappend(self, run_id: str, event: Event) -> None:
+        """`append` for the event loop.
+
+        With "group" durability the event goes straight to the writer thread
+        and the caller awaits its commit there, so no worker thread is parked
+        on each event. "event" durability writes on a worker as before.
+        """
+        line = event.to_json() + "\n"
+        checkpoint = event.type == "checkpoint"
+        if self.durability == "event":
+            await asyncio.to_thread(self._write, run_id, [(line, checkpoint)])
+            return
+        done = self._enqueue(run_id, line, checkpoint)
+        if self.durability == "group":
+            await asyncio.wrap_future(done)
+
+    # Reads go to the disk whatever the durability, so they take a worker
+    # thread even when `blocking` is False for appends.
+
+    async def aload(self, run_id: str) -> List[Event]:
+        return await asyncio.to_thread(self.load, run_id)
+
+    async def aload_tail(self, run_id: str) -> List[Event]:
+        return await asyncio.to_thread(self.load_tail, run_id)
+
+    async def alist_runs(self) -> List[str]:
+        return await asyncio.to_thread(self.list_runs)
+
+    def _write(self, run_id: str, lines: List[Tuple[str, bool]]) -> None:
+        checkpoint_at: Optional[int] = None
+        with self.path(run_id).open("ab") as f:
+            position = f.tell()
+            chunks: List[bytes] = []
+            for line, checkpoint in lines:
+                chunk = line.encode("utf-8")
+                if checkpoint:
+                    checkpoint_at = position
+                chunks.append(chunk)
+                position += len(chunk)
+            f.write(b"".join(chunks))
             # a crash is exactly the case this exists for, so do not leave the
             # last events sitting in a buffer
             f.flush()
             os.fsync(f.fileno())
+        if checkpoint_at is not None:
+            # Written after the events are durable, so it never points past
+            # them. Losing it is harmless: an older marker, or none, only
+            # means reading more of the log.
+            self._marker(run_id).write_text(str(checkpoint_at))
+
+    def _enqueue(self, run_id: str, line: str, checkpoint: bool = False) -> Future:
+        return self._writer.submit((run_id, line, checkpoint))
+
+    def _commit(self, batch: List[_Queued]) -> None:
+        runs: Dict[str, List[Tuple[str, bool, Future]]] = {}
+        for (run_id, line, checkpoint), done in batch:
+            runs.setdefault(run_id, []).append((line, checkpoint, done))
+        for run_id, entries in runs.items():
+            error: Optional[BaseException] = None
+            if run_id != _BARRIER:
+                try:
+                    self._write(run_id, [(line, cp) for line, cp, _ in entries])
+                except Exception as e:
+                    error = e
+                    if self.durability == "async":
+                        # nobody is waiting to be told
+                        logger.error(
+                            "Failed to persist events for run %s: %s", run_id, e
+                        )
+            for _, _, done in entries:
+                if error is None:
+                    done.set_result(None)
+                else:
+                    done.set_exception(error)
+
+    def flush(self) -> None:
+        """Wait until every event appended so far is on disk."""
+        if self._writer.running:
+            self._enqueue(_BARRIER, "").result()
+
+    def close(self) -> None:
+        """Commit queued events and stop the background writer."""
+        self._writer.close()
 
     def load(self, run_id: str) -> List[Event]:
+        return list(self.iter_events(run_id))
+
+    def iter_events(self, run_id: str) -> Iterator[Event]:
+        """The run's events, parsed a line at a time as they are consumed."""
+        self.flush()
+        return self._iter(run_id)
+
+    def _read(self, run_id: str, offset: int = 0) -> List[Event]:
+        return list(self._iter(run_id, offset))
+
+    def _iter(self, run_id: str, offset: int = 0) -> Iterator[Event]:
+        # An archived run is read from its archive, then from any log a resume
+        # has appended since. `offset` is into the uncompressed log alone.
+        archive = None if offset else self._archive(run_id)
+        if archive is not None:
+            yield from self._parse(archive, _open_archive(archive, "rb"))
         path = self.path(run_id)
-        if not path.exists():
-            return []
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            return
+        f.seek(offset)
+        yield from self._parse(path, f)
 
-        events: List[Event] = []
-        with path.open("r", encoding="utf-8") as f:
+    @staticmethod
+    def _parse(path: Path, f: BinaryIO) -> Iterator[Event]:
+        with f:
             for line_number, line in enumerate(f, 1):
                 line = line.strip()
                 if not line:
                     continue
                 try:
-                    events.append(Event.from_dict(json.loads(line)))
-                except (json.JSONDecodeError, TypeError) as e:
+                    event = Event.from_dict(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError, TypeError) as e:
                     # A torn final line is expected after a hard kill; earlier
                     # events are still usable, so keep what parsed.
                     logger.warning(
                         "Skipping unreadable event at %s:%d (%s)", path, line_number, e
                     )
-        return events
+                    continue
+                yield event
+
+    def last_event(self, run_id: str) -> Optional[Event]:
+        """The run's last readable event, read backwards from the end.
+
+        Costs a block or two of I/O however long the log, which is what
+        makes checking thousands of runs for completion cheap.
+        """
+        self.flush()
+        try:
+            f = self.path(run_id).open("rb")
+        except FileNotFoundError:
+            if self._archive(run_id) is None:
+                return None
+            # archives are of runs long finished and rarely checked; they are
+            # read through rather than seeked in
+            last = None
+            for last in self._iter(run_id):
+                pass
+            return last
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            pending = b""
+            while position > 0:
+                step = min(_TAIL_BLOCK, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + pending).split(b"\n")
+                # the first piece may be the end of a line that starts in an
+                # earlier block; it is only whole once the file's start is read
+                pending = lines.pop(0) if position else b""
+                for line in reversed(lines):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        return Event.from_dict(json.loads(line))
+                    except (json.JSONDecodeError, UnicodeDecodeError, TypeError):
+                        # a torn final line; the one before it is the last event
+                        continue
+        return None
+
+    def _checkpoint_offset(self, run_id: str) -> int:
+        try:
+            return int(self._marker(run_id).read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def load_tail(self, run_id: str) -> List[Event]:
+        """The run's events from its latest checkpoint on.
+
+        Seeks straight to it, so the cost is the tail's, however long the
+        run. The whole log when it has no checkpoint.
+        """
+        self.flush()
+        offset = self._checkpoint_offset(run_id)
+        if offset:
+            events = self._read(run_id, offset)
+            if events and events[0].type == "checkpoint":
+                return events
+            # the marker does not match the log (say, a compaction was cut
+            # short); reading it all is always correct
+        return self._read(run_id)
+
+    def compact(self, run_id: str) -> int:
+        """Rewrite the run's log as its latest checkpoint and what follows.
+
+        Returns the number of events dropped. Only for runs nothing is still
+        appending to: an event written during the rewrite would be lost.
+        """
+        self.flush()
+        offset = self._checkpoint_offset(run_id)
+        path = self.path(run_id)
+        if not offset or not path.exists():
+            return 0
+        with path.open("rb") as f:
+            head = f.read(offset)
+            tail = f.read()
+        temporary = path.with_name(path.name + ".compact")
+        with temporary.open("wb") as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        # reset first: a crash before the swap then leaves the whole old log
+        # to be read from the start, never a marker into the wrong file
+        self._marker(run_id).write_text("0")
+        os.replace(temporary, path)
+        return head.count(b"\n")
 
     def list_runs(self) -> List[str]:
-        return sorted(p.stem for p in self.directory.glob("*.jsonl"))
+        self.flush()
+        return sorted(
+            {p.name.rsplit(".jsonl", 1)[0] for p in self.directory.glob("*.jsonl*")}
+        )
+
+    # ------------------------------------------------------------ retention
+
+    def last_modified(self, run_id: str) -> Optional[float]:
+        """When the run's log last changed, in epoch seconds."""
+        times = []
+        for path in (self.path(run_id), *self._archives(run_id)):
+            try:
+                times.append(path.stat().st_mtime)
+            except FileNotFoundError:
+                continue
+        return max(times, default=None)
+
+    def is_archived(self, run_id: str) -> bool:
+        return self._archive(run_id) is not None and not self.path(run_id).exists()
+
+    def archive(self, run_id: str, codec: str = "gzip") -> bool:
+        """Compress the run's log into an archive `load` still reads.
+
+        Event logs repeat message content heavily and shrink several-fold.
+        False if there was nothing to archive. Only for runs nothing is still
+        appending to, as with `compact`.
+        """
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Unknown archive codec: {codec!r}")
+        self.flush()
+        path = self.path(run_id)
+        if not path.exists():
+            return False
+        existing = self._archive(run_id)
+        target = self.directory / f"{run_id}.jsonl{ARCHIVE_CODECS[codec]}"
+        partial = target.with_name(target.name + ".partial")
+        with _open_archive(partial, "wb", target.suffix) as out:
+            # a run resumed after it was archived has both; fold them together
+            if existing is not None:
+                with _open_archive(existing, "rb") as f:
+                    shutil.copyfileobj(f, out)
+            with path.open("rb") as f:
+                shutil.copyfileobj(f, out)
+        with partial.open("rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(partial, target)
+        if existing is not None and existing != target:
+            existing.unlink()
+        # checkpoint offsets point into the log being removed
+        self._marker(run_id).unlink(missing_ok=True)
+        path.unlink()
+        return True
+
+    def delete(self, run_id: str) -> None:
+        """Remove every file of the run."""
+        self.flush()
+        for path in (
+            self.path(run_id),
+            *self._archives(run_id),
+            self._marker(run_id),
+            self._lease_path(run_id),
+        ):
+            path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------ leases
+
+    def acquire_lease(self, run_id: str, owner: str, ttl: float) -> bool:
+        return self._update_lease(run_id, owner, ttl, take=True)
+
+    def renew_lease(self, run_id: str, owner: str, ttl: float) -> bool:
+        return self._update_lease(run_id, owner, ttl, take=False)
+
+    def release_lease(self, run_id: str, owner: str) -> None:
+        self._update_lease(run_id, owner, None, take=False)
+
+    def leased(self, run_id: str) -> bool:
+        """Whether a worker holds an unexpired lease on the run.
+
+        Read without the lock: a lease file caught mid-write counts as held,
+        and the run is looked at again on the next scan.
+        """
+        try:
+            text = self._lease_path(run_id).read_text()
+        except FileNotFoundError:
+            return False
+        try:
+            lease = json.loads(text or "{}")
+        except json.JSONDecodeError:
+            return True
+        return lease.get("expires_at", 0.0) > time.time()
+
+    def _update_lease(
+        self, run_id: str, owner: str, ttl: Optional[float], take: bool
+    ) -> bool:
+        """Compare-and-set the lease file under an exclusive `flock`.
+
+        The lock is held only for this read-modify-write, by every process
+        sharing the directory, and goes with the file when it is closed. The
+        file is emptied rather than removed on release: another process may
+        already have it open, waiting on the lock, and would lock an unlinked
+        inode nobody else can see.
+        """
+        with self._lease_path(run_id).open("a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                lease = json.loads(f.read() or "{}")
+            except json.JSONDecodeError:
+                lease = {}
+            now = time.time()
+            if lease.get("owner") != owner and (
+                not take or lease.get("expires_at", 0.0) > now
+            ):
+                return False
+            f.seek(0)
+            f.truncate()
+            if ttl is not None:
+                f.write(json.dumps({"owner": owner, "expires_at": now + ttl}))
+            # other processes read it through the page cache, and a lease
+            # lost with the machine has expired by the time it is back
+            f.flush()
+            return True
 
 
 class MemoryStore:
     """In-process store, for tests and short-lived processes."""
 
+    #: appends are a list append; no worker thread needed
+    blocking = False
+    #: `append` takes `lease_owner=`; see `supports_leases`
+    fences_writes = True
+
     def __init__(self) -> None:
         self.runs: Dict[str, List[Event]] = {}
+        # run id: owner, expiry
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        # run id: when its last event was appended
+        self._modified: Dict[str, float] = {}
 
-    def append(self, run_id: str, event: Event) -> None:
+    def append(
+        self, run_id: str, event: Event, lease_owner: Optional[str] = None
+    ) -> None:
+        if lease_owner is not None:
+            holder = self._leases.get(run_id, (lease_owner,))[0]
+            if holder != lease_owner:
+                raise LeaseHeldError(f"Run {run_id!r} is leased by {holder!r}.")
         self.runs.setdefault(run_id, []).append(event)
+        self._modified[run_id] = time.time()
 
     def load(self, run_id: str) -> List[Event]:
         return list(self.runs.get(run_id, []))
 
+    # nothing here blocks, so the async interface is the sync one
+
+    async def aappend(
+        self, run_id: str, event: Event, lease_owner: Optional[str] = None
+    ) -> None:
+        self.append(run_id, event, lease_owner)
+
+    async def aload(self, run_id: str) -> List[Event]:
+        return self.load(run_id)
+
+    async def aload_tail(self, run_id: str) -> List[Event]:
+        return self.load_tail(run_id)
+
+    async def alist_runs(self) -> List[str]:
+        return self.list_runs()
+
+    def iter_events(self, run_id: str) -> Iterator[Event]:
+        return iter(self.load(run_id))
+
+    def last_event(self, run_id: str) -> Optional[Event]:
+        events = self.runs.get(run_id)
+        return events[-1] if events else None
+
+    def _checkpoint_index(self, run_id: str) -> int:
+        events = self.runs.get(run_id, [])
+        for index in range(len(events) - 1, -1, -1):
+            if events[index].type == "checkpoint":
+                return index
+        return 0
+
+    def load_tail(self, run_id: str) -> List[Event]:
+        return self.runs.get(run_id, [])[self._checkpoint_index(run_id) :]
+
+    def compact(self, run_id: str) -> int:
+        index = self._checkpoint_index(run_id)
+        if index:
+            del self.runs[run_id][:index]
+        return index
+
+    def last_modified(self, run_id: str) -> Optional[float]:
+        return self._modified.get(run_id)
+
+    def delete(self, run_id: str) -> None:
+        self.runs.pop(run_id, None)
+        self._leases.pop(run_id, None)
+        self._modified.pop(run_id, None)
+
+    def acquire_lease(self, run_id: str, owner: str, ttl: float) -> bool:
+        holder, expires_at = self._leases.get(run_id, (owner, 0.0))
+        if holder != owner and expires_at > time.time():
+            return False
+        self._leases[run_id] = (owner, time.time() + ttl)
+        return True
+
+    def renew_lease(self, run_id: str, owner: str, ttl: float) -> bool:
+        if self._leases.get(run_id, ("",))[0] != owner:
+            return False
+        self._leases[run_id] = (owner, time.time() + ttl)
+        return True
+
+    def release_lease(self, run_id: str, owner: str) -> None:
+        if self._leases.get(run_id, ("",))[0] == owner:
+            del self._leases[run_id]
+
+    def leased(self, run_id: str) -> bool:
+        return self._leases.get(run_id, ("", 0.0))[1] > time.time()
+
     def list_runs(self) -> List[str]:
         return sorted(self.runs)
 
 
-def replay_messages(events: List[Event]) -> List[Dict[str, Any]]:
+@dataclass
+class RunInfo:
+    """A run's summary, as indexed by `SqliteStore`."""
+
+    run_id: str
+    #: "running" until a run_end is recorded, and again while it is resumed
+    status: str
+    agent: Optional[str] = None
+    model: Optional[str] = None
+    started_at: Optional[float] = None
+    ended_at: Optional[float] = None
+    #: when the last event was recorded; how stale an unfinished run is
+    updated_at: Optional[float] = None
+    #: summed over every generation, as `total_usage` does
+    usage: Usage = field(default_factory=Usage)
+
+
+class SqliteStore:
+    """Runs in one SQLite database, with their metadata indexed.
+
+    Events go in an `events` table; a `runs` table, kept current as events are
+    appended, indexes each run's status, agent, start and end time and token
+    usage. Listing runs, or finding the ones recovery should look at, is then
+    an index lookup (`query`, `incomplete_runs`) rather than a parse of every
+    log.
+
+    WAL mode and SQLite's own locking make it safe to share between
+    processes. Each append is its own transaction, so it is as durable as
+    `FileStore`'s default.
+
+    `encoding="msgpack"` stores events as `Event.to_bytes` blobs, smaller and
+    cheaper to write than JSON. Rows are decoded by their type, so a database
+    can hold both and the setting can change at any time.
+    """
+
+    blocking = True
+    #: `append` takes `lease_owner=`; see `supports_leases`
+    fences_writes = True
+    #: events fetched per query by `iter_events`
+    _PAGE = 500
+    #: most appends `aappend` commits in one transaction
+    _MAX_BATCH = 1024
+
+    def __init__(self, path: str | Path = "runs.sqlite", encoding: Encoding = "json"):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown event encoding: {encoding!r}")
+        self.path = Path(path)
+        self.encoding: Encoding = encoding
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = _BatchWriter(
+            self._commit, name="agentor-sqlite-store", max_batch=self._MAX_BATCH
+        )
+        # one connection, used from whichever worker thread the loop picks
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "run_id TEXT NOT NULL, seq INTEGER NOT NULL, type TEXT NOT NULL, "
+                "data TEXT NOT NULL, PRIMARY KEY (run_id, seq))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id TEXT PRIMARY KEY, status TEXT NOT NULL, agent TEXT, "
+                "model TEXT, started_at REAL, ended_at REAL, updated_at REAL, "
+                "input_tokens INTEGER NOT NULL DEFAULT 0, "
+                "output_tokens INTEGER NOT NULL DEFAULT 0, "
+                "total_tokens INTEGER NOT NULL DEFAULT 0, "
+                "cached_tokens INTEGER NOT NULL DEFAULT 0, "
+                "checkpoint_seq INTEGER)"
+            )
+            for column in ("status", "agent", "started_at", "ended_at"):
+                self._db.execute(
+                    f"CREATE INDEX IF NOT EXISTS runs_{column} ON runs ({column})"
+                )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS runs_status_updated "
+                "ON runs (status, updated_at)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS runs_total_tokens ON runs (total_tokens)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS leases (run_id TEXT PRIMARY KEY, "
+                "owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def append(
+        self, run_id: str, event: Event, lease_owner: Optional[str] = None
+    ) -> None:
+        """Record `event`; with `lease_owner`, only while nobody else leases
+        the run, else raise `LeaseHeldError`."""
+        with self._lock, self._db:
+            self._insert(run_id, event, lease_owner)
+
+    async def aappend(
+        self, run_id: str, event: Event, lease_owner: Optional[str] = None
+    ) -> None:
+        """`append` for the event loop, committed by a writer thread.
+
+        The writer commits whatever has queued up in one transaction, so
+        concurrent runs share commits and no worker thread is parked on each
+        event; the caller awaits its own commit without blocking the loop.
+        """
+        await asyncio.wrap_future(self._writer.submit((run_id, event, lease_owner)))
+
+    def _commit(self, batch: List[_Queued]) -> None:
+        try:
+            with self._lock, self._db:
+                for (run_id, event, owner), _ in batch:
+                    self._insert(run_id, event, owner)
+        except Exception:
+            # the transaction rolled back; one bad event must not fail every
+            # other run's batched with it, so retry them one at a time
+            for (run_id, event, owner), done in batch:
+                try:
+                    self.append(run_id, event, owner)
+                except Exception as e:
+                    done.set_exception(e)
+                else:
+                    done.set_result(None)
+            return
+        for _, done in batch:
+            done.set_result(None)
+
+    def _insert(self, run_id: str, event: Event, owner: Optional[str] = None) -> None:
+        # the caller holds the lock and the transaction
+        now = time.time()
+        # One statement, so the next seq is read under the write lock that
+        # inserts it: a separate SELECT lets two processes pick the same one.
+        # The lease check is in it for the same reason: a worker whose lease
+        # lapsed inserts nothing once another has taken the run over.
+        cursor = self._db.execute(
+            "INSERT INTO events SELECT ?, (SELECT COALESCE(MAX(seq) + 1, 0) "
+            "FROM events WHERE run_id = ?), ?, ? WHERE ? IS NULL OR NOT EXISTS "
+            "(SELECT 1 FROM leases WHERE run_id = ? AND owner != ?)",
+            (run_id, run_id, event.type, self._encode(event), owner, run_id, owner),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseHeldError(f"Run {run_id!r} is leased by another worker.")
+        if event.type == "run_start":
+            # a resume starts a new segment of the same run: running
+            # again, but it keeps its original start
+            self._db.execute(
+                "INSERT INTO runs (run_id, status, agent, model, started_at, "
+                "updated_at) VALUES (?, 'running', ?, ?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET status = 'running', "
+                "ended_at = NULL, updated_at = excluded.updated_at",
+                (run_id, event.agent, event.model, event.started_at or now, now),
+            )
+            return
+        # a log whose run_start was lost still gets a row to find it by
+        self._db.execute(
+            "INSERT OR IGNORE INTO runs (run_id, status, updated_at) "
+            "VALUES (?, 'running', ?)",
+            (run_id, now),
+        )
+        if event.type == "generation" and event.usage:
+            usage = event.usage
+            self._db.execute(
+                "UPDATE runs SET input_tokens = input_tokens + ?, "
+                "output_tokens = output_tokens + ?, "
+                "total_tokens = total_tokens + ?, "
+                "cached_tokens = cached_tokens + ?, updated_at = ? "
+                "WHERE run_id = ?",
+                (
+                    usage.input_tokens,
+                    usage.output_tokens,
+                    usage.total_tokens,
+                    usage.cached_tokens,
+                    now,
+                    run_id,
+                ),
+            )
+        elif event.type == "checkpoint":
+            # the transaction holds the write lock, so the newest seq is
+            # the one just inserted
+            self._db.execute(
+                "UPDATE runs SET checkpoint_seq = (SELECT MAX(seq) FROM events "
+                "WHERE run_id = ?), updated_at = ? WHERE run_id = ?",
+                (run_id, now, run_id),
+            )
+        elif event.type == "run_end":
+            self._db.execute(
+                "UPDATE runs SET status = ?, ended_at = ?, updated_at = ? "
+                "WHERE run_id = ?",
+                (event.status or "completed", event.ended_at or now, now, run_id),
+            )
+        else:
+            self._db.execute(
+                "UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id)
+            )
+
+    def _encode(self, event: Event) -> str | bytes:
+        # bytes are stored as a BLOB, which is how `decode` tells them apart
+        if self.encoding == "msgpack":
+            return event.to_bytes()
+        return event.to_json()
+
+    def load(self, run_id: str) -> List[Event]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM events WHERE run_id = ? ORDER BY seq", (run_id,)
+            ).fetchall()
+        return [decode(data) for (data,) in rows]
+
+    def iter_events(self, run_id: str) -> Iterator[Event]:
+        """The run's events, fetched a page at a time as they are consumed."""
+        seq = -1
+        while True:
+            # a page per query, so the lock is never held across a yield
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, data FROM events WHERE run_id = ? AND seq > ? "
+                    "ORDER BY seq LIMIT ?",
+                    (run_id, seq, self._PAGE),
+                ).fetchall()
+            for seq, data in rows:
+                yield decode(data)
+            if len(rows) < self._PAGE:
+                return
+
+    def last_event(self, run_id: str) -> Optional[Event]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM events WHERE run_id = ? ORDER BY seq DESC LIMIT 1",
+                (run_id,),
+            ).fetchone()
+        return None if row is None else decode(row[0])
+
+    def load_tail(self, run_id: str) -> List[Event]:
+        """The run's events from its latest checkpoint on."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM events WHERE run_id = ? AND seq >= COALESCE("
+                "(SELECT checkpoint_seq FROM runs WHERE run_id = ?), 0) "
+                "ORDER BY seq",
+                (run_id, run_id),
+            ).fetchall()
+        return [decode(data) for (data,) in rows]
+
+    def compact(self, run_id: str) -> int:
+        """Delete the run's events before its latest checkpoint; how many."""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "DELETE FROM events WHERE run_id = ? AND seq < COALESCE("
+                "(SELECT checkpoint_seq FROM runs WHERE run_id = ?), 0)",
+                (run_id, run_id),
+            )
+            return cursor.rowcount
+
+    def list_runs(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT run_id FROM runs ORDER BY run_id")
+            return [run_id for (run_id,) in rows.fetchall()]
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        agent: Optional[str] = None,
+        not_completed: bool = False,
+        started_after: Optional[float] = None,
+        started_before: Optional[float] = None,
+        updated_before: Optional[float] = None,
+        min_tokens: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[RunInfo]:
+        """Runs matching every given filter, oldest first.
+
+        `not_completed` selects runs `is_complete` would reject: those still
+        running or interrupted, and also those that ended `failed` or
+        `max_turns`. For only the runs that never ended, see
+        `incomplete_runs`. Times are epoch seconds.
+        """
+        where: List[str] = []
+        params: List[Any] = []
+        for clause, value in (
+            ("status = ?", status),
+            ("agent = ?", agent),
+            ("started_at > ?", started_after),
+            ("started_at < ?", started_before),
+            ("updated_at < ?", updated_before),
+            ("total_tokens >= ?", min_tokens),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if not_completed:
+            where.append("status != 'completed'")
+        sql = (
+            "SELECT run_id, status, agent, model, started_at, ended_at, "
+            "updated_at, input_tokens, output_tokens, total_tokens, "
+            "cached_tokens FROM runs"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            RunInfo(*row[:7], usage=Usage(*row[7:]))  # type: ignore[arg-type]
+            for row in rows
+        ]
+
+    def last_modified(self, run_id: str) -> Optional[float]:
+        """When the run's last event was recorded, in epoch seconds."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def delete(self, run_id: str) -> None:
+        with self._lock, self._db:
+            for table in ("events", "runs", "leases"):
+                self._db.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    # Each lease operation is one conditional write. SQLite has no row locks,
+    # but it serializes writers across processes, which makes each a
+    # compare-and-set on the run's row.
+
+    def acquire_lease(self, run_id: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT (run_id) DO "
+                "UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                (run_id, owner, now + ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def renew_lease(self, run_id: str, owner: str, ttl: float) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE leases SET expires_at = ? WHERE run_id = ? AND owner = ?",
+                (time.time() + ttl, run_id, owner),
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, run_id: str, owner: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM leases WHERE run_id = ? AND owner = ?", (run_id, owner)
+            )
+
+    def leased(self, run_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM leases WHERE run_id = ? AND expires_at > ?",
+                (run_id, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def incomplete_runs(
+        self, older_than: float = 0.0, unleased: bool = False
+    ) -> List[str]:
+        """Runs with no `run_end` and no event in the last `older_than` seconds.
+
+        The candidates for a crash-recovery sweep: a run still recording
+        events is probably still being served. With `unleased`, only runs no
+        worker holds an unexpired lease on.
+        """
+        now = time.time()
+        sql = "SELECT run_id FROM runs WHERE status = 'running' AND updated_at < ?"
+        params: Tuple[Any, ...] = (now - older_than,)
+        if unleased:
+            sql += (
+                " AND NOT EXISTS (SELECT 1 FROM leases WHERE "
+                "leases.run_id = runs.run_id AND expires_at > ?)"
+            )
+            params += (now,)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY updated_at", params).fetchall()
+        return [run_id for (run_id,) in rows]
+
+    def close(self) -> None:
+        """Commit queued appends and release the database."""
+        self._writer.close()
+        with self._lock:
+            self._db.close()
+
+
+def replay_messages(events: Iterable[Event]) -> MessageHistory:
     """Rebuild the model's message list from a persisted run.
 
-    Each `generation` records the request exactly as it was sent, so the most
-    recent one plus its own reply and any tool results that followed is the
-    full conversation. Nothing needs to be inferred.
+    Each `generation` records the request exactly as it was sent (as a delta
+    on the one before it), so the most recent one plus its own reply and any
+    tool results that followed is the full conversation. Nothing needs to be
+    inferred.
     """
     start: Optional[Event] = None
+    checkpoint: Optional[Event] = None
     last_generation: Optional[Event] = None
+    current: Optional[MessageHistory] = None
+    request = MessageHistory()
     trailing: List[Event] = []
 
     for event in events:
-        if event.type == "run_start" and start is None:
-            start = event
+        if event.type == "run_start":
+            if start is None:
+                start = event
+            current = MessageHistory(event.messages or [])
+        elif event.type == "checkpoint":
+            # the whole conversation as of the end of its turn: nothing
+            # before it is needed any more
+            checkpoint = event
+            current = MessageHistory(event.messages or [])
+            last_generation = None
+            trailing = []
         elif event.type == "generation":
+            current = expand_messages(current, event)
+            request = current
             last_generation = event
             trailing = []
         elif event.type == "tool_result" and last_generation is not None:
             trailing.append(event)
 
     if last_generation is None:
+        if checkpoint is not None:
+            return MessageHistory(checkpoint.messages or [])
         # Crashed before the first response; the input recorded at run_start is
         # all that is needed to start over.
-        return [dict(m) for m in (start.messages or [])] if start else []
+        return MessageHistory(start.messages or []) if start else MessageHistory()
 
-    messages: List[Dict[str, Any]] = [dict(m) for m in (last_generation.messages or [])]
+    messages = MessageHistory(request)
 
     requested = {
         call.get("id") for call in (last_generation.calls or []) if call.get("id")
@@ -135,50 +1158,153 @@ def replay_messages(events: List[Event]) -> List[Dict[str, Any]]:
     assistant: Dict[str, Any] = {"role": "assistant", "content": last_generation.text}
     if last_generation.calls:
         assistant["tool_calls"] = last_generation.calls
-    messages.append(assistant)
-
-    for event in trailing:
-        messages.append(
-            {
-                "role": "tool",
-                "tool_call_id": event.call_id,
-                "content": event.result or "",
-            }
-        )
-    return messages
+    return messages.appended(assistant).extended(
+        {
+            "role": "tool",
+            "tool_call_id": event.call_id,
+            "content": event.result or "",
+        }
+        for event in trailing
+    )
 
 
-def is_complete(events: List[Event]) -> bool:
+def is_complete(events: Iterable[Event]) -> bool:
     return any(e.type == "run_end" and e.status == "completed" for e in events)
 
 
-def final_event(events: List[Event]) -> Optional[Event]:
-    for event in reversed(events):
+def final_event(events: Iterable[Event]) -> Optional[Event]:
+    if isinstance(events, list):
+        # newest first, so a loaded log is not walked from its start
+        return next((e for e in reversed(events) if e.type == "run_end"), None)
+    end: Optional[Event] = None
+    for event in events:
         if event.type == "run_end":
-            return event
-    return None
+            end = event
+    return end
 
 
-def total_usage(events: List[Event]) -> Usage:
+def total_usage(events: Iterable[Event]) -> Usage:
     """Sum every generation in the log.
 
     Deliberately not the terminal event's usage: a resumed run has one
     `run_end` per segment, and the last one counts only the continuation, so
-    reading it would silently drop everything spent before the resume.
+    reading it would silently drop everything spent before the resume. A
+    `checkpoint` carries the total up to it, so a log read from one is summed
+    from there.
     """
     total = Usage()
     for event in events:
-        if event.type == "generation" and event.usage:
+        if event.type == "checkpoint" and event.usage:
+            total = event.usage
+        elif event.type == "generation" and event.usage:
             total = total + event.usage
     return total
 
 
+def load_tail(store: Store, run_id: str) -> List[Event]:
+    """The run's events from its latest checkpoint on, where the store can.
+
+    Enough for `replay_messages`, `total_usage` and `is_complete`; a store
+    without `load_tail` returns the whole log.
+    """
+    tail = getattr(store, "load_tail", None)
+    return tail(run_id) if tail is not None else store.load(run_id)
+
+
+def iter_events(store: Store, run_id: str) -> Iterator[Event]:
+    """The run's events one at a time, without loading the log where the
+    store can stream it."""
+    stream = getattr(store, "iter_events", None)
+    return stream(run_id) if stream is not None else iter(store.load(run_id))
+
+
+def last_event(store: Store, run_id: str) -> Optional[Event]:
+    """The run's last event, read from the end of its log where the store can."""
+    last = getattr(store, "last_event", None)
+    if last is not None:
+        return last(run_id)
+    events = store.load(run_id)
+    return events[-1] if events else None
+
+
+async def aappend(
+    store: Store, run_id: str, event: Event, lease_owner: Optional[str] = None
+) -> None:
+    """Append from the event loop: the store's own `aappend` if it has one,
+    else `append` on a worker thread, or directly for a non-blocking store.
+
+    `lease_owner` is passed on to a store that `fences_writes`, and otherwise
+    ignored.
+    """
+    args: Tuple[Any, ...] = (run_id, event)
+    if lease_owner is not None and getattr(store, "fences_writes", False):
+        args += (lease_owner,)
+    native = getattr(store, "aappend", None)
+    if native is not None:
+        await native(*args)
+    elif getattr(store, "blocking", True):
+        await asyncio.to_thread(store.append, *args)
+    else:
+        store.append(*args)
+
+
+async def aload(store: Store, run_id: str) -> List[Event]:
+    """`load` from the event loop; see `aappend`."""
+    native = getattr(store, "aload", None)
+    if native is not None:
+        return await native(run_id)
+    if getattr(store, "blocking", True):
+        return await asyncio.to_thread(store.load, run_id)
+    return store.load(run_id)
+
+
+async def aload_tail(store: Store, run_id: str) -> List[Event]:
+    """`load_tail` from the event loop; see `aappend`."""
+    native = getattr(store, "aload_tail", None)
+    if native is not None:
+        return await native(run_id)
+    if getattr(store, "blocking", True):
+        return await asyncio.to_thread(load_tail, store, run_id)
+    return load_tail(store, run_id)
+
+
+async def alist_runs(store: Store) -> List[str]:
+    """`list_runs` from the event loop; see `aappend`."""
+    native = getattr(store, "alist_runs", None)
+    if native is not None:
+        return await native()
+    if getattr(store, "blocking", True):
+        return await asyncio.to_thread(store.list_runs)
+    return store.list_runs()
+
+
+def is_run_complete(store: Store, run_id: str) -> bool:
+    """`is_complete` for a stored run, from its last event alone.
+
+    A run that completed ends with that run_end: resuming it returns rather
+    than appending, and compaction keeps the tail.
+    """
+    end = last_event(store, run_id)
+    return end is not None and end.type == "run_end" and end.status == "completed"
+
+
 __all__ = [
+    "ARCHIVE_CODECS",
     "FileStore",
     "MemoryStore",
+    "RunInfo",
+    "SqliteStore",
     "Store",
+    "aappend",
+    "alist_runs",
+    "aload",
+    "aload_tail",
     "final_event",
     "is_complete",
+    "is_run_complete",
+    "iter_events",
+    "last_event",
+    "load_tail",
     "new_run_id",
     "replay_messages",
     "total_usage",
@@ -0,0 +1,197 @@
+"""Runs decoupled from the clients watching them.
+
+Iterating `AgentLoop.astream` directly drives the run at the consumer's pace:
+a slow SSE client stalls the model stream and the tool calls behind it, and
+keeps the provider's connection open for as long as it takes to read. A
+`RunHandle` runs the loop in its own task instead and hands events to each
+attached consumer through a bounded buffer, so the run goes at its own pace
+and always finishes, trace export included, whoever is still watching.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import weakref
+from collections import deque
+from typing import AsyncIterator, Deque, List, Literal, Optional, Set
+
+from agentor.engine.events import Event
+
+logger = logging.getLogger(__name__)
+
+#: what happens when a consumer's buffer is full.
+#: "coalesce" merges the new `text_delta` into the last one buffered, so the
+#: client later reads the same text in fewer, larger chunks; other events are
+#: always buffered, since a run has only a handful of them per turn. The run
+#: never waits for the client.
+#: "block" makes the run wait until the client catches up, for consumers
+#: that must see every chunk as it was produced.
+Overflow = Literal["coalesce", "block"]
+
+#: default buffered events per consumer
+DEFAULT_BUFFER = 256
+
+# tasks must be referenced until they finish, or they may be collected
+# mid-run; a caller is free to drop its handle once it stops watching
+_running: Set[asyncio.Task] = set()
+
+
+class _Consumer:
+    """One attached consumer's buffer."""
+
+    def __init__(self, maxsize: int, overflow: Overflow):
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.buffer: Deque[Event] = deque()
+        self.finished = False
+        self.detached = False
+        #: text_delta events merged into an earlier one
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+
+    async def put(self, event: Event) -> None:
+        if len(self.buffer) >= self.maxsize:
+            if self.overflow == "block":
+                while len(self.buffer) >= self.maxsize and not self.detached:
+                    self._space.clear()
+                    await self._space.wait()
+                if self.detached:
+                    return
+            elif event.type == "text_delta":
+                tail = self.buffer[-1]
+                if tail.type == "text_delta" and tail.turn == event.turn:
+                    # replaced, not edited: the event is shared with the
+                    # other consumers
+                    self.buffer[-1] = dataclasses.replace(
+                        tail, text=(tail.text or "") + (event.text or "")
+                    )
+                    self.coalesced += 1
+                    return
+        self.buffer.append(event)
+        self._ready.set()
+
+    async def get(self) -> Optional[Event]:
+        """The next event, or None once the run has ended and all are read."""
+        while not self.buffer:
+            if self.finished:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        event = self.buffer.popleft()
+        self._space.set()
+        return event
+
+    def finish(self) -> None:
+        self.finished = True
+        self._ready.set()
+
+    def detach(self) -> None:
+        self.detached = True
+        self.buffer.clear()
+        # a run blocked on this consumer must not wait for it any longer
+        self._space.set()
+
+
+class RunHandle:
+    """A run executing in its own task, watched through `attach()`.
+
+    Built by `AgentLoop.start`. Any number of consumers can attach, each with
+    its own buffer of `buffer` events and the `overflow` policy; a consumer
+    sees the events emitted from when it attached. Detaching, by closing the
+    iterator or just abandoning it, never affects the run. `wait()` returns
+    the run's `run_end` event, or raises what the run raised.
+    """
+
+    def __init__(
+        self,
+        events: AsyncIterator[Event],
+        buffer: int = DEFAULT_BUFFER,
+        overflow: Overflow = "coalesce",
+    ):
+        if buffer < 1:
+            raise ValueError("buffer must be at least 1")
+        if overflow not in ("coalesce", "block"):
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+        self.buffer = buffer
+        self.overflow: Overflow = overflow
+        self.run_end: Optional[Event] = None
+        self._consumers: List[_Consumer] = []
+        self._error: Optional[BaseException] = None
+        self._done = False
+        self._task = asyncio.create_task(self._run(events))
+        _running.add(self._task)
+        self._task.add_done_callback(_running.discard)
+
+    async def _run(self, events: AsyncIterator[Event]) -> None:
+        try:
+            async for event in events:
+                if event.type == "run_end":
+                    self.run_end = event
+                for consumer in list(self._consumers):
+                    await consumer.put(event)
+        except Exception as exc:
+            # already reported as the failed run_end; kept for wait() and for
+            # consumers to re-raise, as iterating astream would have
+            self._error = exc
+        finally:
+            self._done = True
+            for consumer in self._consumers:
+                consumer.finish()
+
+    def attach(self) -> AsyncIterator[Event]:
+        """Watch the run from now on.
+
+        Registered at once, not on first iteration, so attaching right after
+        `start` misses nothing.
+        """
+        consumer = _Consumer(self.buffer, self.overflow)
+        if self._done:
+            consumer.finish()
+        else:
+            self._consumers.append(consumer)
+        events = self._drain(consumer)
+        # an iterator dropped before its first step never runs its finally
+        weakref.finalize(events, self._detach, consumer)
+        return events
+
+    def _detach(self, consumer: _Consumer) -> None:
+        if consumer in self._consumers:
+            self._consumers.remove(consumer)
+        consumer.detach()
+
+    async def _drain(self, consumer: _Consumer) -> AsyncIterator[Event]:
+        try:
+            while True:
+                event = await consumer.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            self._detach(consumer)
+            if consumer.coalesced:
+                logger.debug(
+                    "Coalesced %d text deltas for a slow consumer", consumer.coalesced
+                )
+        if self._error is not None:
+            raise self._error
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    async def wait(self) -> Optional[Event]:
+        """Wait for the run to end; its `run_end` event."""
+        await asyncio.shield(self._task)
+        if self._error is not None:
+            raise self._error
+        return self.run_end
+
+    def cancel(self) -> None:
+        """Stop the run. Its trace is still exported."""
+        self._task.cancel()
+
+
+__all__ = ["DEFAULT_BUFFER", "Overflow", "RunHandle"]
@@ -7,15 +7,35 @@ a `BaseTool` capability, an openai-agents `FunctionTool`, or a registry name.
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import inspect
 import json
 import logging
 import re
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, get_type_hints
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    get_type_hints,
+)
 
 from pydantic import create_model
 
+from agentor.engine.cache import Cache, MemoryCache, cache_key
+from agentor.engine.history import FrozenList, freeze
+
 logger = logging.getLogger(__name__)
 
 # Matches "name: description" or "name (type): description" inside an Args:
@@ -132,6 +152,33 @@ def build_schema(
     return summary, schema, context_param
 
 
+class ConcurrencyLimit:
+    """Caps how many calls may hold a slot at once, across every run.
+
+    Tools outlive any one event loop (`run()` starts a fresh one per call), and
+    an asyncio semaphore binds to the first loop that waits on it, so one is
+    kept per loop.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError(f"Concurrency limit must be at least 1, got {limit}.")
+        self.limit = limit
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        async with semaphore:
+            yield
+
+    def __repr__(self) -> str:
+        return f"ConcurrencyLimit({self.limit})"
+
+
 @dataclass
 class Tool:
     name: str
@@ -140,28 +187,89 @@ class Tool:
     invoke: Callable[..., Any]
     #: parameter that receives the run context instead of model-supplied args
     context_param: Optional[str] = None
+    #: shared by every run using this tool, so a downstream (a database, an
+    #: API) sees at most `limit` calls at once however many runs fan out to it
+    limit: Optional[ConcurrencyLimit] = None
+    #: seconds a call may run before the loop gives up on it; None defers to
+    #: the loop's `tool_timeout`
+    timeout: Optional[float] = None
+    #: memoizes results by (name, args); only for tools whose result depends
+    #: on nothing else, since a hit skips the call entirely
+    cache: Optional[Cache] = None
+    #: seconds a cached result stays valid; None defers to the cache's own ttl
+    cache_ttl: Optional[float] = None
+    #: part of every cache key, so tools that share a name and a cache but
+    #: not their configuration (two `BaseTool` instances with other
+    #: credentials) never answer for each other
+    cache_scope: Optional[str] = None
+    _openai: Optional[Dict[str, Any]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def to_openai(self) -> Dict[str, Any]:
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": self.parameters,
-            },
-        }
-
-    async def call(self, args: Dict[str, Any], context: Any = None) -> str:
+        """The chat-completions schema, built once and frozen.
+
+        Sent on every turn of every run, so it is not rebuilt each time. Frozen
+        because it is shared: an adapter editing it would change what every
+        other run sends.
+        """
+        if self._openai is None:
+            self._openai = freeze(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": self.name,
+                        "description": self.description,
+                        "parameters": self.parameters,
+                    },
+                }
+            )
+        return self._openai
+
+    def cache_key(self, args: Dict[str, Any]) -> str:
+        """The key this tool's result for `args` is cached under."""
+        if self.cache_scope is None:
+            return cache_key(self.name, args)
+        return cache_key(self.cache_scope, self.name, args)
+
+    async def call(
+        self,
+        args: Dict[str, Any],
+        context: Any = None,
+        deadline: Optional[float] = None,
+        abandoned: Optional[List[asyncio.Future]] = None,
+    ) -> str:
+        """Invoke the tool and stringify what it returns.
+
+        A sync tool runs on a worker thread, which cancelling the call cannot
+        stop. If the call is cancelled while the thread still runs, the
+        thread's future is appended to `abandoned`, so a caller can keep what
+        the tool holds (its concurrency slots) until it really returns.
+        """
         kwargs = dict(args)
         if self.context_param:
-            kwargs[self.context_param] = _ContextWrapper(context)
+            kwargs[self.context_param] = _ContextWrapper(context, deadline=deadline)
         if inspect.iscoroutinefunction(self.invoke):
             result = await self.invoke(**kwargs)
         else:
             # Most BaseTool capabilities are sync and do blocking IO. Calling
             # them inline would serialize the parallel tool calls the loop
             # gathers, and stall every other coroutine on the loop with them.
-            result = await asyncio.to_thread(lambda: self.invoke(**kwargs))
+            worker = asyncio.ensure_future(
+                asyncio.to_thread(lambda: self.invoke(**kwargs))
+            )
+            try:
+                # shielded, so the future tracks the thread rather than
+                # reporting it cancelled while it still runs
+                result = await asyncio.shield(worker)
+            except asyncio.CancelledError:
+                if worker.done():
+                    raise
+                if abandoned is not None:
+                    abandoned.append(worker)
+                else:
+                    worker.add_done_callback(_drop_abandoned)
+                raise
             if inspect.isawaitable(result):
                 result = await result
         return stringify(result)
@@ -172,26 +280,100 @@ class Tool:
         fn: Callable,
         name: Optional[str] = None,
         description: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        limit: Optional[ConcurrencyLimit] = None,
+        timeout: Optional[float] = None,
+        cache: Any = None,
+        cache_ttl: Optional[float] = None,
+        cache_scope: Optional[str] = None,
     ) -> "Tool":
         summary, schema, context_param = build_schema(fn)
+        if limit is None and max_concurrency is not None:
+            limit = ConcurrencyLimit(max_concurrency)
         return cls(
             name=name or getattr(fn, "__name__", "tool"),
             description=description or summary,
             parameters=schema,
             invoke=fn,
             context_param=context_param,
+            limit=limit,
+            timeout=timeout,
+            cache=resolve_cache(cache),
+            cache_ttl=cache_ttl,
+            cache_scope=cache_scope,
         )
 
 
+class ToolSchemas(FrozenList):
+    """The `tools` payload for one set of tools, ready to send.
+
+    `encoded` is its canonical JSON, computed once, for anything that needs
+    the bytes or a stable key rather than the objects.
+    """
+
+    @cached_property
+    def encoded(self) -> bytes:
+        return json.dumps(self, sort_keys=True, separators=(",", ":")).encode()
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.sha256(self.encoded).hexdigest()
+
+
+class SchemaCache:
+    """Least-recently-used cache of `ToolSchemas`, keyed by the tools offered.
+
+    Keyed on identity rather than names: a name says nothing about the schema
+    behind it, and MCP tools are rebuilt per connection. Each entry holds its
+    tools, so an id in a live key cannot be reused by another object.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[
+            Tuple[int, ...], Tuple[Tuple[Tool, ...], ToolSchemas]
+        ] = OrderedDict()
+        # with_model clones share the cache and may run on other threads
+        self._lock = threading.Lock()
+
+    def get(self, tools: Iterable[Tool]) -> Optional[ToolSchemas]:
+        offered = tuple(tools)
+        if not offered:
+            return None
+        key = tuple(id(tool) for tool in offered)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        schemas = ToolSchemas(tool.to_openai() for tool in offered)
+        with self._lock:
+            self._entries[key] = (offered, schemas)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return schemas
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 def function_tool(
     func: Optional[Callable] = None,
     *,
     name_override: Optional[str] = None,
     description_override: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cache: Any = None,
+    cache_ttl: Optional[float] = None,
     **compat: Any,
 ) -> Any:
     """Turn a function into a `Tool`.
 
+    `cache=True` memoizes results in process, keyed by the arguments; pass a
+    `MemoryCache` or `SqliteCache` to size it or share it between processes.
+
     Options the previously exported decorator accepted (`strict_mode`,
     `failure_error_function`, `use_docstring_info` and the rest) are still
     accepted and ignored, so existing definitions keep importing rather than
@@ -209,7 +391,13 @@ def function_tool(
 
     def decorator(fn: Callable) -> Tool:
         return Tool.from_function(
-            fn, name=name_override, description=description_override
+            fn,
+            name=name_override,
+            description=description_override,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            cache=cache,
+            cache_ttl=cache_ttl,
         )
 
     if func is not None:
@@ -217,18 +405,44 @@ def function_tool(
     return decorator
 
 
+def resolve_cache(cache: Any) -> Optional[Cache]:
+    """Normalize a `cache=` option: True for a new `MemoryCache`, falsy for none."""
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return MemoryCache()
+    if not isinstance(cache, Cache):
+        raise TypeError(
+            f"cache must be True, False or a Cache (MemoryCache, SqliteCache), "
+            f"got {type(cache).__name__}."
+        )
+    return cache
+
+
 class RunContext:
     """Wrapper handed to a tool parameter annotated as the run context.
 
     A tool declares `ctx: RunContext` and reads `ctx.context` to reach whatever
     the agent was constructed with. openai-agents' `RunContextWrapper`
     annotation is still recognised, so existing tools need no change.
+
+    `deadline` is the `time.monotonic()` instant the run gives up on this
+    call, or None. The loop abandons a call at its deadline but cannot stop a
+    sync tool's thread, so a tool doing long blocking work should pass
+    `remaining()` on as its own timeout.
     """
 
-    __slots__ = ("context",)
+    __slots__ = ("context", "deadline")
 
-    def __init__(self, context: Any = None):
+    def __init__(self, context: Any = None, deadline: Optional[float] = None):
         self.context = context
+        self.deadline = deadline
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, never negative; None if unbounded."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
 
     def __class_getitem__(cls, _item: Any) -> type:
         # tools were commonly annotated RunContextWrapper[Config]; staying
@@ -241,6 +455,13 @@ class RunContext:
 _ContextWrapper = RunContext
 
 
+def _drop_abandoned(worker: asyncio.Future) -> None:
+    # retrieve what a call nobody awaits any more raised, so asyncio does not
+    # report it as never retrieved
+    if not worker.cancelled() and worker.exception() is not None:
+        logger.debug("Abandoned tool call failed: %r", worker.exception())
+
+
 def stringify(value: Any) -> str:
     if value is None:
         return ""
@@ -277,8 +498,21 @@ def resolve_tools(tools: Optional[List[Any]]) -> List[Tool]:
             resolved.append(Tool.from_function(entry["function"], name=item))
 
         elif isinstance(item, BaseTool):
+            # one limit for the instance: its capabilities share a downstream
+            limit = item.concurrency_limit()
+            scope = item.result_cache_scope()
             for attr_name, method in item.list_capabilities():
-                resolved.append(Tool.from_function(method, name=attr_name))
+                resolved.append(
+                    Tool.from_function(
+                        method,
+                        name=attr_name,
+                        limit=limit,
+                        timeout=item.timeout,
+                        cache=item.result_cache(method),
+                        cache_ttl=item.result_cache_ttl(method),
+                        cache_scope=scope,
+                    )
+                )
 
         elif callable(item):
             resolved.append(Tool.from_function(item))
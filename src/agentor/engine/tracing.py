@@ -12,7 +12,8 @@ import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from agentor.engine.events import Event
+from agentor.engine.events import Event, expand_messages
+from agentor.engine.history import MessageHistory
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,8 @@ class TraceCollector:
         self.metadata = metadata
         self.agent_span_id = f"span_{uuid.uuid4().hex}"
         self.items: List[Dict[str, Any]] = []
+        #: the last full request seen; generations after the first are deltas
+        self._request: Optional[List[Dict[str, Any]]] = None
 
     def _span(
         self, span_data: Dict[str, Any], event: Event, parent: Optional[str] = None
@@ -70,14 +73,20 @@ class TraceCollector:
             self._agent_started_at = event.started_at
             self._agent_name = event.agent
             self._agent_model = event.model
+            self._request = MessageHistory(event.messages or [])
 
         elif event.type == "generation":
+            # a span shows the request as sent, not the delta that was logged
+            self._request = expand_messages(self._request, event)
             self.items.append(
                 self._span(
                     {
                         "type": "generation",
                         "model": event.model,
-                        "input": event.messages,
+                        # a history policy may have trimmed what was sent
+                        "input": event.sent
+                        if event.sent is not None
+                        else self._request.tolist(),
                         "output": event.text,
                         "tool_calls": event.calls,
                         "usage": {
@@ -1,18 +1,60 @@
+import functools
 from abc import ABC
-from functools import cache
 from types import FunctionType
 from typing import Any, Callable, List, Optional, Tuple, overload
 
+from agentor.engine.cache import Cache, cache_key
+from agentor.engine.tools import ConcurrencyLimit, function_tool, resolve_cache
 from agentor.engine.tools import Tool as FunctionTool
-from agentor.engine.tools import function_tool
 from agentor.mcp.server import LiteMCP
 from agentor.types import ToolType
 
+#: attributes that tune how the engine runs a tool, not what the tool does
+_ENGINE_SETTINGS = frozenset(
+    {"max_concurrency", "timeout", "cache", "cache_ttl", "cache_scope"}
+)
 
-def capability(func: Callable):
-    """Decorator to mark a method as a tool capability."""
-    func._is_capability = True
-    return func
+
+def _scope_value(value: Any) -> Any:
+    """`value` as it goes into a derived cache scope.
+
+    JSON values as they are; any other object (an API client, an executor) by
+    its class alone, since its `str` usually carries a memory address that
+    would make the scope differ per instance and per process.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_scope_value(item) for item in value]
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: _scope_value(item) for key, item in value.items()}
+    cls = type(value)
+    return f"<{cls.__module__}.{cls.__qualname__}>"
+
+
+def capability(
+    func: Optional[Callable] = None,
+    *,
+    cache: Any = None,
+    cache_ttl: Optional[float] = None,
+):
+    """Decorator to mark a method as a tool capability.
+
+    Used bare, or with options: `@capability(cache=True, cache_ttl=60)`
+    memoizes the capability's results by its arguments. `cache=True` shares
+    the instance's cache (see `BaseTool.cache`); a `Cache` is used as-is, and
+    `cache=False` opts out of a cache set on the class.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        fn._is_capability = True
+        fn._cache = cache
+        fn._cache_ttl = cache_ttl
+        return fn
+
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 
 class BaseTool(ABC):
@@ -23,11 +65,104 @@ class BaseTool(ABC):
 
     name: str = "un-named-tool"
     description: str | None = None
+    #: most calls to this tool's capabilities the engine runs at once, across
+    #: every run in the process; None for no limit
+    max_concurrency: int | None = None
+    #: seconds the engine lets one call run before reporting it timed out;
+    #: None defers to the agent's tool_timeout
+    timeout: float | None = None
+    #: memoize every capability's results by its arguments: True for an
+    #: in-process cache per instance, or a `Cache` (`SqliteCache` to persist
+    #: and share). Only for capabilities that read; `@capability(cache=False)`
+    #: exempts one
+    cache: Any = None
+    #: seconds a cached result stays valid; None defers to the cache's own ttl
+    cache_ttl: float | None = None
+    #: keeps this instance's cached results apart from other instances' in a
+    #: shared cache; None derives it from the class and the instance's
+    #: configuration (see `result_cache_scope`)
+    cache_scope: str | None = None
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        cache: Any = None,
+    ):
         self.api_key = api_key
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if cache is not None:
+            self.cache = cache
         self._mcp_server: Optional[LiteMCP] = None
 
+    def result_cache(self, func: Callable) -> Optional[Cache]:
+        """The cache a capability's results go to, or None if it is not cached."""
+        option = getattr(func, "_cache", None)
+        if option is None:
+            option = self.cache
+        if option is not True:
+            return resolve_cache(option)
+        # one cache per instance, created on first use: two instances may be
+        # configured differently (another database, another account), so
+        # their results must not be shared. Keys carry the capability name,
+        # which keeps capabilities apart within the one cache.
+        shared = self.__dict__.get("_result_cache")
+        if shared is None:
+            shared = self.__dict__["_result_cache"] = resolve_cache(True)
+        return shared
+
+    def result_cache_scope(self) -> str:
+        """What this instance's cache keys are scoped to.
+
+        `cache_scope` if set; otherwise the class plus a hash of the
+        instance's public attributes when first resolved, which is what its
+        constructor configured (an API key, a base path). Two instances
+        configured alike share results in a `SqliteCache`, across processes
+        too, and two configured differently never do. The engine's own
+        settings are left out, since they do not change what a call returns.
+
+        Attributes that are not JSON values, such as an API client, count by
+        their class only. A tool holding a client built from credentials
+        should set `cache_scope` (per account, say) if instances configured
+        with different ones share a cache.
+        """
+        if self.cache_scope is not None:
+            return self.cache_scope
+        scope = self.__dict__.get("_cache_scope")
+        if scope is None:
+            # kept, so state the tool updates as it runs does not move it
+            config = {
+                name: _scope_value(value)
+                for name, value in vars(self).items()
+                if not name.startswith("_") and name not in _ENGINE_SETTINGS
+            }
+            cls = type(self)
+            scope = self.__dict__["_cache_scope"] = (
+                f"{cls.__module__}.{cls.__qualname__}:{cache_key(config)[:16]}"
+            )
+        return scope
+
+    def concurrency_limit(self) -> Optional[ConcurrencyLimit]:
+        """The limit every capability of this instance shares, or None.
+
+        Created on first use and kept on the instance, so each agent and run
+        that resolves the tool queues on the same slots.
+        """
+        if self.max_concurrency is None:
+            return None
+        limit = self.__dict__.get("_concurrency_limit")
+        if limit is None or limit.limit != self.max_concurrency:
+            limit = self.__dict__["_concurrency_limit"] = ConcurrencyLimit(
+                self.max_concurrency
+            )
+        return limit
+
+    def result_cache_ttl(self, func: Callable) -> Optional[float]:
+        """Seconds a capability's cached results stay valid."""
+        ttl = getattr(func, "_cache_ttl", None)
+        return self.cache_ttl if ttl is None else ttl
+
     def list_capabilities(self) -> List[Tuple[str, FunctionType]]:
         """List all capabilities of the tool."""
         return [
@@ -55,7 +190,7 @@ class BaseTool(ABC):
 
         return tools
 
-    @cache
+    @functools.cache
     def json_schema(self) -> List[ToolType]:
         """Convert all capabilities to JSON Schema."""
         function_tools = self.to_openai_function()
@@ -26,12 +26,20 @@ class PostgreSQLTool(BaseTool):
     name = "postgresql"
     description = "Execute SQL queries on a PostgreSQL database."
 
-    def __init__(self, dsn: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        dsn: str,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        cache: Any = None,
+    ):
         if psycopg2 is None:
             raise ImportError(
                 "PostgreSQL dependency is missing. Please install it with `pip install agentor[postgres]`."
             )
-        super().__init__(api_key)
+        # `cache` memoizes query results: only for a read-only role, since a
+        # cached write would be reported done without running
+        super().__init__(api_key, max_concurrency=max_concurrency, cache=cache)
         self.dsn = dsn
 
     @capability
@@ -24,7 +24,7 @@ class TimezoneTool(BaseTool):
         except pytz.UnknownTimeZoneError:
             return f"Error: Unknown timezone '{timezone}'"
 
-    @capability
+    @capability(cache=True)
     def list_timezones(self) -> str:
         """
         List all available timezones.
@@ -0,0 +1,17 @@
+import pytest
+
+from agentor.engine.store import FileStore, MemoryStore, SqliteStore
+
+
+@pytest.fixture(params=["memory", "file", "sqlite"])
+def store(request, tmp_path):
+    """Each store the engine ships, for tests every one of them must pass."""
+    if request.param == "memory":
+        store = MemoryStore()
+    elif request.param == "file":
+        store = FileStore(tmp_path / "runs")
+    else:
+        store = SqliteStore(tmp_path / "runs.sqlite")
+    yield store
+    if hasattr(store, "close"):
+        store.close()
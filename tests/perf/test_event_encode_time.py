@@ -0,0 +1,52 @@
+import timeit
+
+from agentor.engine.events import Event, Usage
+from agentor.engine.history import MessageHistory
+
+#: `to_json` of a text_delta measures ~6us locally. Every streamed chunk of
+#: every run pays it at least once, for the store and again for the trace.
+_SMALL_EVENT_BUDGET_S = 50e-6
+
+#: `to_dict` of a checkpoint carrying 200 messages costs ~2x that of a
+#: text_delta when nested data is shared, and ~150x when it is deep-copied
+#: as `dataclasses.asdict` does.
+_CONVERSATION_RATIO_BUDGET = 15
+
+
+def test_a_small_event_encodes_within_budget() -> None:
+    event = Event(type="text_delta", text="Hello", turn=1)
+    elapsed = _per_call(event.to_json, number=2000)
+    assert elapsed < _SMALL_EVENT_BUDGET_S, (
+        f"Event.to_json took {elapsed * 1e6:.1f}us per event, over the "
+        f"{_SMALL_EVENT_BUDGET_S * 1e6:.0f}us budget"
+    )
+
+
+def test_encoding_does_not_copy_the_conversation() -> None:
+    """`to_dict` must not grow with the size of the messages it carries.
+
+    A checkpoint holds the whole conversation, and a `generation` its delta;
+    copying them on every event persisted or traced made encoding a long run
+    quadratic.
+    """
+    messages = [
+        {"role": "user", "content": "word " * 50, "tool_calls": [{"id": "c"}]}
+        for _ in range(200)
+    ]
+    checkpoint = Event(
+        type="checkpoint", messages=MessageHistory(messages), usage=Usage(1, 2, 3)
+    )
+    delta = Event(type="text_delta", text="Hello", turn=1)
+
+    ratio = _per_call(checkpoint.to_dict, number=200) / _per_call(
+        delta.to_dict, number=200
+    )
+    assert ratio < _CONVERSATION_RATIO_BUDGET, (
+        f"to_dict of a 200-message checkpoint cost {ratio:.0f}x a text_delta's; "
+        "something is copying nested data"
+    )
+
+
+def _per_call(fn, number: int) -> float:
+    """Best of five, so one scheduler hiccup does not fail the run."""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
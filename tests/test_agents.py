@@ -6,6 +6,7 @@ import pytest
 
 from agentor import ModelSettings
 from agentor.core import Agentor
+from agentor.engine import ModelResponse
 from agentor.prompts import THINKING_PROMPT, render_prompt
 
 
@@ -223,87 +224,85 @@ async def test_arun_with_agent_input_type(mock_run):
     assert result.final_output == "The weather in London is sunny"
 
 
-@pytest.mark.asyncio
-@patch("agentor.engine.loop.AgentLoop.arun")
-async def test_arun_with_fallback_on_rate_limit(mock_run):
-    """Test that fallback models are used when rate limit error occurs."""
-    # First call raises RateLimitError, second call succeeds
-    rate_limit_error = openai.RateLimitError(
+def _rate_limit_error():
+    return openai.RateLimitError(
         message="Rate limit exceeded",
         response=MagicMock(status_code=429),
         body={"error": {"message": "Rate limit exceeded"}},
     )
-    mock_run.side_effect = [
-        rate_limit_error,  # Primary model fails
-        MagicMock(final_output="Success with fallback model"),  # Fallback succeeds
-    ]
 
-    agent = Agentor(
-        name="Test agent",
-        model="gpt-5-mini",
-        api_key="test-key",
+
+class ScriptedModel:
+    """Answers each call with the next outcome; an exception is raised."""
+
+    def __init__(self, name, *outcomes):
+        self.model = name
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def complete(self, messages, tools=None, response_format=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if callable(outcome):
+            outcome = outcome(messages)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return ModelResponse(content=outcome)
+
+
+def _agent_with(primary, **fallbacks):
+    agent = Agentor(name="Test agent", model="gpt-5-mini", api_key="test-key")
+    agent._loop.model = primary
+    return agent, patch(
+        "agentor.core.agent.resolve_model",
+        side_effect=lambda name, **_: fallbacks[name],
     )
-    result = await agent.arun(
-        "What is the weather?",
-        fallback_models=["gpt-4o-mini"],
+
+
+@pytest.mark.asyncio
+async def test_arun_with_fallback_on_rate_limit():
+    """Test that fallback models are used when rate limit error occurs."""
+    backup = ScriptedModel("gpt-4o-mini", "Success with fallback model")
+    agent, fallbacks = _agent_with(
+        ScriptedModel("gpt-5-mini", _rate_limit_error()), **{"gpt-4o-mini": backup}
     )
+    with fallbacks:
+        result = await agent.arun(
+            "What is the weather?",
+            fallback_models=["gpt-4o-mini"],
+        )
 
-    assert mock_run.call_count == 2
+    assert backup.calls == 1
     assert result.final_output == "Success with fallback model"
 
 
 @pytest.mark.asyncio
-@patch("agentor.engine.loop.AgentLoop.arun")
-async def test_arun_with_fallback_tries_multiple_models(mock_run):
+async def test_arun_with_fallback_tries_multiple_models():
     """Test that multiple fallback models are tried in order."""
-    rate_limit_error = openai.RateLimitError(
-        message="Rate limit exceeded",
-        response=MagicMock(status_code=429),
-        body={"error": {"message": "Rate limit exceeded"}},
-    )
-    mock_run.side_effect = [
-        rate_limit_error,  # Primary model fails
-        rate_limit_error,  # First fallback fails
-        MagicMock(
-            final_output="Success with second fallback"
-        ),  # Second fallback succeeds
-    ]
-
-    agent = Agentor(
-        name="Test agent",
-        model="gpt-5-mini",
-        api_key="test-key",
-    )
-    result = await agent.arun(
-        "What is the weather?",
-        fallback_models=["gpt-4o-mini", "gpt-4o"],
+    first = ScriptedModel("gpt-4o-mini", _rate_limit_error())
+    second = ScriptedModel("gpt-4o", "Success with second fallback")
+    agent, fallbacks = _agent_with(
+        ScriptedModel("gpt-5-mini", _rate_limit_error()),
+        **{"gpt-4o-mini": first, "gpt-4o": second},
     )
+    with fallbacks:
+        result = await agent.arun(
+            "What is the weather?",
+            fallback_models=["gpt-4o-mini", "gpt-4o"],
+        )
 
-    assert mock_run.call_count == 3
+    assert (first.calls, second.calls) == (1, 1)
     assert result.final_output == "Success with second fallback"
 
 
 @pytest.mark.asyncio
-@patch("agentor.engine.loop.AgentLoop.arun")
-async def test_arun_raises_when_all_fallbacks_fail(mock_run):
+async def test_arun_raises_when_all_fallbacks_fail():
     """Test that original error is raised when all fallback models fail."""
-    rate_limit_error = openai.RateLimitError(
-        message="Rate limit exceeded",
-        response=MagicMock(status_code=429),
-        body={"error": {"message": "Rate limit exceeded"}},
+    agent, fallbacks = _agent_with(
+        ScriptedModel("gpt-5-mini", _rate_limit_error()),
+        **{"gpt-4o-mini": ScriptedModel("gpt-4o-mini", _rate_limit_error())},
     )
-    mock_run.side_effect = [
-        rate_limit_error,  # Primary model fails
-        rate_limit_error,  # Fallback also fails
-    ]
-
-    agent = Agentor(
-        name="Test agent",
-        model="gpt-5-mini",
-        api_key="test-key",
-    )
-
-    with pytest.raises(openai.RateLimitError):
+    with fallbacks, pytest.raises(openai.RateLimitError):
         await agent.arun(
             "What is the weather?",
             fallback_models=["gpt-4o-mini"],
@@ -311,58 +310,61 @@ async def test_arun_raises_when_all_fallbacks_fail(mock_run):
 
 
 @pytest.mark.asyncio
-@patch("agentor.engine.loop.AgentLoop.arun")
-async def test_arun_without_fallback_raises_immediately(mock_run):
+async def test_arun_without_fallback_raises_immediately():
     """Test that rate limit error is raised immediately when no fallback models provided."""
-    rate_limit_error = openai.RateLimitError(
-        message="Rate limit exceeded",
-        response=MagicMock(status_code=429),
-        body={"error": {"message": "Rate limit exceeded"}},
-    )
-    mock_run.side_effect = rate_limit_error
-
-    agent = Agentor(
-        name="Test agent",
-        model="gpt-5-mini",
-        api_key="test-key",
-    )
+    primary = ScriptedModel("gpt-5-mini", _rate_limit_error())
+    agent, _ = _agent_with(primary)
 
     with pytest.raises(openai.RateLimitError):
         await agent.arun("What is the weather?")
 
-    assert mock_run.call_count == 1
+    assert primary.calls == 1
 
 
 @pytest.mark.asyncio
-@patch("agentor.engine.loop.AgentLoop.arun")
-async def test_arun_batch_with_fallback_on_rate_limit(mock_run):
+async def test_arun_batch_with_fallback_on_rate_limit():
     """Test that fallback models work with batch processing."""
-    rate_limit_error = openai.RateLimitError(
-        message="Rate limit exceeded",
-        response=MagicMock(status_code=429),
-        body={"error": {"message": "Rate limit exceeded"}},
-    )
-    mock_run.side_effect = [
-        MagicMock(final_output="Weather in London"),  # First task succeeds
-        rate_limit_error,  # Second task fails
-        MagicMock(final_output="Weather in Paris with fallback"),  # Fallback succeeds
-    ]
 
-    agent = Agentor(
-        name="Test agent",
-        model="gpt-5-mini",
-        api_key="test-key",
-    )
-    results = await agent.arun(
-        ["What is the weather in London?", "What is the weather in Paris?"],
-        fallback_models=["gpt-4o-mini"],
+    def answer(messages):
+        prompt = messages[-1]["content"]
+        return _rate_limit_error() if "Paris" in prompt else "Weather in London"
+
+    agent, fallbacks = _agent_with(
+        ScriptedModel("gpt-5-mini", answer),
+        **{
+            "gpt-4o-mini": ScriptedModel(
+                "gpt-4o-mini", "Weather in Paris with fallback"
+            )
+        },
     )
+    with fallbacks:
+        results = await agent.arun(
+            ["What is the weather in London?", "What is the weather in Paris?"],
+            fallback_models=["gpt-4o-mini"],
+        )
 
     assert len(results) == 2
     assert results[0].final_output == "Weather in London"
     assert results[1].final_output == "Weather in Paris with fallback"
 
 
+@pytest.mark.asyncio
+async def test_fallback_models_are_resolved_once_per_agent():
+    """Repeated runs reuse the fallback chain rather than new clients."""
+    agent, _ = _agent_with(ScriptedModel("gpt-5-mini", "ok"))
+    with patch(
+        "agentor.core.agent.resolve_model",
+        side_effect=lambda name, **_: ScriptedModel(name, "fallback"),
+    ) as resolve:
+        for _ in range(3):
+            await agent.arun(["a", "b"], fallback_models=["gpt-4o-mini"])
+        assert resolve.call_count == 1
+
+        agent._loop.model = ScriptedModel("gpt-5", "ok")
+        await agent.arun("c", fallback_models=["gpt-4o-mini"])
+        assert resolve.call_count == 2
+
+
 # Tracing integration tests
 @patch("agentor.core.agent.setup_celesto_tracing")
 def test_agentor_with_enable_tracing_true(mock_setup_tracing):
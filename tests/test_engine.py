@@ -4,15 +4,22 @@ The loop is exercised against a scripted fake model so behaviour is asserted
 without network access.
 """
 
+import asyncio
 import json
+from types import SimpleNamespace
 from typing import Literal, Optional
 
 import pytest
 from pydantic import BaseModel
 
 from agentor.engine import AgentLoop, Tool, resolve_tools
-from agentor.engine.events import Usage
-from agentor.engine.models import ModelResponse, StreamChunk, ToolCall
+from agentor.engine.events import Usage, request_messages
+from agentor.engine.models import (
+    ChatCompletionsModel,
+    ModelResponse,
+    StreamChunk,
+    ToolCall,
+)
 from agentor.engine.tools import build_schema, parse_docstring
 from agentor.tools.base import BaseTool, capability
 
@@ -360,14 +367,15 @@ async def test_generation_events_carry_span_data():
     assert len(generations) == 2
 
     first, second = generations
+    first_request, second_request = request_messages(events)
     # the request as actually sent, before the assistant reply was appended
-    assert [m["role"] for m in first.messages] == ["system", "user"]
+    assert [m["role"] for m in first_request] == ["system", "user"]
     assert first.calls[0]["function"]["name"] == "weather"
     assert first.model == "fake-model"
     assert first.ended_at >= first.started_at
 
     # the second call must include the tool result
-    assert [m["role"] for m in second.messages] == [
+    assert [m["role"] for m in second_request] == [
         "system",
         "user",
         "assistant",
@@ -376,6 +384,29 @@ async def test_generation_events_carry_span_data():
     assert second.text == "sunny"
 
 
+@pytest.mark.asyncio
+async def test_generation_events_record_only_new_messages():
+    """A full snapshot per turn made the log quadratic in run length."""
+    model = FakeModel(
+        calls(("weather", '{"city": "A"}')),
+        calls(("weather", '{"city": "B"}')),
+        text("done"),
+    )
+    loop = AgentLoop(model=model, tools=[weather], instructions="sys")
+
+    events = [e async for e in loop.astream("go")]
+    generations = [e for e in events if e.type == "generation"]
+
+    # the input lives on run_start; later turns carry the assistant reply and
+    # the tool result that followed it
+    assert [(g.base, len(g.messages)) for g in generations] == [
+        (2, 0),
+        (2, 2),
+        (4, 2),
+    ]
+    assert request_messages(events)[-1] == model.calls[-1]["messages"]
+
+
 @pytest.mark.asyncio
 async def test_tool_result_events_are_timed():
     model = FakeModel(calls(("weather", '{"city": "Rome"}')), text("ok"))
@@ -397,6 +428,130 @@ async def test_astream_text_deltas():
     assert "".join(deltas).strip() == "one two three"
 
 
+class AnnouncingModel:
+    """Streams two tool calls, and only finishes once the first has run."""
+
+    model = "announcing-model"
+
+    def __init__(self):
+        self.first_ran = asyncio.Event()
+        self.turns = 0
+
+    async def complete(self, messages, tools=None, response_format=None):
+        raise AssertionError("eager_tools must stream")
+
+    async def stream(self, messages, tools=None, response_format=None):
+        self.turns += 1
+        if self.turns > 1:
+            yield StreamChunk(final=text("done"))
+            return
+        first = ToolCall(id="c0", name="signal", arguments='{"x": "1"}')
+        second = ToolCall(id="c1", name="weather", arguments='{"city": "A"}')
+        yield StreamChunk(tool_call=first)
+        # the rest of the response is still "decoding" here
+        await asyncio.wait_for(self.first_ran.wait(), timeout=1)
+        yield StreamChunk(tool_call=second)
+        yield StreamChunk(final=ModelResponse(tool_calls=[first, second]))
+
+
+def _fragment(index, id=None, name=None, arguments=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    tool_call = SimpleNamespace(index=index, id=id, function=function)
+    delta = SimpleNamespace(content=None, tool_calls=[tool_call])
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta)])
+
+
+class FragmentClient:
+    """An OpenAI client whose stream replays the given chunks."""
+
+    def __init__(self, chunks):
+        async def create(**kwargs):
+            async def stream():
+                for chunk in chunks:
+                    yield chunk
+
+            return stream()
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+@pytest.mark.asyncio
+async def test_stream_announces_each_tool_call_once_its_arguments_close():
+    model = ChatCompletionsModel(
+        "m",
+        client=FragmentClient(
+            [
+                _fragment(0, id="c0", name="weather", arguments='{"city"'),
+                _fragment(0, arguments=': "A"}'),
+                _fragment(1, id="c1", name="weather", arguments='{"city": '),
+                # a new index supersedes the last one even before its JSON closes
+                _fragment(2, id="c2", name="weather", arguments="{}"),
+            ]
+        ),
+    )
+    chunks = [c async for c in model.stream([{"role": "user", "content": "go"}])]
+
+    announced = [c.tool_call.id for c in chunks if c.tool_call is not None]
+    assert announced == ["c0", "c1", "c2"]
+    assert [tc.id for tc in chunks[-1].final.tool_calls] == ["c0", "c1", "c2"]
+
+
+@pytest.mark.asyncio
+async def test_eager_tools_start_before_the_response_finishes():
+    model = AnnouncingModel()
+
+    def signal(x: str) -> str:
+        """Signal.
+
+        Args:
+            x: anything.
+        """
+        model.first_ran.set()
+        return "signalled"
+
+    loop = AgentLoop(model=model, tools=[signal, weather], eager_tools=True)
+    result = await loop.arun("go")
+
+    assert result.final_output == "done"
+    results = [e.result for e in result.events if e.type == "tool_result"]
+    assert results == ["signalled", "A: sunny"]
+    types = [e.type for e in result.events]
+    # the log still reads as if the tools ran after the response
+    assert types.index("generation") < types.index("tool_call")
+
+
+@pytest.mark.asyncio
+async def test_an_announced_call_the_response_dropped_is_cancelled():
+    ran = []
+
+    async def slow(x: str) -> str:
+        """Slow.
+
+        Args:
+            x: anything.
+        """
+        await asyncio.sleep(0.05)
+        ran.append(x)
+        return x
+
+    class Retracting:
+        model = "retracting"
+
+        async def stream(self, messages, tools=None, response_format=None):
+            yield StreamChunk(
+                tool_call=ToolCall(id="c0", name="slow", arguments='{"x": "1"}')
+            )
+            yield StreamChunk(final=text("never mind"))
+
+    result = await AgentLoop(model=Retracting(), tools=[slow], eager_tools=True).arun(
+        "go"
+    )
+    await asyncio.sleep(0.1)
+
+    assert result.final_output == "never mind"
+    assert ran == []
+
+
 @pytest.mark.asyncio
 async def test_with_model_shares_tools():
     loop = AgentLoop(model=FakeModel(text("a")), tools=[weather])
@@ -557,6 +712,8 @@ def test_agentor_accepts_mcp_servers():
 
 @pytest.mark.asyncio
 async def test_agentor_native_falls_back_on_rate_limit():
+    from unittest.mock import patch
+
     import httpx
     import openai
 
@@ -571,9 +728,10 @@ async def test_agentor_native_falls_back_on_rate_limit():
             raise openai.RateLimitError("rate limited", response=response, body=None)
 
     agent = native(Failing())
-    agent._loop.with_model = lambda *a, **k: AgentLoop(
-        model=FakeModel(text("from fallback"))
-    )
+    backup = FakeModel(text("from fallback"))
 
-    result = await agent.arun("go", fallback_models=["backup"])
+    with patch("agentor.core.agent.resolve_model", lambda *a, **k: backup):
+        result = await agent.arun("go", fallback_models=["backup"])
     assert result.final_output == "from fallback"
+    generation = next(e for e in result.events if e.type == "generation")
+    assert generation.model == "fake-model"
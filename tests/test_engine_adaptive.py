@@ -0,0 +1,120 @@
+"""Tests for adaptive batch concurrency (agentor.engine.adaptive)."""
+
+import asyncio
+
+import pytest
+
+from agentor.engine import AdaptiveLimit
+from agentor.engine.adaptive import is_rate_limit
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+async def _run(limit: AdaptiveLimit, seconds: float = 0.0, error=None):
+    async with limit.slot():
+        await asyncio.sleep(seconds)
+        if error is not None:
+            raise error
+
+
+def test_rate_limits_are_recognised_without_importing_providers():
+    assert is_rate_limit(RateLimitError())
+    assert not is_rate_limit(ValueError("bad input"))
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_by_about_one_per_window_of_successes():
+    limit = AdaptiveLimit(initial=4)
+    for _ in range(5):
+        await _run(limit)
+    assert limit.limit == 5
+    assert limit.metrics()["successes"] == 5
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_halves_once_per_window():
+    limit = AdaptiveLimit(initial=8)
+    await asyncio.gather(
+        *[_run(limit, 0.01, RateLimitError()) for _ in range(8)],
+        return_exceptions=True,
+    )
+    # eight 429s from one window of in-flight runs count as one signal
+    assert limit.limit == 4
+    assert limit.metrics()["overloads"] == 8
+    assert limit.metrics()["backoffs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_other_errors_do_not_move_the_limit():
+    limit = AdaptiveLimit(initial=3)
+    with pytest.raises(ValueError):
+        await _run(limit, error=ValueError("bad input"))
+    assert limit.limit == 3
+
+
+@pytest.mark.asyncio
+async def test_slower_runs_hold_the_limit():
+    limit = AdaptiveLimit(initial=2, tolerance=2.0)
+    await _run(limit)
+    await _run(limit)
+    before = limit._limit
+    await _run(limit, 0.1)
+    assert limit._limit == before
+
+
+@pytest.mark.asyncio
+async def test_in_flight_never_exceeds_the_limit():
+    limit = AdaptiveLimit(initial=3, max_limit=3)
+    await asyncio.gather(*[_run(limit, 0.01) for _ in range(12)])
+    assert limit.metrics()["peak_in_flight"] == 3
+    assert limit.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limit = AdaptiveLimit(initial=1, max_limit=1)
+    holder = asyncio.create_task(_run(limit, 0.05))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_run(limit))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await holder
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert limit.in_flight == 0
+    await _run(limit)
+
+
+@pytest.mark.asyncio
+async def test_agentor_batch_accepts_an_adaptive_limit():
+    from agentor import Agentor
+    from tests.test_engine import FakeModel, text
+
+    agent = Agentor(name="T", model=FakeModel(*[text("x")] * 6), api_key="test")
+    limit = AdaptiveLimit(initial=2)
+    results = await agent.arun(["a", "b", "c", "d"], limit_concurrency=limit)
+
+    assert [r.final_output for r in results] == ["x"] * 4
+    assert limit.metrics()["successes"] == 4
+    assert limit.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_a_rate_limit_retried_below_the_batch_still_backs_off():
+    from agentor.engine.retry import RetryPolicy, call_with_retry
+
+    failures = [RateLimitError()]
+
+    async def call():
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    limit = AdaptiveLimit(initial=8)
+    async with limit.slot():
+        fast = RetryPolicy(base_delay=0.001, max_delay=0.001, breaker_threshold=None)
+        assert await call_with_retry(call, fast) == "ok"
+    # the run succeeded, but only after a 429 the batch went too fast for
+    assert limit.limit == 4
+    assert limit.metrics()["backoffs"] == 1
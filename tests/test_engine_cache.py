@@ -0,0 +1,239 @@
+"""Tests for tool result caching (agentor.engine.cache)."""
+
+import asyncio
+
+import pytest
+
+from agentor.engine import AgentLoop, MemoryCache, SqliteCache, Tool, resolve_tools
+from agentor.engine.cache import cache_key
+from agentor.tools.base import BaseTool, capability
+from tests.test_engine import FakeModel, calls, text
+
+
+def _counted(**kwargs) -> tuple[Tool, list]:
+    seen: list = []
+
+    def lookup(city: str) -> str:
+        """Look a city up.
+
+        Args:
+            city: the city.
+        """
+        seen.append(city)
+        return f"{city}: {len(seen)}"
+
+    return Tool.from_function(lookup, **kwargs), seen
+
+
+def test_cache_key_ignores_argument_order():
+    assert cache_key("t", {"a": 1, "b": 2}) == cache_key("t", {"b": 2, "a": 1})
+    assert cache_key("t", {"a": 1}) != cache_key("u", {"a": 1})
+
+
+def test_memory_cache_evicts_least_recently_used_and_expires():
+    cache = MemoryCache(maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    cache.set("d", "4", ttl=-1)
+    assert cache.get("d") is None
+
+
+def test_sqlite_cache_persists_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first = SqliteCache(path)
+    first.set("a", "1")
+    first.set("gone", "2", ttl=-1)
+    first.close()
+
+    second = SqliteCache(path)
+    assert second.get("a") == "1"
+    assert second.get("gone") is None
+    second.close()
+
+
+def test_sqlite_cache_evicts_down_to_maxsize(tmp_path):
+    cache = SqliteCache(tmp_path / "cache.sqlite", maxsize=10)
+    for i in range(SqliteCache._EVICT_EVERY):
+        cache.set(str(i), str(i))
+    assert len(cache) == 10
+    # the most recent writes are the ones kept
+    assert cache.get(str(SqliteCache._EVICT_EVERY - 1)) is not None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_call_is_served_from_cache_and_flagged():
+    tool, seen = _counted(cache=True)
+    loop = AgentLoop(
+        model=FakeModel(
+            calls(("lookup", '{"city": "Paris"}')),
+            calls(("lookup", '{"city": "Paris"}')),
+            text("done"),
+        ),
+        tools=[tool],
+    )
+    result = await loop.arun("go")
+
+    results = [e for e in result.events if e.type == "tool_result"]
+    assert seen == ["Paris"]
+    assert [e.cached for e in results] == [False, True]
+    assert results[0].result == results[1].result == "Paris: 1"
+
+
+@pytest.mark.asyncio
+async def test_cache_is_shared_across_runs_but_not_for_failures():
+    attempts: list = []
+
+    def flaky(city: str) -> str:
+        """Flaky.
+
+        Args:
+            city: the city.
+        """
+        attempts.append(city)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    tool = Tool.from_function(flaky, cache=True)
+    for _ in range(3):
+        loop = AgentLoop(
+            model=FakeModel(calls(("flaky", '{"city": "A"}')), text("done")),
+            tools=[tool],
+        )
+        await loop.arun("go")
+
+    # the failure was not cached; the success after it was
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_runs_the_tool_again():
+    tool, seen = _counted(cache=True, cache_ttl=0.01)
+    for _ in range(2):
+        loop = AgentLoop(
+            model=FakeModel(calls(("lookup", '{"city": "A"}')), text("done")),
+            tools=[tool],
+        )
+        await loop.arun("go")
+        await asyncio.sleep(0.02)
+
+    assert seen == ["A", "A"]
+
+
+@pytest.mark.asyncio
+async def test_uncached_tool_leaves_the_flag_unset():
+    tool, _ = _counted()
+    loop = AgentLoop(
+        model=FakeModel(calls(("lookup", '{"city": "A"}')), text("done")),
+        tools=[tool],
+    )
+    result = await loop.arun("go")
+    event = next(e for e in result.events if e.type == "tool_result")
+    assert event.cached is None
+    assert "cached" not in event.to_dict()
+
+
+class Lookups(BaseTool):
+    name = "lookups"
+    cache = True
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    @capability
+    def read(self, key: str) -> str:
+        """Read."""
+        self.calls += 1
+        return key
+
+    @capability(cache=False)
+    def write(self, key: str) -> str:
+        """Write."""
+        return key
+
+
+def test_capability_cache_options_resolve_per_instance():
+    tool = Lookups()
+    tools = {t.name: t for t in resolve_tools([tool])}
+    assert isinstance(tools["read"].cache, MemoryCache)
+    assert tools["write"].cache is None
+    # resolving again, as a second agent would, reuses the instance's cache
+    assert resolve_tools([tool])[0].cache is tools["read"].cache
+    assert resolve_tools([Lookups()])[0].cache is not tools["read"].cache
+
+
+def test_plain_capability_decorator_still_works():
+    class Plain(BaseTool):
+        @capability
+        def ping(self) -> str:
+            """Ping."""
+            return "pong"
+
+    [tool] = resolve_tools([Plain()])
+    assert tool.cache is None
+
+
+def test_invalid_cache_option_is_rejected():
+    with pytest.raises(TypeError, match="cache must be"):
+        Tool.from_function(lambda: None, cache="yes")
+
+
+class Files(BaseTool):
+    name = "files"
+
+    def __init__(self, root: str, cache):
+        super().__init__(cache=cache)
+        self.root = root
+
+    @capability
+    def read(self, path: str) -> str:
+        """Read."""
+        return f"{self.root}/{path}"
+
+
+@pytest.mark.asyncio
+async def test_instances_sharing_a_cache_keep_their_results_apart(tmp_path):
+    cache = SqliteCache(tmp_path / "cache.sqlite")
+    results = []
+    for tool in (Files("/a", cache), Files("/b", cache), Files("/a", cache)):
+        loop = AgentLoop(
+            model=FakeModel(calls(("read", '{"path": "x"}')), text("done")),
+            tools=[tool],
+        )
+        result = await loop.arun("go")
+        results.append(next(e for e in result.events if e.type == "tool_result"))
+
+    assert [(e.result, e.cached) for e in results] == [
+        ("/a/x", False),
+        ("/b/x", False),
+        # configured alike, so the first instance's result serves the third
+        ("/a/x", True),
+    ]
+    assert (
+        Files("/a", cache).result_cache_scope()
+        != Files("/b", cache).result_cache_scope()
+    )
+
+
+def test_a_tool_holding_a_client_gets_the_same_scope_each_time():
+    class Client:
+        pass
+
+    class Search(BaseTool):
+        name = "search"
+
+        def __init__(self, region: str):
+            super().__init__()
+            self.region = region
+            # its str() carries a memory address
+            self.client = Client()
+
+    assert Search("eu").result_cache_scope() == Search("eu").result_cache_scope()
+    assert Search("eu").result_cache_scope() != Search("us").result_cache_scope()
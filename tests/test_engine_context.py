@@ -0,0 +1,126 @@
+"""Tests for context-window management (agentor.engine.context)."""
+
+import pytest
+
+from agentor.engine import AgentLoop, ContextWindow, estimate_tokens
+from agentor.engine.events import Event
+from agentor.engine.store import MemoryStore, replay_messages
+from agentor.engine.tracing import TraceCollector
+from tests.test_engine import FakeModel, calls, text, weather
+from tests.test_message_sequence import assert_well_formed
+
+
+def _conversation(turns: int, result: str = "sunny"):
+    messages = [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "task"},
+    ]
+    for i in range(turns):
+        messages.append(
+            {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"c{i}",
+                        "type": "function",
+                        "function": {"name": "weather", "arguments": "{}"},
+                    }
+                ],
+            }
+        )
+        messages.append({"role": "tool", "tool_call_id": f"c{i}", "content": result})
+    return messages
+
+
+def test_estimate_tokens_grows_with_content():
+    short = [{"role": "user", "content": "hi"}]
+    long = [{"role": "user", "content": "hi " * 400}]
+    assert estimate_tokens(short) < estimate_tokens(long)
+    assert estimate_tokens(long) == pytest.approx(300, rel=0.1)
+
+
+def test_keep_turns_keeps_instructions_task_and_recent_turns():
+    sent = ContextWindow(keep_turns=2).apply(_conversation(5))
+
+    assert [m["role"] for m in sent[:2]] == ["system", "user"]
+    assert [m.get("tool_call_id") for m in sent if m["role"] == "tool"] == ["c3", "c4"]
+    assert_well_formed(sent)
+
+
+def test_old_tool_results_are_truncated_but_the_latest_is_whole():
+    sent = ContextWindow(max_tool_result_chars=5).apply(
+        _conversation(3, result="x" * 50)
+    )
+    results = [m["content"] for m in sent if m["role"] == "tool"]
+
+    assert results[0] == "xxxxx... [45 chars elided]"
+    assert results[-1] == "x" * 50
+
+
+def test_token_budget_drops_whole_turns_oldest_first():
+    messages = _conversation(10, result="y" * 400)
+    sent = ContextWindow(max_tokens=400).apply(messages)
+
+    assert estimate_tokens(sent) <= 400
+    assert sent[-1] == messages[-1]
+    assert_well_formed(sent)
+
+
+def test_policy_leaves_the_conversation_untouched():
+    messages = _conversation(3, result="z" * 50)
+    before = [dict(m) for m in messages]
+    ContextWindow(keep_turns=1, max_tool_result_chars=1, max_tokens=10).apply(messages)
+    assert messages == before
+
+
+@pytest.mark.asyncio
+async def test_loop_sends_the_window_but_logs_the_whole_conversation():
+    store = MemoryStore()
+    model = FakeModel(
+        *[calls(("weather", f'{{"city": "{i}"}}')) for i in range(4)], text("done")
+    )
+    loop = AgentLoop(
+        model=model,
+        tools=[weather],
+        instructions="sys",
+        store=store,
+        history_policy=ContextWindow(keep_turns=1),
+    )
+    result = await loop.arun("go")
+
+    last_request = model.calls[-1]["messages"]
+    assert [m["role"] for m in last_request] == ["system", "user", "assistant", "tool"]
+    # replay rebuilds everything, so a resume can apply the policy afresh
+    replayed = replay_messages(store.load(result.run_id))
+    assert sum(1 for m in replayed if m["role"] == "tool") == 4
+
+
+@pytest.mark.asyncio
+async def test_generations_record_the_window_that_was_sent():
+    model = FakeModel(
+        *[calls(("weather", f'{{"city": "{i}"}}')) for i in range(3)], text("done")
+    )
+    loop = AgentLoop(
+        model=model,
+        tools=[weather],
+        instructions="sys",
+        history_policy=ContextWindow(keep_turns=1),
+    )
+    result = await loop.arun("go")
+
+    generations = [e for e in result.events if e.type == "generation"]
+    # nothing to trim until a second turn of tool calls exists
+    assert generations[0].sent is None
+    assert generations[-1].sent == model.calls[-1]["messages"]
+    assert Event.from_dict(generations[-1].to_dict()).sent == generations[-1].sent
+
+    trace = TraceCollector("wf")
+    for event in result.events:
+        trace.handle(event)
+    spans = [
+        i["span_data"]
+        for i in trace.items
+        if i.get("span_data", {}).get("type") == "generation"
+    ]
+    assert spans[-1]["input"] == model.calls[-1]["messages"]
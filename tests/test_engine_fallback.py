@@ -0,0 +1,102 @@
+"""Tests for turn-level model fallback (agentor.engine.fallback)."""
+
+import pytest
+
+from agentor.engine import AgentLoop, FallbackModel, ModelResponse, function_tool
+from agentor.engine.models import StreamChunk
+from tests.test_engine import FakeModel, calls, text
+
+
+class Overloaded(Exception):
+    status_code = 503
+
+
+class Flaky(FakeModel):
+    """A FakeModel that fails the calls whose 1-based numbers are in `fail`."""
+
+    def __init__(self, name, *responses, fail=()):
+        super().__init__(*responses)
+        self.model = name
+        self.fail = set(fail)
+        self.count = 0
+
+    async def complete(self, messages, tools=None, response_format=None):
+        self.count += 1
+        if self.count in self.fail:
+            raise Overloaded("upstream unavailable")
+        return await super().complete(messages, tools, response_format)
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_moves_to_the_fallback_without_rerunning_the_run():
+    runs = []
+
+    @function_tool
+    def charge(amount: str) -> str:
+        """Charge a card.
+
+        Args:
+            amount: how much.
+        """
+        runs.append(amount)
+        return "charged"
+
+    primary = Flaky("primary", calls(("charge", '{"amount": "5"}')), fail={2})
+    backup = FakeModel(text("done"))
+    loop = AgentLoop(model=primary, tools=[charge], fallback_models=[backup])
+    result = await loop.arun("go")
+
+    assert result.final_output == "done"
+    # the side-effecting tool ran once; the fallback picked up at turn two
+    assert runs == ["5"]
+    generations = [e for e in result.events if e.type == "generation"]
+    assert [g.model for g in generations] == ["primary", "fake-model"]
+    # the fallback was sent the same conversation the primary failed on
+    assert backup.calls[0]["messages"][-1]["role"] == "tool"
+
+
+@pytest.mark.asyncio
+async def test_each_turn_starts_from_the_primary_again():
+    primary = Flaky("primary", text("a"), text("b"), fail={1})
+    model = FallbackModel(primary, [FakeModel(text("x"))])
+
+    assert (await model.complete([])).content == "x"
+    assert (await model.complete([])).model == "primary"
+
+
+@pytest.mark.asyncio
+async def test_errors_a_fallback_cannot_fix_are_raised_at_once():
+    class Broken:
+        model = "broken"
+
+        async def complete(self, messages, tools=None):
+            raise ValueError("bad request")
+
+    backup = FakeModel(text("x"))
+    with pytest.raises(ValueError):
+        await FallbackModel(Broken(), [backup]).complete([])
+    assert backup.calls == []
+
+
+@pytest.mark.asyncio
+async def test_all_failing_raises_the_primarys_error():
+    models = [Flaky(name, fail={1}) for name in ("a", "b")]
+    with pytest.raises(Overloaded):
+        await FallbackModel(models[0], models[1:]).complete([])
+    assert models[1].count == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_before_its_first_chunk():
+    class DeadStream:
+        model = "dead"
+
+        async def stream(self, messages, tools=None):
+            raise Overloaded("down")
+            yield  # pragma: no cover
+
+    model = FallbackModel(DeadStream(), [FakeModel(ModelResponse(content="hi"))])
+    chunks = [chunk async for chunk in model.stream([])]
+
+    assert isinstance(chunks[-1], StreamChunk)
+    assert chunks[-1].final.model == "fake-model"
@@ -0,0 +1,92 @@
+"""Tests for hedged model requests (agentor.engine.hedging)."""
+
+import asyncio
+
+import pytest
+
+from agentor.engine import AgentLoop, HedgedModel, ModelResponse
+from agentor.engine.models import StreamChunk
+
+
+class SlowModel:
+    """Answers after `delay` seconds; records starts and cancellations."""
+
+    def __init__(self, name, delay, error=None):
+        self.model = name
+        self.delay = delay
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+
+    async def complete(self, messages, tools=None, response_format=None):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return ModelResponse(content=self.model)
+
+    async def stream(self, messages, tools=None, response_format=None):
+        response = await self.complete(messages, tools, response_format)
+        yield StreamChunk(delta=response.content)
+        yield StreamChunk(final=response)
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_never_sends_a_hedge():
+    primary, backup = SlowModel("a", 0), SlowModel("b", 0)
+    response = await HedgedModel(primary, delay=0.05, hedge=backup).complete([])
+
+    assert response.content == "a"
+    assert (response.model, response.hedge) == ("a", 0)
+    assert backup.started == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_loses_to_the_hedge_and_is_cancelled():
+    primary, backup = SlowModel("a", 5), SlowModel("b", 0)
+    response = await HedgedModel(primary, delay=0.01, hedge=backup).complete([])
+
+    assert (response.content, response.model, response.hedge) == ("b", "b", 1)
+    assert primary.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_a_failed_request_waits_for_the_other():
+    primary = SlowModel("a", 0.05, error=RuntimeError("503"))
+    backup = SlowModel("b", 0.1)
+    response = await HedgedModel(primary, delay=0.01, hedge=backup).complete([])
+    assert response.content == "b"
+
+
+@pytest.mark.asyncio
+async def test_both_failing_raises_the_first_requests_error():
+    primary = SlowModel("a", 0.02, error=RuntimeError("first"))
+    backup = SlowModel("b", 0.03, error=RuntimeError("second"))
+    with pytest.raises(RuntimeError, match="first"):
+        await HedgedModel(primary, delay=0.01, hedge=backup).complete([])
+
+
+@pytest.mark.asyncio
+async def test_streaming_switches_to_the_first_stream_to_answer():
+    primary, backup = SlowModel("a", 5), SlowModel("b", 0)
+    model = HedgedModel(primary, delay=0.01, hedge=backup)
+    chunks = [chunk async for chunk in model.stream([])]
+
+    assert [c.delta for c in chunks if c.delta] == ["b"]
+    assert chunks[-1].final.hedge == 1
+    assert primary.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_generation_event_records_the_winning_request():
+    primary, backup = SlowModel("a", 5), SlowModel("b", 0)
+    loop = AgentLoop(model=HedgedModel(primary, delay=0.01, hedge=backup))
+    result = await loop.arun("go")
+
+    generation = next(e for e in result.events if e.type == "generation")
+    assert (generation.model, generation.hedge) == ("b", 1)
+    assert result.final_output == "b"
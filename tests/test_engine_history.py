@@ -0,0 +1,66 @@
+"""Tests for the shared, immutable message history (agentor.engine.history)."""
+
+import copy
+import json
+
+import pytest
+
+from agentor.engine import AgentLoop
+from agentor.engine.history import FrozenDict, MessageHistory
+from tests.test_engine import FakeModel, calls, text, weather
+
+
+def test_history_freezes_nested_messages():
+    history = MessageHistory([{"role": "assistant", "tool_calls": [{"id": "a"}]}])
+
+    with pytest.raises(TypeError):
+        history[0]["content"] = "edited"
+    with pytest.raises(TypeError):
+        history[0]["tool_calls"].append({"id": "b"})
+
+    # still plain JSON, and still equal to the dicts it was built from
+    assert json.loads(json.dumps(history.tolist())) == history
+    assert history == [{"role": "assistant", "tool_calls": [{"id": "a"}]}]
+
+
+def test_appending_leaves_earlier_views_unchanged():
+    first = MessageHistory([{"role": "user", "content": "a"}])
+    second = first.appended({"role": "assistant", "content": "b"})
+    # extending an older view must fork rather than write over `second`
+    forked = first.appended({"role": "assistant", "content": "c"})
+
+    assert len(first) == 1
+    assert [m["content"] for m in second] == ["a", "b"]
+    assert [m["content"] for m in forked] == ["a", "c"]
+    assert second[1:] == [{"role": "assistant", "content": "b"}]
+
+
+def test_appending_at_the_tip_shares_storage():
+    history = MessageHistory([{"role": "user", "content": "a"}])
+    longer = history.appended({"role": "assistant", "content": "b"})
+    assert longer[0] is history[0]
+
+
+def test_deepcopy_hands_back_editable_plain_data():
+    history = MessageHistory([{"role": "user", "content": "a"}])
+    copied = copy.deepcopy(history)
+
+    assert type(copied) is list and type(copied[0]) is dict
+    copied[0]["content"] = "b"
+    assert history[0]["content"] == "a"
+    assert type(dict(FrozenDict(a=1))) is dict
+
+
+@pytest.mark.asyncio
+async def test_events_and_result_share_the_loops_messages():
+    loop = AgentLoop(
+        model=FakeModel(calls(("weather", '{"city": "A"}')), text("done")),
+        tools=[weather],
+    )
+    result = await loop.arun("go")
+
+    start = result.events[0]
+    generations = [e for e in result.events if e.type == "generation"]
+    # the input is recorded once, and referenced rather than copied after it
+    assert result.messages[0] is start.messages[0]
+    assert generations[-1].messages[0] is result.messages[1]
@@ -0,0 +1,227 @@
+"""Tests for run leases and recovery (agentor.engine.leases, .recovery)."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agentor.engine import AgentLoop
+from agentor.engine.events import Event
+from agentor.engine.leases import LeaseHeldError
+from agentor.engine.recovery import RecoveryWorker
+from agentor.engine.segments import SegmentedStore
+from agentor.engine.store import (
+    FileStore,
+    MemoryStore,
+    SqliteStore,
+    is_complete,
+    is_run_complete,
+)
+from tests.test_engine import FakeModel, calls, text
+
+
+def _interrupted(store, run_id):
+    # what a worker killed mid-run leaves: a start and no end
+    store.append(
+        run_id,
+        Event(type="run_start", messages=[{"role": "user", "content": "go"}]),
+    )
+
+
+def test_a_lease_has_one_holder_until_it_expires(store):
+    assert store.acquire_lease("r1", "a", 60)
+    assert store.acquire_lease("r1", "a", 60)  # its holder extends it
+    assert not store.acquire_lease("r1", "b", 60)
+    assert not store.renew_lease("r1", "b", 60)
+
+    assert store.renew_lease("r1", "a", 0.0)
+    assert store.acquire_lease("r1", "b", 60)  # expired, so up for grabs
+    assert not store.renew_lease("r1", "a", 60)
+
+    store.release_lease("r1", "a")  # not a's to release any more
+    assert not store.acquire_lease("r1", "c", 60)
+    store.release_lease("r1", "b")
+    assert store.acquire_lease("r1", "c", 60)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_resumes_continue_a_run_once(store):
+    _interrupted(store, "r1")
+    models = [FakeModel(text("done")), FakeModel(text("done"))]
+    results = await asyncio.gather(
+        *(AgentLoop(model=m, store=store).aresume("r1") for m in models),
+        return_exceptions=True,
+    )
+
+    # the loser either found the lease held or, once it was released,
+    # the run already finished
+    assert sum(len(m.calls) for m in models) == 1
+    for result in results:
+        assert isinstance(result, LeaseHeldError) or is_complete(result.events)
+    assert [e.type for e in store.load("r1")].count("run_start") == 2
+
+
+@pytest.mark.asyncio
+async def test_a_live_run_cannot_be_resumed(tmp_path):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    _interrupted(store, "r1")
+    store.acquire_lease("r1", "another-worker", 60)
+
+    model = FakeModel(text("done"))
+    with pytest.raises(LeaseHeldError):
+        await AgentLoop(model=model, store=store).aresume("r1")
+    assert model.calls == []
+    with pytest.raises(LeaseHeldError):
+        await AgentLoop(model=model, store=store).arun("go", run_id="r1")
+    assert [e.type for e in store.load("r1")] == ["run_start"]
+
+
+def _ask_twice():
+    return FakeModel(
+        calls(("slow", '{"city": "Rome"}')),
+        calls(("slow", '{"city": "Oslo"}')),
+        text("done"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_a_run_that_loses_its_lease_stops_writing():
+    store = MemoryStore()
+    ran = []
+
+    async def slow(city: str) -> str:
+        """Weather, slowly.
+
+        Args:
+            city: city.
+        """
+        ran.append(city)
+        # as a worker taking the run over once this one looked dead would
+        store._leases["r1"] = ("another-worker", time.time() + 60)
+        return "sunny"
+
+    model = _ask_twice()
+    loop = AgentLoop(model=model, tools=[slow], store=store)
+    with pytest.raises(LeaseHeldError):
+        await loop.arun("go", run_id="r1")
+    # the store fenced off the result, and nothing ran after it
+    assert [e.type for e in store.load("r1")][-1] == "tool_call"
+    assert ran == ["Rome"] and len(model.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_a_run_whose_heartbeats_fail_stops_before_its_lease_lapses():
+    class Unreachable(MemoryStore):
+        def renew_lease(self, run_id, owner, ttl):
+            raise OSError("store unreachable")
+
+    ran = []
+
+    async def slow(city: str) -> str:
+        """Weather, slowly.
+
+        Args:
+            city: city.
+        """
+        ran.append(city)
+        await asyncio.sleep(0.05)
+        return "sunny"
+
+    model = _ask_twice()
+    loop = AgentLoop(model=model, tools=[slow], store=Unreachable(), lease_ttl=0.03)
+    with pytest.raises(LeaseHeldError):
+        await loop.arun("go", run_id="r1")
+    # past its ttl another worker may have the run, so no second turn
+    assert ran == ["Rome"] and len(model.calls) == 1
+
+
+def test_a_store_refuses_writes_from_a_worker_that_lost_the_lease(store):
+    if not getattr(store, "fences_writes", False):
+        pytest.skip("this store does not fence writes")
+    store.acquire_lease("r1", "a", 60)
+    store.append("r1", Event(type="run_start"), lease_owner="a")
+    store.renew_lease("r1", "a", 0.0)
+    store.acquire_lease("r1", "b", 60)
+
+    with pytest.raises(LeaseHeldError):
+        store.append("r1", Event(type="message", text="late"), lease_owner="a")
+    with pytest.raises(LeaseHeldError):
+        asyncio.run(
+            store.aappend("r1", Event(type="message", text="late"), lease_owner="a")
+        )
+    store.append("r1", Event(type="message", text="mine"), lease_owner="b")
+    assert [e.text for e in store.load("r1")] == [None, "mine"]
+
+
+@pytest.mark.asyncio
+async def test_recovery_resumes_runs_whose_lease_expired(store):
+    for run_id in ("dead", "unleased", "live"):
+        _interrupted(store, run_id)
+    store.acquire_lease("dead", "crashed-worker", 0.0)
+    store.acquire_lease("live", "another-worker", 60)
+
+    worker = RecoveryWorker(AgentLoop(model=FakeModel(), store=store))
+    # the live run is not even a candidate
+    assert sorted(await worker.interrupted_runs()) == ["dead", "unleased"]
+    recovered = await worker.recover()
+    assert sorted(r.run_id for r in recovered) == ["dead", "unleased"]
+    assert is_run_complete(store, "dead") and is_run_complete(store, "unleased")
+    assert not is_run_complete(store, "live")
+    # nothing left that is free to take
+    assert await worker.recover() == []
+
+
+@pytest.mark.asyncio
+async def test_recovery_concurrency_is_bounded():
+    class Slow(FakeModel):
+        active = peak = 0
+
+        async def complete(self, *args, **kwargs):
+            Slow.active += 1
+            Slow.peak = max(Slow.peak, Slow.active)
+            await asyncio.sleep(0.01)
+            Slow.active -= 1
+            return await super().complete(*args, **kwargs)
+
+    store = MemoryStore()
+    for i in range(6):
+        _interrupted(store, f"r{i}")
+    worker = RecoveryWorker(AgentLoop(model=Slow(), store=store), concurrency=2)
+    assert len(await worker.recover()) == 6
+    assert Slow.peak == 2
+
+
+def test_recovery_requires_leases(tmp_path):
+    store = SegmentedStore(tmp_path)
+    with pytest.raises(TypeError):
+        RecoveryWorker(AgentLoop(model=FakeModel(), store=store))
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_a_run_that_fails_to_set_up_its_tracer_leaves_the_run_unleased():
+    store = MemoryStore()
+    loop = AgentLoop(model=FakeModel(text("done")), store=store)
+    with pytest.raises(ValueError):
+        # no tracer configured to require
+        await loop.arun("go", run_id="r1", tracing=True)
+    assert not store.leased("r1")
+    assert (await loop.arun("go", run_id="r1")).final_output == "done"
+
+
+@pytest.mark.asyncio
+async def test_lease_file_locks_are_taken_off_the_event_loop(tmp_path):
+    # appends are queued, so the store reports itself non-blocking
+    store = FileStore(tmp_path, durability="async")
+    threads = set()
+    acquire = store.acquire_lease
+
+    def acquire_lease(*args):
+        threads.add(threading.current_thread())
+        return acquire(*args)
+
+    store.acquire_lease = acquire_lease
+    await AgentLoop(model=FakeModel(text("done")), store=store).arun("go")
+    assert threads and threading.current_thread() not in threads
+    store.close()
@@ -0,0 +1,67 @@
+"""Tests for exact-match response caching (agentor.engine.response_cache)."""
+
+import pytest
+
+from agentor.engine import AgentLoop, CachedModel, SqliteCache
+from tests.test_engine import FakeModel, calls, text, weather
+
+
+@pytest.mark.asyncio
+async def test_identical_request_is_answered_from_the_cache():
+    inner = FakeModel(text("first"), text("second"))
+    model = CachedModel(inner)
+    request = [{"role": "user", "content": "hi"}]
+
+    miss = await model.complete(request)
+    hit = await model.complete(request)
+
+    assert (miss.content, miss.cached) == ("first", False)
+    assert (hit.content, hit.cached) == ("first", True)
+    assert len(inner.calls) == 1
+    # a hit is free; what it saved is reported separately
+    assert hit.usage.total_tokens == 0
+    assert hit.usage.cached_tokens == miss.usage.total_tokens
+
+
+@pytest.mark.asyncio
+async def test_anything_that_shapes_the_answer_is_in_the_key():
+    inner = FakeModel(*[text(str(i)) for i in range(4)])
+    model = CachedModel(inner)
+    request = [{"role": "user", "content": "hi"}]
+
+    await model.complete(request)
+    await model.complete([{"role": "user", "content": "hello"}])
+    await model.complete(request, tools=[{"type": "function"}])
+    await model.complete(request, response_format={"type": "json_object"})
+    assert len(inner.calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_stream_is_replayed_chunk_by_chunk():
+    inner = FakeModel(text("a b c"))
+    model = CachedModel(inner)
+
+    first = [c async for c in model.stream([{"role": "user", "content": "x"}])]
+    second = [c async for c in model.stream([{"role": "user", "content": "x"}])]
+
+    assert [c.delta for c in second] == [c.delta for c in first]
+    assert second[-1].final.content == "a b c"
+    assert second[-1].final.cached is True
+    assert len(inner.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_runs_report_hits_on_their_generations(tmp_path):
+    cache = SqliteCache(tmp_path / "responses.sqlite")
+    script = (calls(("weather", '{"city": "A"}')), text("sunny"))
+
+    for expected in (False, True):
+        # a fresh model each time, as a new process would build
+        loop = AgentLoop(
+            model=CachedModel(FakeModel(*script), cache=cache), tools=[weather]
+        )
+        result = await loop.arun("weather?")
+        generations = [e for e in result.events if e.type == "generation"]
+        assert [g.cached for g in generations] == [expected, expected]
+        assert result.final_output == "sunny"
+    cache.close()
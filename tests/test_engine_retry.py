@@ -0,0 +1,139 @@
+"""Tests for model-call retries and circuit breakers (agentor.engine.retry)."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agentor.engine import ChatCompletionsModel, CircuitOpenError, RetryPolicy
+from agentor.engine.retry import CircuitBreaker, is_transient, retry_after
+
+FAST = RetryPolicy(base_delay=0.001, max_delay=0.001, breaker_threshold=None)
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def _completion(content):
+    message = SimpleNamespace(content=content, tool_calls=None)
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+
+class ScriptedClient:
+    """An OpenAI client that raises or answers from a script, one per call."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+        async def create(**kwargs):
+            self.calls += 1
+            outcome = self.outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            if kwargs.get("stream"):
+
+                async def stream():
+                    delta = SimpleNamespace(content=outcome, tool_calls=None)
+                    yield SimpleNamespace(
+                        usage=None, choices=[SimpleNamespace(delta=delta)]
+                    )
+
+                return stream()
+            return _completion(outcome)
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+def test_transient_errors_are_told_apart_from_permanent_ones():
+    assert is_transient(HTTPError(429))
+    assert is_transient(HTTPError(503))
+    assert not is_transient(HTTPError(400))
+    assert not is_transient(CircuitOpenError("down"))
+
+
+def test_retry_after_reads_seconds_milliseconds_and_dates():
+    assert retry_after(HTTPError(429, {"retry-after": "3"})) == 3
+    assert retry_after(HTTPError(429, {"retry-after-ms": "250"})) == 0.25
+    date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 50 < retry_after(HTTPError(429, {"retry-after": date})) <= 60
+    assert retry_after(HTTPError(429)) is None
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried_within_the_turn():
+    client = ScriptedClient(HTTPError(429), HTTPError(502), "ok")
+    model = ChatCompletionsModel("m", client=client, retry=FAST)
+
+    response = await model.complete([{"role": "user", "content": "go"}])
+    assert response.content == "ok"
+    assert client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_permanent_failures_are_not_retried():
+    client = ScriptedClient(HTTPError(400), "ok")
+    model = ChatCompletionsModel("m", client=client, retry=FAST)
+
+    with pytest.raises(HTTPError):
+        await model.complete([])
+    assert client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    client = ScriptedClient(HTTPError(429, {"retry-after": "0.05"}), "ok")
+    model = ChatCompletionsModel("m", client=client, retry=FAST)
+
+    started = time.monotonic()
+    await model.complete([])
+    assert time.monotonic() - started >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_stream_is_retried_until_its_first_chunk():
+    client = ScriptedClient(HTTPError(503), "hello")
+    model = ChatCompletionsModel("m", client=client, retry=FAST)
+
+    chunks = [c async for c in model.stream([])]
+    assert chunks[0].delta == "hello"
+    assert chunks[-1].final.content == "hello"
+
+
+def test_breaker_opens_on_unhealthy_endpoint_and_probes_after_reset():
+    breaker = CircuitBreaker("m", threshold=2, reset_timeout=0.05)
+    breaker.record(HTTPError(429))  # rate limits say nothing about health
+    breaker.record(HTTPError(503))
+    assert breaker.state == "closed"
+    breaker.record(HTTPError(503))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+    time.sleep(0.06)
+    breaker.before()  # the one probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    breaker.record(None)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_without_calling_the_provider():
+    policy = RetryPolicy(
+        base_delay=0.001, max_delay=0.001, max_tries=2, breaker_threshold=2
+    )
+    client = ScriptedClient(*[HTTPError(503)] * 4)
+    model = ChatCompletionsModel("m", client=client, retry=policy, base_url="x")
+
+    with pytest.raises(HTTPError):
+        await model.complete([])
+    # a second adapter for the same endpoint shares the breaker
+    other = ChatCompletionsModel("m", client=client, retry=policy, base_url="x")
+    with pytest.raises(CircuitOpenError):
+        await other.complete([])
+    assert client.calls == 2
@@ -752,6 +752,8 @@ def test_from_md_default_matches_the_constructor_default(tmp_path):
 @pytest.mark.asyncio
 async def test_fallback_keeps_the_configured_model_parameters():
     """A fallback that drops temperature answers differently to the primary."""
+    from unittest.mock import patch
+
     import httpx
     import openai
 
@@ -774,16 +776,12 @@ async def test_fallback_keeps_the_configured_model_parameters():
 
     agent._loop.model.complete = boom
 
-    original_with_model = agent._loop.with_model
-
     def spy(model, **kwargs):
         captured.update(kwargs)
-        clone = original_with_model(model, **kwargs)
-        clone.model = FakeModel(text("from fallback"))
-        return clone
+        return FakeModel(text("from fallback"))
 
-    agent._loop.with_model = spy
-    result = await agent.arun("go", fallback_models=["gpt-4o"])
+    with patch("agentor.core.agent.resolve_model", spy):
+        result = await agent.arun("go", fallback_models=["gpt-4o"])
 
     assert result.final_output == "from fallback"
     assert captured["temperature"] == 0.2
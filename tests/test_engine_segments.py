@@ -0,0 +1,102 @@
+"""Tests for segmented run persistence (agentor.engine.segments)."""
+
+import gzip
+
+import pytest
+
+from agentor.engine import AgentLoop
+from agentor.engine.events import Event
+from agentor.engine.maintenance import open_store
+from agentor.engine.segments import SegmentedStore
+from agentor.engine.store import is_run_complete
+from tests.test_engine import FakeModel, calls, text, weather
+
+
+def test_interleaved_runs_share_segments_and_load_in_order(tmp_path):
+    store = SegmentedStore(tmp_path, max_segment_bytes=200)
+    for i in range(10):
+        for run_id in ("a", "b"):
+            store.append(run_id, Event(type="message", text=f"{run_id}{i}"))
+    store.close()
+
+    segments = sorted(p.name for p in tmp_path.glob("segment-*"))
+    # rotated, and everything sealed was compressed
+    assert len(segments) > 2
+    assert all(name.endswith(".gz") for name in segments[:-1])
+
+    reopened = SegmentedStore(tmp_path, max_segment_bytes=200)
+    assert reopened.list_runs() == ["a", "b"]
+    assert [e.text for e in reopened.load("a")] == [f"a{i}" for i in range(10)]
+    assert reopened.last_event("b").text == "b9"
+    assert reopened.load("missing") == [] and reopened.last_event("missing") is None
+    reopened.close()
+
+
+def test_a_compressed_segment_is_opened_once_per_load(tmp_path, monkeypatch):
+    store = SegmentedStore(tmp_path, max_segment_bytes=500)
+    for i in range(20):
+        for run_id in ("a", "b"):
+            store.append(run_id, Event(type="message", text=f"{run_id}{i}"))
+    store.close()
+
+    reopened = SegmentedStore(tmp_path, max_segment_bytes=500)
+    compressed = len(list(tmp_path.glob("segment-*.gz")))
+    assert compressed > 1
+    opened = []
+    real_open = gzip.open
+    monkeypatch.setattr(
+        gzip, "open", lambda *args, **kw: opened.append(args) or real_open(*args, **kw)
+    )
+    assert [e.text for e in reopened.load("a")] == [f"a{i}" for i in range(20)]
+    # one range per event, since the runs interleave, but one open per segment
+    assert len(opened) == compressed
+    reopened.close()
+
+
+def test_events_the_index_missed_are_recovered_on_open(tmp_path):
+    store = SegmentedStore(tmp_path)
+    store.append("a", Event(type="message", text="indexed"))
+    store.close()
+
+    # as a crash between writing an event and indexing it leaves the segment
+    (segment,) = tmp_path.glob("segment-*.log")
+    with segment.open("ab") as f:
+        f.write(b'a\t{"type": "message", "text": "unindexed"}\n')
+        f.write(b'a\t{"type": "message", "te')
+
+    reopened = SegmentedStore(tmp_path)
+    assert [e.text for e in reopened.load("a")] == ["indexed", "unindexed"]
+    # the torn line was cut off, so the next event is not glued onto it
+    reopened.append("a", Event(type="message", text="next"))
+    assert [e.text for e in reopened.load("a")][-1] == "next"
+    reopened.close()
+
+
+def test_run_ids_that_would_break_the_format_are_rejected(tmp_path):
+    store = SegmentedStore(tmp_path)
+    with pytest.raises(ValueError):
+        store.append("a\tb", Event(type="message"))
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_resume_through_a_segmented_store(tmp_path):
+    store = SegmentedStore(tmp_path, max_segment_bytes=512)
+    crashed = AgentLoop(
+        model=FakeModel(calls(("weather", '{"city": "Rome"}'))),
+        tools=[weather],
+        store=store,
+        max_turns=1,
+    )
+    first = await crashed.arun("go")
+    assert not is_run_complete(store, first.run_id)
+
+    reopened = AgentLoop(model=FakeModel(text("recovered")), store=store)
+    second = await reopened.aresume(first.run_id)
+    assert second.final_output == "recovered"
+    assert is_run_complete(store, first.run_id)
+    store.close()
+
+    opened = open_store(tmp_path)
+    assert isinstance(opened, SegmentedStore)
+    opened.close()
@@ -0,0 +1,136 @@
+"""Tests for semantic run caching (agentor.engine.semantic_cache)."""
+
+import pytest
+
+from agentor.engine import AgentLoop, SemanticCache
+from tests.test_engine import FakeModel, calls, text, weather
+
+
+class FakeEmbeddings:
+    """Embeds by counting a few keywords, so paraphrases land close together."""
+
+    WORDS = ("refund", "shipping", "password", "weather")
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return [
+            [float(word in t.lower()) for word in self.WORDS] + [0.1] for t in texts
+        ]
+
+
+def make_cache(path, **kwargs):
+    return SemanticCache(path, embeddings=FakeEmbeddings(), **kwargs)
+
+
+def test_similar_prompts_share_an_entry_and_different_ones_do_not(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.add(cache.embed("How do I get a refund?"), "refund?", "Use the form.")
+
+    assert cache.lookup("Refund policy please")[1] == "Use the form."
+    assert cache.lookup("Where is my shipping label?")[1] is None
+    # entries of another scope (agent configuration) are invisible
+    assert cache.lookup("Refund policy please", scope="other")[1] is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.add(cache.embed("refund"), "refund", "A")
+    cache.add(cache.embed("shipping"), "shipping", "B")
+    assert cache.lookup("refund")[1] == "A"  # now the more recently used
+
+    cache.add(cache.embed("password"), "password", "C")
+    assert len(cache) == 2
+    assert cache.lookup("shipping")[1] is None
+    assert cache.lookup("refund")[1] == "A"
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, max_age=0)
+    cache.add(cache.embed("refund"), "refund", "A")
+    assert cache.lookup("refund")[1] is None
+
+
+def test_index_survives_a_restart(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.add(cache.embed("refund"), "refund", "A")
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+    assert reopened.lookup("refund please")[1] == "A"
+    with pytest.raises(ValueError):
+        make_cache(tmp_path, max_entries=5)
+
+
+def test_a_crash_while_replacing_an_entry_never_pairs_it_with_the_old_answer(
+    tmp_path,
+):
+    cache = make_cache(tmp_path, max_entries=1)
+    cache.add(cache.embed("refund"), "refund", "A")
+
+    class CrashBeforeInsert:
+        def __init__(self, db):
+            self.db = db
+
+        def __enter__(self):
+            return self.db.__enter__()
+
+        def __exit__(self, *exc_info):
+            return self.db.__exit__(*exc_info)
+
+        def execute(self, sql, *args):
+            if sql.startswith("INSERT"):
+                raise KeyboardInterrupt  # the process dying mid-write
+            return self.db.execute(sql, *args)
+
+    db, cache._db = cache._db, CrashBeforeInsert(cache._db)
+    with pytest.raises(KeyboardInterrupt):
+        cache.add(cache.embed("shipping"), "shipping", "B")
+    cache._db = db
+    cache.close()
+
+    reopened = make_cache(tmp_path, max_entries=1)
+    assert reopened.lookup("shipping")[1] is None
+    assert reopened.lookup("refund")[1] is None
+
+
+@pytest.mark.asyncio
+async def test_loop_answers_a_paraphrase_without_calling_the_model(tmp_path):
+    cache = make_cache(tmp_path)
+    model = FakeModel(text("Use the form."))
+    loop = AgentLoop(model=model, instructions="Be brief.", semantic_cache=cache)
+
+    first = await loop.arun("How do I get a refund?")
+    second = await loop.arun("refund, how?")
+
+    assert second.final_output == first.final_output == "Use the form."
+    assert len(model.calls) == 1
+    generation = next(e for e in second.events if e.type == "generation")
+    assert generation.cached is True
+    assert second.usage.total_tokens == 0
+    # the answer is part of the conversation, ready to be continued
+    assert second.messages[-1] == {"role": "assistant", "content": "Use the form."}
+
+
+@pytest.mark.asyncio
+async def test_runs_that_called_tools_are_not_stored(tmp_path):
+    cache = make_cache(tmp_path)
+    script = (calls(("weather", '{"city": "A"}')), text("sunny"))
+    loop = AgentLoop(model=FakeModel(*script), tools=[weather], semantic_cache=cache)
+
+    await loop.arun("weather in A?")
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_broken_embeddings_fall_through_to_the_model(tmp_path):
+    class Broken:
+        def embed(self, texts):
+            raise RuntimeError("embedding provider down")
+
+    cache = SemanticCache(tmp_path, embeddings=Broken())
+    loop = AgentLoop(model=FakeModel(text("hi")), semantic_cache=cache)
+
+    assert (await loop.arun("hello")).final_output == "hi"
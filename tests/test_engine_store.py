@@ -1,15 +1,36 @@
 """Tests for run persistence and resume (agentor.engine.store)."""
 
+import asyncio
+import base64
+import dataclasses
 import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 from agentor.engine import AgentLoop
-from agentor.engine.events import Event, Usage
+from agentor.engine.codec import decode, encode, sse_message, websocket_message
+from agentor.engine.events import _FIELD_IDS, Event, Usage
+from agentor.engine.history import MessageHistory
+from agentor.engine.maintenance import compact, main, parse_duration
+from agentor.engine.retention import Retention
 from agentor.engine.store import (
     FileStore,
     MemoryStore,
+    SqliteStore,
+    aappend,
+    alist_runs,
+    aload,
+    aload_tail,
+    final_event,
     is_complete,
+    is_run_complete,
+    iter_events,
+    last_event,
+    load_tail,
     replay_messages,
     total_usage,
 )
@@ -41,6 +62,57 @@ def test_from_dict_ignores_unknown_fields():
     assert restored.text == "x"
 
 
+def test_to_dict_shares_nested_data_and_covers_every_field():
+    messages = MessageHistory([{"role": "user", "content": "a"}])
+    data = Event(type="checkpoint", messages=messages, usage=Usage(1)).to_dict()
+    assert data["messages"] == list(messages) and type(data["messages"]) is list
+    assert data["messages"][0] is messages[0]
+    assert data["usage"] == {
+        "input_tokens": 1,
+        "output_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+    }
+    # a field without an entry would silently drop out of every encoding
+    assert list(_FIELD_IDS) == [f.name for f in dataclasses.fields(Event)]
+
+
+def test_event_roundtrips_through_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    event = Event(
+        type="generation",
+        usage=Usage(1, 2, 3, 4),
+        messages=MessageHistory([{"role": "user", "content": "a"}]),
+        calls=[{"id": "c1", "name": "weather", "arguments": "{}"}],
+        started_at=1.0,
+        cached=False,
+        base=0,
+    )
+    data = event.to_bytes()
+    assert Event.from_bytes(data) == Event.from_dict(json.loads(event.to_json()))
+    assert len(data) < len(event.to_json())
+
+    # ids a newer version added are skipped, as are extra usage counters
+    raw = msgpack.unpackb(data, strict_map_key=False)
+    raw[99] = "brand new"
+    raw[8] = [1, 2, 3, 4, 5]
+    restored = Event.from_bytes(msgpack.packb(raw))
+    assert restored.usage == Usage(1, 2, 3, 4)
+
+
+def test_wire_messages_carry_either_encoding():
+    pytest.importorskip("msgpack")
+    event = Event(type="text_delta", text="hi")
+    assert sse_message(event) == 'data: {"type": "text_delta", "text": "hi"}\n\n'
+    head, data = sse_message(event, "msgpack").strip().split("\n")
+    assert head == "event: msgpack"
+    assert decode(base64.b64decode(data.removeprefix("data: "))) == event
+    assert decode(websocket_message(event, "msgpack")) == event
+    assert decode(websocket_message(event)) == event
+    with pytest.raises(ValueError):
+        encode(event, "xml")
+
+
 # ------------------------------------------------------------ FileStore
 
 
@@ -72,6 +144,148 @@ def test_file_store_tolerates_a_torn_final_line(tmp_path):
     assert events[1].text == "kept"
 
 
+@pytest.mark.parametrize("durability", ["group", "async"])
+def test_file_store_batched_writes_keep_per_run_order(tmp_path, durability):
+    store = FileStore(tmp_path, durability=durability, commit_interval=0.001)
+
+    def write(run_id):
+        for i in range(50):
+            store.append(run_id, Event(type="message", text=str(i)))
+
+    threads = [threading.Thread(target=write, args=(f"r{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # a store reads its own writes, whatever is still queued
+    assert store.list_runs() == ["r0", "r1", "r2", "r3"]
+    for run_id in store.list_runs():
+        assert [e.text for e in store.load(run_id)] == [str(i) for i in range(50)]
+    store.close()
+
+
+def test_group_commit_waits_for_the_disk_and_reports_its_failures(tmp_path):
+    store = FileStore(tmp_path / "runs", durability="group")
+    store.append("r1", Event(type="run_start"))
+    # on disk already, as a second process would read it
+    assert [e.type for e in FileStore(tmp_path / "runs").load("r1")] == ["run_start"]
+
+    store.path("bad").mkdir()
+    with pytest.raises(OSError):
+        store.append("bad", Event(type="run_start"))
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_async_durability_skips_the_thread_hop(tmp_path):
+    store = FileStore(tmp_path, durability="async")
+    assert store.blocking is False
+    result = await AgentLoop(model=FakeModel(text("x")), store=store).arun("go")
+
+    store.close()
+    assert is_complete(FileStore(tmp_path).load(result.run_id))
+
+
+@pytest.mark.asyncio
+async def test_the_loop_prefers_a_stores_async_interface():
+    class AsyncOnly:
+        def __init__(self):
+            self.runs = {}
+
+        def append(self, run_id, event):
+            raise AssertionError("the sync interface was called")
+
+        load = list_runs = append
+
+        async def aappend(self, run_id, event):
+            self.runs.setdefault(run_id, []).append(event)
+
+        async def aload(self, run_id):
+            return list(self.runs.get(run_id, []))
+
+        aload_tail = aload
+
+        async def alist_runs(self):
+            return sorted(self.runs)
+
+    store = AsyncOnly()
+    crashed = AgentLoop(
+        model=FakeModel(calls(("weather", '{"city": "Rome"}'))),
+        tools=[weather],
+        store=store,
+        max_turns=1,
+    )
+    first = await crashed.arun("go")
+    second = await AgentLoop(model=FakeModel(text("ok")), store=store).aresume(
+        first.run_id
+    )
+    assert second.final_output == "ok"
+    assert await alist_runs(store) == [first.run_id]
+    assert is_complete(await aload(store, first.run_id))
+
+
+@pytest.mark.asyncio
+async def test_a_non_blocking_store_is_read_without_a_thread_hop():
+    class InMemory:
+        blocking = False
+
+        def __init__(self):
+            self.runs = {"r1": [Event(type="run_start")]}
+            self.threads = set()
+
+        def append(self, run_id, event):
+            self.runs.setdefault(run_id, []).append(event)
+
+        def load(self, run_id):
+            self.threads.add(threading.current_thread())
+            return list(self.runs.get(run_id, []))
+
+        def list_runs(self):
+            self.threads.add(threading.current_thread())
+            return sorted(self.runs)
+
+    store = InMemory()
+    assert await alist_runs(store) == ["r1"]
+    assert len(await aload(store, "r1")) == len(await aload_tail(store, "r1")) == 1
+    assert store.threads == {threading.current_thread()}
+
+
+@pytest.mark.asyncio
+async def test_async_appends_batch_and_keep_per_run_order(tmp_path):
+    for store in (
+        FileStore(tmp_path / "runs", durability="group"),
+        SqliteStore(tmp_path / "runs.sqlite"),
+    ):
+
+        async def write(store, run_id):
+            for i in range(50):
+                await aappend(store, run_id, Event(type="message", text=str(i)))
+
+        await asyncio.gather(*(write(store, f"r{n}") for n in range(4)))
+        assert await alist_runs(store) == ["r0", "r1", "r2", "r3"]
+        for run_id in store.list_runs():
+            events = await aload(store, run_id)
+            assert [e.text for e in events] == [str(i) for i in range(50)]
+        store.close()
+
+
+@pytest.mark.asyncio
+async def test_a_failing_event_does_not_fail_its_batch(tmp_path):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    # breaks the events table's NOT NULL on type, and so the transaction
+    bad = Event(type=None)
+
+    results = await asyncio.gather(
+        store.aappend("ok", Event(type="message", text="kept")),
+        store.aappend("bad", bad),
+        return_exceptions=True,
+    )
+    assert results[0] is None and isinstance(results[1], sqlite3.IntegrityError)
+    assert [e.text for e in store.load("ok")] == ["kept"]
+    store.close()
+
+
 # ------------------------------------------------------------ replay
 
 
@@ -99,6 +313,46 @@ def test_replay_rebuilds_messages_including_tool_results():
     assert messages[2] == {"role": "tool", "tool_call_id": "c0", "content": "sunny"}
 
 
+def test_replay_expands_delta_generations():
+    system = {"role": "system", "content": "s"}
+    user = {"role": "user", "content": "q"}
+    call = {
+        "id": "c0",
+        "type": "function",
+        "function": {"name": "weather", "arguments": "{}"},
+    }
+    events = [
+        Event(type="run_start", messages=[system, user]),
+        Event(type="generation", messages=[], base=2, calls=[call]),
+        Event(type="tool_result", call_id="c0", name="weather", result="sunny"),
+        Event(
+            type="generation",
+            base=2,
+            messages=[
+                {"role": "assistant", "content": None, "tool_calls": [call]},
+                {"role": "tool", "tool_call_id": "c0", "content": "sunny"},
+            ],
+            text="done",
+        ),
+    ]
+
+    messages = replay_messages(events)
+    assert [m["role"] for m in messages] == [
+        "system",
+        "user",
+        "assistant",
+        "tool",
+        "assistant",
+    ]
+    assert messages[-1]["content"] == "done"
+
+
+def test_replay_rejects_a_delta_with_no_base_in_the_log():
+    events = [Event(type="generation", messages=[], base=3)]
+    with pytest.raises(ValueError, match="does not contain them"):
+        replay_messages(events)
+
+
 def test_replay_of_an_empty_log_is_empty():
     assert replay_messages([]) == []
     assert replay_messages([Event(type="run_start")]) == []
@@ -251,6 +505,345 @@ async def test_resume_survives_a_real_file_round_trip(tmp_path):
     assert second.final_output == "recovered"
 
 
+# ------------------------------------------------------------ SqliteStore
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_resumes_and_keeps_run_metadata_current(tmp_path):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    crashed = AgentLoop(
+        name="Weather",
+        model=FakeModel(calls(("weather", '{"city": "Rome"}'))),
+        tools=[weather],
+        store=store,
+        max_turns=1,
+    )
+    first = await crashed.arun("go")
+    (info,) = store.query()
+    assert (info.run_id, info.status, info.agent) == (
+        first.run_id,
+        "max_turns",
+        "Weather",
+    )
+
+    reopened = AgentLoop(
+        model=FakeModel(text("recovered")),
+        tools=[weather],
+        store=SqliteStore(tmp_path / "runs.sqlite"),
+    )
+    second = await reopened.aresume(first.run_id)
+    assert second.final_output == "recovered"
+
+    (info,) = store.query()
+    assert info.status == "completed"
+    assert info.usage == total_usage(store.load(first.run_id)) == Usage(2, 4, 6)
+    assert info.started_at == first.events[0].started_at
+    store.close()
+
+
+def test_sqlite_store_finds_runs_by_index(tmp_path):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    for run_id, agent, started in (("a", "x", 1.0), ("b", "y", 2.0), ("c", "x", 3.0)):
+        store.append(run_id, Event(type="run_start", agent=agent, started_at=started))
+    store.append("a", Event(type="run_end", status="completed"))
+    store.append("b", Event(type="run_end", status="failed"))
+
+    assert [r.run_id for r in store.query(agent="x")] == ["a", "c"]
+    assert [r.run_id for r in store.query(not_completed=True)] == ["b", "c"]
+    assert [r.run_id for r in store.query(started_after=1.5, limit=1)] == ["b"]
+    # only runs that never ended are left for recovery, once they go quiet
+    assert store.incomplete_runs() == ["c"]
+    assert store.incomplete_runs(older_than=60) == []
+    assert store.list_runs() == ["a", "b", "c"]
+    assert store.load("missing") == []
+    store.close()
+
+
+# ------------------------------------------------------------ checkpoints
+
+
+@pytest.mark.asyncio
+async def test_resume_reads_from_the_latest_checkpoint(store):
+    script = [calls(("weather", f'{{"city": "{c}"}}')) for c in "ABC"]
+    crashed = AgentLoop(
+        model=FakeModel(*script),
+        tools=[weather],
+        store=store,
+        max_turns=3,
+        checkpoint_every=2,
+    )
+    first = await crashed.arun("go")
+    checkpoint = next(e for e in first.events if e.type == "checkpoint")
+    assert checkpoint.turn == 2
+    assert checkpoint.usage == Usage(2, 4, 6)
+
+    tail = load_tail(store, first.run_id)
+    assert tail[0].type == "checkpoint"
+    assert [e.type for e in tail[1:3]] == ["generation", "tool_call"]
+    # the tail rebuilds exactly what the whole log does
+    assert replay_messages(tail) == replay_messages(store.load(first.run_id))
+    assert total_usage(tail) == total_usage(store.load(first.run_id))
+
+    model = FakeModel(text("done"))
+    reopened = AgentLoop(model=model, tools=[weather], store=store)
+    second = await reopened.aresume(first.run_id)
+    assert second.final_output == "done"
+    assert second.usage == Usage(4, 8, 12)
+    assert [m["role"] for m in model.calls[0]["messages"]] == [
+        "user",
+        *["assistant", "tool"] * 3,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_the_checkpoint_and_tail(store):
+    script = [calls(("weather", '{"city": "A"}')), calls(("weather", '{"city": "B"}'))]
+    loop = AgentLoop(
+        model=FakeModel(*script, text("done")),
+        tools=[weather],
+        store=store,
+        checkpoint_every=2,
+    )
+    result = await loop.arun("go")
+    before = store.load(result.run_id)
+
+    assert compact(store) == before.index(
+        next(e for e in before if e.type == "checkpoint")
+    )
+    after = store.load(result.run_id)
+    assert after[0].type == "checkpoint"
+    assert after == load_tail(store, result.run_id)
+    assert replay_messages(after) == replay_messages(before)
+    assert total_usage(after) == total_usage(before)
+    # idempotent
+    assert compact(store) == 0
+
+
+def test_compaction_leaves_runs_in_flight_alone(tmp_path):
+    store = FileStore(tmp_path)
+    store.append("r1", Event(type="run_start"))
+    store.append("r1", Event(type="checkpoint", messages=[], usage=Usage()))
+    assert compact(store) == 0
+    assert compact(store, ["r1"]) == 1
+
+
+def test_compaction_leaves_runs_a_worker_holds(store):
+    for run_id in ("held", "free"):
+        store.append(run_id, Event(type="run_start"))
+        store.append(run_id, Event(type="checkpoint", messages=[], usage=Usage()))
+        store.append(run_id, Event(type="run_end", status="failed"))
+    # an ended run being resumed
+    store.acquire_lease("held", "live-worker", 60)
+
+    assert compact(store) == 1
+    assert len(store.load("held")) == 3 and len(store.load("free")) == 2
+    # the lease is the worker's still, and compaction let go of its own
+    assert store.renew_lease("held", "live-worker", 60)
+    assert store.acquire_lease("free", "another-worker", 60)
+
+
+def test_compact_command(tmp_path, capsys):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    for event in (
+        Event(type="run_start"),
+        Event(type="checkpoint", messages=[], usage=Usage()),
+        Event(type="run_end", status="completed"),
+    ):
+        store.append("r1", event)
+
+    assert main(["compact", str(tmp_path / "runs.sqlite")]) == 0
+    assert "Dropped 1 events." in capsys.readouterr().out
+    assert [e.type for e in store.load("r1")] == ["checkpoint", "run_end"]
+
+
+# ------------------------------------------------------------ streaming reads
+
+
+def test_last_event_reads_backwards_past_a_torn_line(tmp_path):
+    store = FileStore(tmp_path)
+    # larger than a read block, so the scan has to stitch lines across blocks
+    big = "x" * 20_000
+    store.append("r1", Event(type="run_start", messages=[{"content": big}]))
+    store.append("r1", Event(type="run_end", status="completed", text=big))
+    assert last_event(store, "r1").text == big
+    assert is_run_complete(store, "r1")
+
+    with store.path("r1").open("a") as f:
+        f.write('{"type": "message", "text": "trunc')
+    assert last_event(store, "r1").type == "run_end"
+    assert last_event(store, "missing") is None
+
+
+def test_every_store_streams_its_events(store):
+    for i in range(3):
+        store.append("r1", Event(type="message", text=str(i)))
+    store.append("r1", Event(type="run_end", status="failed"))
+
+    events = iter_events(store, "r1")
+    assert next(events).text == "0"
+    assert [e.type for e in events] == ["message", "message", "run_end"]
+    assert final_event(iter_events(store, "r1")).status == "failed"
+    assert not is_run_complete(store, "r1")
+    assert list(iter_events(store, "missing")) == []
+
+
+def test_sqlite_store_processes_appending_to_one_run_never_share_a_seq(tmp_path):
+    # one store per thread stands in for one per process: separate connections
+    path = tmp_path / "runs.sqlite"
+    stores = [SqliteStore(path) for _ in range(4)]
+
+    def write(store, writer):
+        for i in range(50):
+            store.append("r1", Event(type="message", text=f"{writer}-{i}"))
+
+    with ThreadPoolExecutor(len(stores)) as pool:
+        list(pool.map(write, stores, range(len(stores))))
+
+    assert len(stores[0].load("r1")) == 200
+    for store in stores:
+        store.close()
+
+
+def test_sqlite_store_stores_msgpack_alongside_json(tmp_path):
+    pytest.importorskip("msgpack")
+    path = tmp_path / "runs.sqlite"
+    SqliteStore(path).append("r1", Event(type="run_start", agent="A"))
+    store = SqliteStore(path, encoding="msgpack")
+    store.append("r1", Event(type="message", text="binary"))
+    store.append("r1", Event(type="run_end", status="completed"))
+
+    assert [e.type for e in store.load("r1")] == ["run_start", "message", "run_end"]
+    assert [e.text for e in iter_events(store, "r1")][1] == "binary"
+    assert is_run_complete(store, "r1")
+    (blob,) = store._db.execute(
+        "SELECT data FROM events WHERE type = 'message'"
+    ).fetchone()
+    assert isinstance(blob, bytes)
+
+
+def test_sqlite_store_streams_across_pages(tmp_path):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    store._PAGE = 2
+    for i in range(5):
+        store.append("r1", Event(type="message", text=str(i)))
+    assert [e.text for e in store.iter_events("r1")] == list("01234")
+
+
+# ------------------------------------------------------------ retention
+
+DAY = 86400.0
+
+
+def _ended_run(store, run_id):
+    store.append(run_id, Event(type="run_start", messages=[{"content": "go"}]))
+    store.append(run_id, Event(type="message", text="hi"))
+    store.append(run_id, Event(type="run_end", status="completed"))
+
+
+def _age(store, run_id, seconds):
+    stamp = store.last_modified(run_id) - seconds
+    for path in store.directory.glob(f"{run_id}.*"):
+        os.utime(path, (stamp, stamp))
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_archived_runs_stay_readable(tmp_path, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    store = FileStore(tmp_path)
+    _ended_run(store, "old")
+    _ended_run(store, "new")
+    store.append("open", Event(type="run_start"))
+    for run_id in ("old", "open"):
+        _age(store, run_id, 10 * DAY)
+    before = store.load("old")
+
+    report = Retention(store, archive_after=7 * DAY, codec=codec).sweep()
+    # the run still in flight is never rewritten
+    assert report.archived == ["old"] and report.deleted == []
+    assert store.is_archived("old") and not store.path("old").exists()
+    assert store.load("old") == before
+    assert last_event(store, "old").type == "run_end"
+    assert store.list_runs() == ["new", "old", "open"]
+    assert Retention(store, archive_after=7 * DAY).sweep().archived == []
+
+
+@pytest.mark.asyncio
+async def test_resume_after_archiving_appends_to_the_archive(tmp_path):
+    store = FileStore(tmp_path)
+    crashed = AgentLoop(
+        model=FakeModel(calls(("weather", '{"city": "Rome"}'))),
+        tools=[weather],
+        store=store,
+        max_turns=1,
+    )
+    first = await crashed.arun("go")
+    assert store.archive(first.run_id)
+
+    reopened = AgentLoop(model=FakeModel(text("recovered")), store=store)
+    second = await reopened.aresume(first.run_id)
+    assert second.final_output == "recovered"
+    assert is_run_complete(store, first.run_id)
+    # archived again, the raw tail is folded into the existing archive
+    assert store.archive(first.run_id)
+    assert not store.path(first.run_id).exists()
+    assert final_event(store.load(first.run_id)).status == "completed"
+
+
+def test_expired_runs_are_deleted(tmp_path):
+    store = FileStore(tmp_path)
+    _ended_run(store, "old")
+    store.archive("old")
+    _ended_run(store, "new")
+    _age(store, "old", 100 * DAY)
+
+    report = Retention(store, archive_after=7 * DAY, delete_after=90 * DAY).sweep()
+    assert report.deleted == ["old"]
+    assert store.list_runs() == ["new"] and list(tmp_path.iterdir()) != []
+    assert not any(tmp_path.glob("old.*"))
+
+
+def test_sqlite_store_deletes_expired_runs(tmp_path):
+    store = SqliteStore(tmp_path / "runs.sqlite")
+    _ended_run(store, "old")
+    _ended_run(store, "new")
+    now = store.last_modified("new")
+
+    report = Retention(store, delete_after=DAY).sweep(now=now + DAY / 2)
+    assert report.deleted == []
+    report = Retention(store, delete_after=DAY).sweep(now=now + 2 * DAY)
+    assert sorted(report.deleted) == ["new", "old"]
+    assert store.list_runs() == [] and store.query() == []
+    with pytest.raises(TypeError):
+        Retention(store, archive_after=DAY)
+
+
+def test_retention_leaves_runs_a_live_worker_holds(store):
+    store.append("held", Event(type="run_start"))
+    store.append("abandoned", Event(type="run_start"))
+    store.acquire_lease("held", "live-worker", 60)
+    now = store.last_modified("abandoned") + 2 * DAY
+
+    report = Retention(store, delete_after=DAY).sweep(now=now)
+    assert report.deleted == ["abandoned"]
+    assert store.list_runs() == ["held"]
+    # the lease is the worker's still, not the sweep's
+    assert store.renew_lease("held", "live-worker", 60)
+
+
+def test_gc_command(tmp_path, capsys):
+    store = FileStore(tmp_path)
+    _ended_run(store, "old")
+    _age(store, "old", 2 * DAY)
+
+    assert main(["gc", str(tmp_path), "--archive-after", "1d"]) == 0
+    assert "Archived 1 runs, deleted 0." in capsys.readouterr().out
+    assert store.is_archived("old")
+    assert parse_duration("90m") == 5400 and parse_duration("45") == 45
+    with pytest.raises(SystemExit):
+        main(["gc", str(tmp_path)])
+
+
 # ------------------------------------------------------------ Agentor
 
 
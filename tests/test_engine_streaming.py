@@ -0,0 +1,84 @@
+"""Tests for runs decoupled from their consumers (agentor.engine.streaming)."""
+
+import asyncio
+import gc
+
+import pytest
+
+from agentor.engine import AgentLoop
+from agentor.engine.store import MemoryStore, is_complete
+from tests.test_engine import FakeModel, text
+
+LONG = " ".join(f"w{i}" for i in range(50))
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_reads_coalesced_deltas_of_a_finished_run():
+    loop = AgentLoop(model=FakeModel(text(LONG)))
+    run = loop.start("go", stream_text=True, buffer=4)
+    events = run.attach()
+
+    # the run finishes without anyone reading
+    assert (await run.wait()).status == "completed"
+
+    seen = [e async for e in events]
+    deltas = [e.text for e in seen if e.type == "text_delta"]
+    assert "".join(deltas) == LONG + " "
+    assert len(deltas) < 50
+    assert seen[-1].type == "run_end"
+
+
+@pytest.mark.asyncio
+async def test_blocking_consumer_holds_the_run_until_it_reads():
+    loop = AgentLoop(model=FakeModel(text(LONG)))
+    run = loop.start("go", stream_text=True, buffer=2, overflow="block")
+    events = run.attach()
+
+    await asyncio.sleep(0.01)
+    assert not run.done
+
+    deltas = [e.text async for e in events if e.type == "text_delta"]
+    assert len(deltas) == 50
+    assert run.done
+
+
+@pytest.mark.asyncio
+async def test_detached_consumer_does_not_stop_the_run():
+    store = MemoryStore()
+    loop = AgentLoop(model=FakeModel(text(LONG)), store=store)
+    run = loop.start("go", stream_text=True, run_id="r1", buffer=1, overflow="block")
+
+    async for _ in run.attach():
+        break
+    gc.collect()
+
+    await asyncio.wait_for(run.wait(), 1)
+    assert is_complete(store.load("r1"))
+
+
+@pytest.mark.asyncio
+async def test_every_consumer_sees_events_from_when_it_attached():
+    loop = AgentLoop(model=FakeModel(text("hi")))
+    run = loop.start("go")
+    first, second = run.attach(), run.attach()
+
+    assert [e.type async for e in first] == [e.type async for e in second]
+    await run.wait()
+    # attaching after the end sees nothing, rather than hanging
+    assert [e async for e in run.attach()] == []
+
+
+@pytest.mark.asyncio
+async def test_failed_run_is_raised_to_its_consumers():
+    class Broken(FakeModel):
+        async def complete(self, messages, tools=None, response_format=None):
+            raise RuntimeError("boom")
+
+    run = AgentLoop(model=Broken()).start("go")
+    seen = []
+    with pytest.raises(RuntimeError):
+        async for event in run.attach():
+            seen.append(event)
+    assert seen[-1].status == "failed"
+    with pytest.raises(RuntimeError):
+        await run.wait()
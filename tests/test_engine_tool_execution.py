@@ -0,0 +1,328 @@
+"""Tests for how the native engine schedules tool calls."""
+
+import asyncio
+import gc
+import json
+import threading
+
+import pytest
+
+from agentor.engine import AgentLoop, ConcurrencyLimit, Tool, ToolCall, resolve_tools
+from agentor.tools.base import BaseTool, capability
+from tests.test_engine import FakeModel, calls, text
+
+
+class Gauge:
+    """Records how many calls were in flight at once."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def hold(self, seconds: float = 0.02) -> None:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(seconds)
+        self.active -= 1
+
+
+def _gauged_tool(gauge: Gauge, **kwargs) -> Tool:
+    async def probe(x: str) -> str:
+        """Probe.
+
+        Args:
+            x: anything.
+        """
+        await gauge.hold()
+        return x
+
+    return Tool.from_function(probe, **kwargs)
+
+
+def _fan_out(n: int, name: str = "probe"):
+    return calls(*[(name, f'{{"x": "{i}"}}') for i in range(n)])
+
+
+@pytest.mark.asyncio
+async def test_tool_concurrency_limit_caps_parallel_calls():
+    gauge = Gauge()
+    loop = AgentLoop(
+        model=FakeModel(_fan_out(5), text("done")),
+        tools=[_gauged_tool(gauge, max_concurrency=2)],
+    )
+    result = await loop.arun("go")
+
+    assert gauge.peak == 2
+    results = [e for e in result.events if e.type == "tool_result"]
+    assert [e.result for e in results] == ["0", "1", "2", "3", "4"]
+    # queueing is visible on the event, not just in wall-clock time
+    assert all(e.started_at >= e.queued_at for e in results)
+    assert max(e.started_at - e.queued_at for e in results) > 0
+
+
+@pytest.mark.asyncio
+async def test_loop_limit_is_shared_across_concurrent_runs_and_clones():
+    gauge = Gauge()
+    loop = AgentLoop(
+        model=FakeModel(_fan_out(3), text("done")),
+        tools=[_gauged_tool(gauge)],
+        max_concurrent_tools=2,
+    )
+    clone = loop.with_model(FakeModel(_fan_out(3), text("done")))
+
+    await asyncio.gather(loop.arun("a"), clone.arun("b"))
+    assert gauge.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_unlimited_tools_leave_queued_at_unset():
+    loop = AgentLoop(
+        model=FakeModel(_fan_out(2), text("done")), tools=[_gauged_tool(Gauge())]
+    )
+    result = await loop.arun("go")
+    assert all(e.queued_at is None for e in result.events if e.type == "tool_result")
+
+
+def test_base_tool_capabilities_share_one_limit():
+    class Database(BaseTool):
+        name = "db"
+        max_concurrency = 3
+
+        @capability
+        def read(self, q: str) -> str:
+            """Read."""
+            return q
+
+        @capability
+        def write(self, q: str) -> str:
+            """Write."""
+            return q
+
+    first, second = resolve_tools([Database()])
+    assert first.limit is second.limit
+    assert first.limit.limit == 3
+    assert resolve_tools([Database(max_concurrency=1)])[0].limit.limit == 1
+
+    # every agent and run resolving the same instance queues on one limit
+    db = Database()
+    assert resolve_tools([db])[0].limit is resolve_tools([db])[1].limit
+
+
+def test_concurrency_limit_rejects_zero():
+    with pytest.raises(ValueError):
+        ConcurrencyLimit(0)
+
+
+def test_a_limit_survives_separate_event_loops():
+    """run() starts a fresh loop per call; the limit must not bind to the first."""
+    limit = ConcurrencyLimit(1)
+
+    async def hold():
+        async with limit.slot():
+            await asyncio.sleep(0.01)
+
+    async def use():
+        # contention is what binds an asyncio semaphore to a loop
+        await asyncio.gather(hold(), hold())
+
+    asyncio.run(use())
+    asyncio.run(use())
+
+
+def _hanging_tool(**kwargs) -> Tool:
+    async def hang(x: str) -> str:
+        """Hang.
+
+        Args:
+            x: anything.
+        """
+        await asyncio.sleep(10)
+        return x
+
+    return Tool.from_function(hang, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_a_hung_tool_times_out_as_an_ordinary_failure():
+    loop = AgentLoop(
+        model=FakeModel(calls(("hang", '{"x": "1"}')), text("gave up")),
+        tools=[_hanging_tool(timeout=0.05)],
+    )
+    result = await asyncio.wait_for(loop.arun("go"), timeout=2)
+
+    (event,) = [e for e in result.events if e.type == "tool_result"]
+    assert event.error.startswith("TimeoutError")
+    assert "timed out after 0.05s" in event.result
+    assert result.final_output == "gave up"
+
+
+@pytest.mark.asyncio
+async def test_timeouts_count_toward_the_failure_budget():
+    loop = AgentLoop(
+        model=FakeModel(
+            calls(("hang", '{"x": "1"}')),
+            calls(("hang", '{"x": "2"}')),
+            text("done"),
+        ),
+        tools=[_hanging_tool()],
+        tool_timeout=0.02,
+        max_tool_failures=2,
+    )
+    result = await loop.arun("go")
+
+    notices = [m for m in result.messages if m["role"] == "user"]
+    assert any("'hang' failed 2 times" in m["content"] for m in notices)
+
+
+@pytest.mark.asyncio
+async def test_run_deadline_bounds_tool_calls_and_reaches_the_tool():
+    seen = []
+
+    async def patient(ctx: "RunContext", x: str) -> str:  # noqa: F821
+        """Patient.
+
+        Args:
+            x: anything.
+        """
+        seen.append(ctx.remaining())
+        await asyncio.sleep(10)
+        return x
+
+    loop = AgentLoop(
+        model=FakeModel(calls(("patient", '{"x": "1"}')), text("done")),
+        tools=[patient],
+        tool_timeout=5,
+        run_timeout=0.1,
+    )
+    result = await asyncio.wait_for(loop.arun("go"), timeout=2)
+
+    (event,) = [e for e in result.events if e.type == "tool_result"]
+    assert "run deadline reached" in event.error
+    assert 0 < seen[0] <= 0.1
+    # the deadline ends the run rather than handing the model another turn
+    assert result.status == "failed" and "run_timeout" in result.error
+    assert len(loop.model.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_a_timed_out_sync_tool_keeps_its_slot_until_it_returns():
+    release = threading.Event()
+    running = []
+
+    def blocking(x: str) -> str:
+        """Blocking.
+
+        Args:
+            x: anything.
+        """
+        running.append(x)
+        release.wait(5)
+        running.remove(x)
+        return x
+
+    tool = Tool.from_function(blocking, max_concurrency=1, timeout=0.05)
+    loop = AgentLoop(model=FakeModel(), tools=[tool])
+    first = await loop._run_tool(
+        ToolCall(id="a", name="blocking", arguments='{"x": "a"}')
+    )
+    assert first.error.startswith("TimeoutError") and running == ["a"]
+
+    # the first call's thread still holds the only slot
+    second = asyncio.ensure_future(
+        loop._run_tool(ToolCall(id="b", name="blocking", arguments='{"x": "b"}'))
+    )
+    await asyncio.sleep(0.02)
+    assert running == ["a"]
+    release.set()
+    await asyncio.wait_for(second, timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_an_abandoned_call_that_fails_later_is_not_reported_unretrieved():
+    release = threading.Event()
+    unretrieved = []
+    asyncio.get_running_loop().set_exception_handler(
+        lambda _, context: unretrieved.append(context)
+    )
+
+    def blocking(x: str) -> str:
+        """Blocking.
+
+        Args:
+            x: anything.
+        """
+        release.wait(5)
+        raise RuntimeError("too late")
+
+    tool = Tool.from_function(blocking, max_concurrency=1, timeout=0.05)
+    event = await AgentLoop(model=FakeModel(), tools=[tool])._run_tool(
+        ToolCall(id="a", name="blocking", arguments='{"x": "a"}')
+    )
+    assert event.error.startswith("TimeoutError")
+    release.set()
+    await asyncio.sleep(0.05)
+
+    # called directly, with nobody to hand the thread to
+    release.clear()
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(tool.call({"x": "b"}), timeout=0.05)
+    release.set()
+    await asyncio.sleep(0.05)
+    gc.collect()
+    assert unretrieved == []
+
+
+@pytest.mark.asyncio
+async def test_a_tool_raising_timeout_itself_is_not_blamed_on_the_deadline():
+    def flaky(x: str) -> str:
+        """Flaky.
+
+        Args:
+            x: anything.
+        """
+        raise TimeoutError("upstream slow")
+
+    loop = AgentLoop(
+        model=FakeModel(calls(("flaky", '{"x": "1"}')), text("done")),
+        tools=[flaky],
+        tool_timeout=5,
+    )
+    result = await loop.arun("go")
+    (event,) = [e for e in result.events if e.type == "tool_result"]
+    assert event.error == "TimeoutError: upstream slow"
+
+
+@pytest.mark.asyncio
+async def test_tool_schemas_are_built_once_per_tool_set():
+    model = FakeModel(calls(("probe", '{"x": "1"}')), text("done"))
+    loop = AgentLoop(model=model, tools=[_gauged_tool(Gauge())])
+    clone = loop.with_model(FakeModel(text("done")))
+
+    await loop.arun("a")
+    await clone.arun("b")
+
+    sent = [call["tools"] for call in model.calls + clone.model.calls]
+    assert all(payload is sent[0] for payload in sent)
+    assert len(loop._schema_cache) == 1
+
+
+def test_disabling_a_tool_selects_a_different_payload():
+    first = _gauged_tool(Gauge())
+    second = Tool.from_function(lambda y: y, name="other")
+    loop = AgentLoop(model=FakeModel(), tools=[first, second])
+
+    both = loop._schemas(loop.tools, set())
+    one = loop._schemas(loop.tools, {"other"})
+    assert [s["function"]["name"] for s in one] == ["probe"]
+    assert loop._schemas(loop.tools, set()) is both
+    assert loop._schemas(loop.tools, {"probe", "other"}) is None
+
+
+def test_schema_payload_is_frozen_and_pre_encoded():
+    loop = AgentLoop(model=FakeModel(), tools=[_gauged_tool(Gauge())])
+    payload = loop._schemas(loop.tools, set())
+
+    with pytest.raises(TypeError):
+        payload[0]["function"]["description"] = "edited"
+    assert json.loads(payload.encoded) == payload
+    assert payload.encoded is payload.encoded
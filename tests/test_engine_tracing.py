@@ -81,6 +81,19 @@ async def test_generation_span_carries_request_and_usage():
     assert generation["started_at"] and generation["ended_at"]
 
 
+@pytest.mark.asyncio
+async def test_later_generation_spans_carry_the_full_request():
+    """The log stores deltas; a span must still show what was actually sent."""
+    tracer = RecordingTracer()
+    model = FakeModel(calls(("weather", '{"city": "A"}')), text("done"))
+    loop = AgentLoop(model=model, tools=[weather], tracer=tracer, instructions="s")
+    await loop.arun("go")
+
+    (items,) = tracer.exported
+    generations = [i for i in items[1:] if i["span_data"]["type"] == "generation"]
+    assert generations[-1]["span_data"]["input"] == model.calls[-1]["messages"]
+
+
 @pytest.mark.asyncio
 async def test_tool_failure_is_recorded_on_the_span():
     def broken(x: str) -> str: